@@ -1,10 +1,43 @@
 import os
 import json
-from typing import List, Dict, Any, Optional
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any, Optional, Iterator
 from agents.profile_reader_agent import profile_reader
 from agents.match_scorer_agent import match_scorer_agent
 from agents.red_flag_agent import red_flag_agent
 from agents.wingman_agent import match_explainer_agent
+from agents.match_analyst_agent import match_analyst_agent
+from services.pair_cache import pair_cache
+from services.llm_gateway import llm_gateway, Priority
+from services.tracing import span, traced, stage_metrics
+
+# Upper bound of a pair's final score; once N finished candidates reach it, no
+# unfinished candidate can still enter the top N
+MAX_FINAL_SCORE = 100
+
+def pipeline_profile(doc: Dict[str, Any], include_photo: bool = True) -> Dict[str, Any]:
+    """Converts a profiles collection document into the dict shape the agents expect."""
+    profile = {
+        "id": str(doc["_id"]),
+        "raw_profile_text": doc.get("raw_profile_text", ""),
+        "city": doc.get("city", ""),
+        "area": doc.get("area", ""),
+        "budget_PKR": doc.get("budget_PKR", 0),
+        "sleep_schedule": doc.get("sleep_schedule"),
+        "cleanliness": doc.get("cleanliness"),
+        "noise_tolerance": doc.get("noise_tolerance"),
+        "study_habits": doc.get("study_habits"),
+        "food_pref": doc.get("food_pref"),
+        "age": doc.get("age"),
+        "occupation": doc.get("occupation"),
+        "full_name": doc.get("full_name"),
+    }
+    if include_photo:
+        profile["profile_photo"] = doc.get("profile_photo")
+    return profile
+
 
 class MatchPipeline:
     """
@@ -15,34 +48,40 @@ class MatchPipeline:
     4. Aggregator (Final Score & Explanation)
     """
 
-    def __init__(self):
+    def __init__(self, fused: Optional[bool] = None):
         # The individual agents are imported from their respective modules
         self.analysis_agent = profile_reader
         self.scoring_agent = match_scorer_agent
         self.security_agent = red_flag_agent
         self.aggregator_agent = match_explainer_agent
+        # Fused mode: scoring, red flags and explanation in one LLM call per pair
+        self.fused_agent = match_analyst_agent
+        if fused is None:
+            fused = os.getenv("MATCH_PIPELINE_FUSED", "false").lower() in ("1", "true", "yes")
+        self.fused = fused and self.fused_agent is not None
+        # Batch scoring: one scorer request per chunk of candidates instead of one per pair
+        self.batch_scoring = os.getenv("MATCH_PIPELINE_BATCH_SCORING", "false").lower() in ("1", "true", "yes")
+        # Symmetric pair-result cache (None when disabled)
+        self.pair_cache = pair_cache
+        # Candidates further than this from the seeker's budget are not retrieved (0 disables)
+        self.budget_window_pkr = int(os.getenv("MATCH_BUDGET_WINDOW_PKR", "50000"))
+        # Process-wide pool for the threaded fan-out of interactive requests
+        # (the async fan-out is bounded by the gateway's in-flight semaphore instead)
+        self._executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv("MATCH_PIPELINE_WORKERS", "10")), thread_name_prefix="match-pipeline"
+        )
+        # Background fan-outs (match refreshes) wait on the limiter without a bound, so they
+        # get their own pool and can never hold the interactive workers
+        self._background_executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv("MATCH_PIPELINE_BACKGROUND_WORKERS", "2")), thread_name_prefix="match-pipeline-bg"
+        )
 
-    def run_pipeline(self, seeker_profile: Dict[str, Any], candidate_profile: Dict[str, Any]) -> Dict[str, Any]:
+    @staticmethod
+    def _apply_risk(base_score: int, red_flags: List[Dict[str, Any]]):
         """
-        Runs the full 4-agent pipeline for a seeker-candidate pair.
+        Applies risk penalties for red flags and derives the recommendation label.
+        Returns (final_score, risk_level, recommendation).
         """
-        # Step 1: Compatibility Scoring
-        base_scoring = self.scoring_agent.score_profiles(seeker_profile, candidate_profile)
-        base_score = base_scoring.get("score", 0)
-        reasons = base_scoring.get("reasons", [])
-
-        # Step 2: Red Flag Detection
-        security_report = self.security_agent.detect_conflicts(seeker_profile, candidate_profile)
-        red_flags = security_report.get("red_flags", [])
-
-        # Step 3: Aggregation & Explanation
-        explanation_report = self.aggregator_agent.generate_explanation(
-            match_score=base_score,
-            match_reasons=reasons,
-            red_flags=red_flags
-        )
-
-        # Apply Risk Penalties
         final_score = base_score
         risk_level = "low"
         
@@ -65,6 +104,64 @@ class MatchPipeline:
         elif final_score >= 40:
             recommendation = "Consider"
 
+        return final_score, risk_level, recommendation
+
+    def prefilter_score(self, seeker_profile: Dict[str, Any], candidate_profile: Dict[str, Any]) -> int:
+        """
+        Cheap, deterministic score for a pair built only on the agents' rule-based
+        fallbacks. Never calls the LLM.
+        """
+        base_score = self.scoring_agent._rule_based_fallback(seeker_profile, candidate_profile)["score"]
+        red_flags = self.security_agent._rule_based_fallback("prefilter", seeker_profile, candidate_profile)["red_flags"]
+        final_score, _, _ = self._apply_risk(base_score, red_flags)
+        return final_score
+
+    def run_pipeline(
+        self, seeker_profile: Dict[str, Any], candidate_profile: Dict[str, Any], base_scoring: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Runs the full 4-agent pipeline for a seeker-candidate pair.
+        Results are served from the pair cache when both profiles are unchanged.
+        `base_scoring` is the pair's entry from the batched scoring stage, if any.
+        If any LLM call failed (errors, open circuit) or an agent replaced unusable
+        LLM output with its rule-based fallback, the result is flagged as degraded
+        and not cached.
+        """
+        with span("pipeline.run_pipeline"):
+            cached = self._get_cached(seeker_profile, candidate_profile)
+            if cached:
+                return cached
+
+            with llm_gateway.track_degradation() as tracker:
+                if self.fused:
+                    result = self._run_fused_pipeline(seeker_profile, candidate_profile)
+                else:
+                    result = self._run_agent_pipeline(seeker_profile, candidate_profile, base_scoring)
+
+            return self._finish_result(seeker_profile, candidate_profile, result, tracker.degraded)
+
+    def _get_cached(self, seeker_profile: Dict[str, Any], candidate_profile: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if not self.pair_cache:
+            return None
+        with span("pipeline.cache_get"):
+            cached = self.pair_cache.get(seeker_profile, candidate_profile)
+        stage_metrics.count("cache.pair.hit" if cached else "cache.pair.miss")
+        return cached
+
+    def _finish_result(self, seeker_profile: Dict[str, Any], candidate_profile: Dict[str, Any], result: Dict[str, Any], degraded: bool) -> Dict[str, Any]:
+        """Flags degraded results and caches only full-quality ones."""
+        result["degraded"] = degraded
+        if degraded:
+            stage_metrics.count("pipeline.degraded_results")
+        elif self.pair_cache:
+            with span("pipeline.cache_put"):
+                self.pair_cache.put(seeker_profile, candidate_profile, result)
+        return result
+
+    def _build_result(self, base_score: int, reasons: List[str], red_flags: List[Dict[str, Any]], explanation_report: Dict[str, Any]) -> Dict[str, Any]:
+        """Applies risk penalties and assembles the pipeline output for a pair."""
+        final_score, risk_level, recommendation = self._apply_risk(base_score, red_flags)
+
         return {
             "final_score": final_score,
             "base_score": base_score,
@@ -76,76 +173,350 @@ class MatchPipeline:
             "score_reasons": reasons
         }
 
-    def get_best_matches(self, user_profile: Dict[str, Any], top_n: int = 5) -> List[Dict[str, Any]]:
+    def _run_agent_pipeline(
+        self, seeker_profile: Dict[str, Any], candidate_profile: Dict[str, Any], base_scoring: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
         """
-        Retrieves, scores, and ranks all potential candidates from the database.
+        Scorer, red flag and explainer agents run one after another for the pair.
+        The scorer is skipped when the batched scoring stage already scored the pair.
+        """
+        # Step 1: Compatibility Scoring
+        if base_scoring is None:
+            with span("pipeline.score"):
+                base_scoring = self.scoring_agent.score_profiles(seeker_profile, candidate_profile)
+        else:
+            self._use_batch_score(base_scoring)
+        base_score = base_scoring.get("score", 0)
+        reasons = base_scoring.get("reasons", [])
+
+        # Step 2: Red Flag Detection
+        with span("pipeline.red_flags"):
+            security_report = self.security_agent.detect_conflicts(seeker_profile, candidate_profile)
+        red_flags = security_report.get("red_flags", [])
+
+        # Step 3: Aggregation & Explanation
+        with span("pipeline.explain"):
+            explanation_report = self.aggregator_agent.generate_explanation(
+                match_score=base_score,
+                match_reasons=reasons,
+                red_flags=red_flags
+            )
+
+        return self._build_result(base_score, reasons, red_flags, explanation_report)
+
+    @staticmethod
+    def _use_batch_score(base_scoring: Dict[str, Any]):
+        # The batch ran outside this pair's degradation scope, so a fallback entry is flagged here
+        if base_scoring.get("degraded"):
+            llm_gateway.mark_degraded()
+
+    def _batch_scores(self, seeker_profile: Dict[str, Any], candidate_profiles: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Batched scoring stage: scores every candidate whose pair is not cached in as few
+        LLM requests as MatchScorerAgent.score_many needs. Returns {candidate id: scoring},
+        or {} unless batch scoring is on.
+        """
+        if not self.batch_scoring or self.fused or not candidate_profiles:
+            return {}
+        uncached = [
+            profile for profile in candidate_profiles
+            if not (self.pair_cache and self.pair_cache.get(seeker_profile, profile))
+        ]
+        if not uncached:
+            return {}
+        with span("pipeline.score_batch"):
+            return self.scoring_agent.score_many(seeker_profile, uncached)
+
+    def _run_fused_pipeline(self, seeker_profile: Dict[str, Any], candidate_profile: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Same output as run_pipeline, but with a single fused LLM call for the pair.
+        """
+        with span("pipeline.fused_analysis"):
+            analysis = self.fused_agent.analyze_pair(seeker_profile, candidate_profile)
+        return self._build_result(analysis["score"], analysis["reasons"], analysis["red_flags"], analysis)
+
+    def run_rule_based_pipeline(self, seeker_profile: Dict[str, Any], candidate_profile: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Full pipeline output for a pair using only the agents' rule-based fallbacks. Never calls
+        the LLM, so the result is always flagged as degraded.
+        """
+        pair_id = f"{seeker_profile.get('id', 'P-A')}_{candidate_profile.get('id', 'P-B')}"
+        base_scoring = self.scoring_agent._rule_based_fallback(seeker_profile, candidate_profile)
+        red_flags = self.security_agent._rule_based_fallback(pair_id, seeker_profile, candidate_profile)["red_flags"]
+        explanation_report = self.aggregator_agent._rule_based_fallback(
+            base_scoring["score"], base_scoring["reasons"], red_flags
+        )
+        result = self._build_result(base_scoring["score"], base_scoring["reasons"], red_flags, explanation_report)
+        result["degraded"] = True
+        return result
+
+    async def run_pipeline_async(
+        self, seeker_profile: Dict[str, Any], candidate_profile: Dict[str, Any], base_scoring: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Async variant of run_pipeline. Scoring and red flag detection are independent,
+        so they run concurrently before the explainer.
         """
-        from db.mongo import get_profiles_collection
-        from concurrent.futures import ThreadPoolExecutor, as_completed
+        with span("pipeline.run_pipeline_async"):
+            cached = self._get_cached(seeker_profile, candidate_profile)
+            if cached:
+                return cached
+
+            with llm_gateway.track_degradation() as tracker:
+                if self.fused:
+                    analysis = await traced(
+                        "pipeline.fused_analysis", self.fused_agent.analyze_pair_async(seeker_profile, candidate_profile)
+                    )
+                    result = self._build_result(analysis["score"], analysis["reasons"], analysis["red_flags"], analysis)
+                elif base_scoring is not None:
+                    self._use_batch_score(base_scoring)
+                    security_report = await traced(
+                        "pipeline.red_flags", self.security_agent.detect_conflicts_async(seeker_profile, candidate_profile)
+                    )
+                else:
+                    base_scoring, security_report = await asyncio.gather(
+                        traced("pipeline.score", self.scoring_agent.score_profiles_async(seeker_profile, candidate_profile)),
+                        traced("pipeline.red_flags", self.security_agent.detect_conflicts_async(seeker_profile, candidate_profile)),
+                    )
+                    base_score = base_scoring.get("score", 0)
+                    reasons = base_scoring.get("reasons", [])
+                    red_flags = security_report.get("red_flags", [])
+                    explanation_report = await traced("pipeline.explain", self.aggregator_agent.generate_explanation_async(
+                        match_score=base_score,
+                        match_reasons=reasons,
+                        red_flags=red_flags
+                    ))
+                    result = self._build_result(base_score, reasons, red_flags, explanation_report)
+
+            return self._finish_result(seeker_profile, candidate_profile, result, tracker.degraded)
+
+    def rank_candidates(self, user_profile: Dict[str, Any], candidate_docs: List[Dict[str, Any]], limit: int) -> List[Dict[str, Any]]:
+        """
+        Ranks candidates with the vectorized scoring engine and returns the best `limit` docs.
+        Falls back to the per-pair rule-based prefilter if NumPy is unavailable.
+        No LLM calls are made here, so this is cheap even for very large candidate pools.
+        """
+        try:
+            from services.scoring_engine import CandidateMatrix
+        except ImportError:
+            ranked = sorted(candidate_docs, key=lambda doc: self.prefilter_score(user_profile, doc), reverse=True)
+            return ranked[:limit]
+
+        matrix = CandidateMatrix(candidate_docs)
+        return [candidate_docs[i] for i in matrix.top_k(user_profile, limit)]
+
+    def _load_candidates(self, user_profile: Dict[str, Any], shortlist_size: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Loads valid candidate docs for the user, optionally cut down to a ranked shortlist.
+        """
+        from db.mongo import get_profiles_collection, build_candidate_query, CANDIDATE_PROJECTION
 
         profiles_collection = get_profiles_collection()
-        # Find raw candidates
-        candidate_docs = list(profiles_collection.find())
-        
-        # Pre-filter to remove self and ensure valid data
-        valid_candidates = []
-        user_id = user_profile.get("id")
-        
-        for doc in candidate_docs:
-            if str(doc["_id"]) == user_id:
-                continue
-            # Simple validation to skip broken profiles
-            if not doc.get("full_name") or not doc.get("city"):
-                continue
-            valid_candidates.append(doc)
+        # Self exclusion, city, budget window and required fields are filtered server-side
+        query = build_candidate_query(user_profile, budget_window_pkr=self.budget_window_pkr)
+        with span("pipeline.load_candidates"):
+            valid_candidates = list(profiles_collection.find(query, CANDIDATE_PROJECTION))
 
-        print(f"⚡ Scoring {len(valid_candidates)} candidates in parallel...")
+        if shortlist_size is not None and len(valid_candidates) > shortlist_size:
+            with span("pipeline.rank_candidates"):
+                valid_candidates = self.rank_candidates(user_profile, valid_candidates, shortlist_size)
+
+        # Photos are only needed for the candidates that will be returned
+        with span("pipeline.load_photos"):
+            photos = {
+                doc["_id"]: doc.get("profile_photo")
+                for doc in profiles_collection.find(
+                    {"_id": {"$in": [c["_id"] for c in valid_candidates]}}, {"profile_photo": 1}
+                )
+            }
+        for doc in valid_candidates:
+            doc["profile_photo"] = photos.get(doc["_id"])
 
+        return valid_candidates
+
+    def get_rule_based_matches(self, user_profile: Dict[str, Any], top_n: int = 5, shortlist_size: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Same result shape as get_best_matches, built only from the rule-based fallbacks.
+        Never calls the LLM, so it is cheap enough to answer a request immediately.
+        """
         results = []
+        for doc in self._load_candidates(user_profile, shortlist_size or top_n):
+            candidate_profile = pipeline_profile(doc)
+            pipeline_result = self.run_rule_based_pipeline(user_profile, candidate_profile)
+            pipeline_result["profile"] = candidate_profile
+            results.append(pipeline_result)
 
-        def process_candidate(doc):
-            try:
-                candidate_profile = {
-                    "id": str(doc["_id"]),
-                    "raw_profile_text": doc.get("raw_profile_text", ""),
-                    "city": doc.get("city", ""),
-                    "area": doc.get("area", ""),
-                    "budget_PKR": doc.get("budget_PKR", 0),
-                    "sleep_schedule": doc.get("sleep_schedule"),
-                    "cleanliness": doc.get("cleanliness"),
-                    "noise_tolerance": doc.get("noise_tolerance"),
-                    "study_habits": doc.get("study_habits"),
-                    "food_pref": doc.get("food_pref"),
-                    "age": doc.get("age"),
-                    "occupation": doc.get("occupation"),
-                    "full_name": doc.get("full_name"),
-                    "profile_photo": doc.get("profile_photo")
-                }
-
-                # Run the pipeline for this candidate
-                pipeline_result = self.run_pipeline(user_profile, candidate_profile)
-                
-                # Augment result with the full profile for the frontend
-                pipeline_result["profile"] = candidate_profile
-                return pipeline_result
-            except Exception as e:
-                print(f"❌ Error processing candidate {doc.get('_id')}: {e}")
-                return None
-
-        # Execute in parallel
-        # Using 10 workers to speed up I/O bound LLM calls
-        with ThreadPoolExecutor(max_workers=10) as executor:
-            future_to_candidate = {executor.submit(process_candidate, doc): doc for doc in valid_candidates}
+        results.sort(key=lambda x: x["final_score"], reverse=True)
+        return results[:top_n]
+
+    def _process_candidate(
+        self, user_profile: Dict[str, Any], doc: Dict[str, Any], base_scoring: Optional[Dict[str, Any]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Runs the pipeline for one candidate doc. Returns None on failure."""
+        try:
+            candidate_profile = pipeline_profile(doc)
+
+            # Run the pipeline for this candidate
+            pipeline_result = self.run_pipeline(user_profile, candidate_profile, base_scoring)
             
-            for future in as_completed(future_to_candidate):
+            # Augment result with the full profile for the frontend
+            pipeline_result["profile"] = candidate_profile
+            return pipeline_result
+        except Exception as e:
+            print(f"❌ Error processing candidate {doc.get('_id')}: {e}")
+            return None
+
+    @staticmethod
+    def _top_n_settled(final_scores: List[int], top_n: int) -> bool:
+        """True once the top N among finished candidates can no longer be displaced."""
+        if top_n <= 0 or len(final_scores) < top_n:
+            return False
+        return sorted(final_scores, reverse=True)[top_n - 1] >= MAX_FINAL_SCORE
+
+    def iter_best_matches(
+        self,
+        user_profile: Dict[str, Any],
+        top_n: int = 5,
+        shortlist_size: Optional[int] = None,
+        snapshot_every: int = 3,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Scores candidates in parallel and yields frames as results complete:
+        - {"event": "match", "data": result} for every scored candidate
+        - {"event": "snapshot", "data": [...]} with the current top N, every `snapshot_every` matches
+        - {"event": "final", "data": [...]} with the final ranked top N
+        Candidates run on the interactive pipeline pool, or the background pool when called
+        at background priority. Work still queued is dropped once the top N is settled or
+        the consumer stops early (e.g. client disconnect).
+        """
+        valid_candidates = self._load_candidates(user_profile, shortlist_size)
+        print(f"⚡ Scoring {len(valid_candidates)} candidates in parallel...")
+
+        results = []
+
+        scores = self._batch_scores(user_profile, [pipeline_profile(doc, include_photo=False) for doc in valid_candidates])
+
+        background = llm_gateway.current_priority() == Priority.BACKGROUND
+        executor = self._background_executor if background else self._executor
+        # Each task runs in a copy of this context so the caller's LLM priority carries over
+        futures = [
+            executor.submit(
+                contextvars.copy_context().run, self._process_candidate, user_profile, doc, scores.get(str(doc["_id"]))
+            )
+            for doc in valid_candidates
+        ]
+        try:
+            for future in as_completed(futures):
                 result = future.result()
-                if result:
-                    results.append(result)
+                if not result:
+                    continue
+                results.append(result)
+                yield {"event": "match", "data": result}
+
+                if snapshot_every and len(results) % snapshot_every == 0:
+                    snapshot = sorted(results, key=lambda x: x["final_score"], reverse=True)[:top_n]
+                    yield {"event": "snapshot", "data": snapshot}
+
+                if len(results) < len(futures) and self._top_n_settled([r["final_score"] for r in results], top_n):
+                    stage_metrics.count("pipeline.settled_early")
+                    break
+        finally:
+            cancelled = sum(future.cancel() for future in futures)
+            if cancelled:
+                stage_metrics.count("pipeline.cancelled_candidates", cancelled)
+
+        # Sort by final score descending
+        results.sort(key=lambda x: x["final_score"], reverse=True)
+        yield {"event": "final", "data": results[:top_n]}
+
+    async def get_best_matches_async(
+        self,
+        user_profile: Dict[str, Any],
+        top_n: int = 5,
+        shortlist_size: Optional[int] = None,
+        deadline_seconds: Optional[float] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Async fan-out over candidates. LLM calls go through the process-wide async pool, so
+        concurrent requests share one bounded set of in-flight calls. Outstanding calls are
+        cancelled as soon as the top N is settled, or if the caller is cancelled. Once the
+        deadline passes they are cancelled too, and unfinished candidates are scored with the
+        rule-based pipeline instead.
+        """
+        valid_candidates = await asyncio.to_thread(self._load_candidates, user_profile, shortlist_size)
+        print(f"⚡ Scoring {len(valid_candidates)} candidates concurrently...")
+
+        scores = await asyncio.to_thread(
+            self._batch_scores, user_profile, [pipeline_profile(doc, include_photo=False) for doc in valid_candidates]
+        )
+        tasks = {
+            asyncio.create_task(
+                self.run_pipeline_async(user_profile, pipeline_profile(doc), scores.get(str(doc["_id"])))
+            ): doc
+            for doc in valid_candidates
+        }
+        if not tasks:
+            return []
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + deadline_seconds if deadline_seconds is not None else None
+        pending = set(tasks)
+        final_scores: List[int] = []
+        settled = False
+        try:
+            while pending:
+                timeout = max(deadline - loop.time(), 0) if deadline is not None else None
+                finished, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not finished:
+                    break
+                final_scores.extend(t.result()["final_score"] for t in finished if t.exception() is None)
+                if pending and self._top_n_settled(final_scores, top_n):
+                    settled = True
+                    stage_metrics.count("pipeline.settled_early")
+                    break
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+                stage_metrics.count("pipeline.cancelled_candidates", len(pending))
+
+        if pending and not settled:
+            print(f"⚠ Deadline reached, cancelled {len(pending)} outstanding candidates.")
+            stage_metrics.count("pipeline.deadline_fallbacks", len(pending))
+
+        results = []
+        for task, doc in tasks.items():
+            candidate_profile = pipeline_profile(doc)
+            if task in pending and settled:
+                # Cannot enter the top N
+                continue
+            if task not in pending and task.exception() is None:
+                pipeline_result = task.result()
+            elif task not in pending:
+                print(f"❌ Error processing candidate {doc.get('_id')}: {task.exception()}")
+                continue
+            else:
+                pipeline_result = self.run_rule_based_pipeline(user_profile, candidate_profile)
+            pipeline_result["profile"] = candidate_profile
+            results.append(pipeline_result)
 
         # Sort by final score descending
         results.sort(key=lambda x: x["final_score"], reverse=True)
         return results[:top_n]
 
+    def get_best_matches(self, user_profile: Dict[str, Any], top_n: int = 5, shortlist_size: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Retrieves, scores, and ranks all potential candidates from the database.
+        If shortlist_size is set, candidates are first ranked by the vectorized scoring
+        engine and only the shortlist goes through the full agent pipeline.
+        """
+        ranked = []
+        for frame in self.iter_best_matches(user_profile, top_n=top_n, shortlist_size=shortlist_size, snapshot_every=0):
+            if frame["event"] == "final":
+                ranked = frame["data"]
+        return ranked
+
 # Singleton instance
 match_pipeline = MatchPipeline()
 
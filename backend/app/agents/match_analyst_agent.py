@@ -0,0 +1,201 @@
+import os
+import json
+from typing import Dict, Any, Optional
+from services.llm_gateway import llm_gateway
+from services.tracing import stage_metrics
+from services.prompt_encoding import PROFILE_KEY_LEGEND, profile_json
+from agents.match_scorer_agent import match_scorer_agent
+from agents.red_flag_agent import red_flag_agent, CONFLICT_OUTPUT_SCHEMA
+from agents.wingman_agent import match_explainer_agent, EXPLANATION_OUTPUT_SCHEMA
+
+# ----------------------------
+GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+if not GROQ_API_KEY:
+    print("⚠ No GROQ_API_KEY found. MatchAnalystAgent will use fallback logic.")
+
+# Fused output schema: scoring, conflicts and explanation in a single tool call
+ANALYSIS_OUTPUT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "score": {"type": "integer"},
+        "reasons": {"type": "array", "items": {"type": "string"}},
+        "red_flags": CONFLICT_OUTPUT_SCHEMA["properties"]["red_flags"],
+        "summary_explanation": EXPLANATION_OUTPUT_SCHEMA["properties"]["summary_explanation"],
+        "negotiation_checklist": EXPLANATION_OUTPUT_SCHEMA["properties"]["negotiation_checklist"],
+    },
+    "required": ["score", "reasons", "red_flags", "summary_explanation", "negotiation_checklist"],
+}
+
+
+class MatchAnalystAgent:
+    """
+    Scores a seeker/candidate pair, detects red flags and writes the explanation
+    in one Groq round-trip. Any section missing or malformed in the response is
+    filled in by the corresponding agent's rule-based fallback.
+    """
+
+    def __init__(self, api_key: Optional[str] = GROQ_API_KEY, model_name: str = "openai/gpt-oss-120b"):
+        if not api_key:
+            self.client = None
+        else:
+            self.client = llm_gateway
+        self.model_name = model_name
+
+        # Per-agent rule-based fallbacks for partial failures
+        self.scorer = match_scorer_agent
+        self.flagger = red_flag_agent
+        self.explainer = match_explainer_agent
+
+    def _get_system_prompt(self) -> str:
+        """System prompt covering the scorer, red flag and explainer tasks."""
+        return (
+            "You are a Roommate Compatibility Analyst, Conflict Detector and Negotiator in one. "
+            "Given two roommate profiles, return a single structured analysis.\n\n"
+            "⚠ OUTPUT RULE: Return JSON exactly matching keys: 'score', 'reasons', 'red_flags', "
+            "'summary_explanation', 'negotiation_checklist'. Do not add extra commentary.\n\n"
+            "- score: integer 0-100 (100 = perfect match). reasons: 2-3 concise strings.\n"
+            "- red_flags: each with 'type', 'severity', 'evidence'. Severity rubric:\n"
+            "  HIGH: Dealbreaker (Sleep, Major Cleanliness, Budget>30%)\n"
+            "  MEDIUM: Manageable friction (Study, Food, Noise mismatches)\n"
+            "  LOW: Minor nuisance\n"
+            "- summary_explanation: short, human-friendly summary of the match.\n"
+            "- negotiation_checklist: 2-3 items with 'suggestion' and 'category', built only from "
+            "HIGH and MEDIUM red flags. Empty if there are none.\n"
+            + PROFILE_KEY_LEGEND
+        )
+
+    def _build_analysis_request(self, profile_a: Dict[str, Any], profile_b: Dict[str, Any]) -> Dict[str, Any]:
+        """Chat completion arguments for the fused analysis tool call."""
+        user_prompt = (
+            f"Profile A: {profile_json(profile_a)}\n"
+            f"Profile B: {profile_json(profile_b)}\n"
+            "Generate the JSON output as per schema."
+        )
+
+        tool = {
+            "type": "function",
+            "function": {
+                "name": "return_analysis",
+                "description": "Returns score, reasons, red flags, explanation and negotiation checklist.",
+                "parameters": ANALYSIS_OUTPUT_SCHEMA,
+            },
+        }
+
+        return dict(
+            prompt_name="analysis",
+            model=self.model_name,
+            messages=[
+                {"role": "system", "content": self._get_system_prompt()},
+                {"role": "user", "content": user_prompt},
+            ],
+            tools=[tool],
+            tool_choice={"type": "function", "function": {"name": "return_analysis"}},
+            temperature=0.0,
+        )
+
+    @staticmethod
+    def _parse_analysis_completion(chat_completion: Any) -> Dict[str, Any]:
+        """Extracts the (possibly partial) fused analysis from the tool call."""
+        tool_calls = chat_completion.choices[0].message.tool_calls
+        if not tool_calls:
+            print("⚠ LLM did not call tool. Using rule-based fallback.")
+            stage_metrics.count("fallback.analyst")
+            return {}
+        output = json.loads(tool_calls[0].function.arguments)
+        return output if isinstance(output, dict) else {}
+
+    def _analyze_llm(self, profile_a: Dict[str, Any], profile_b: Dict[str, Any]) -> Dict[str, Any]:
+        """Single Groq call returning the fused analysis (may be partial)."""
+        chat_completion = self.client.chat_completion(**self._build_analysis_request(profile_a, profile_b))
+        return self._parse_analysis_completion(chat_completion)
+
+    @staticmethod
+    def _valid_red_flags(red_flags: Any) -> bool:
+        return isinstance(red_flags, list) and all(
+            isinstance(f, dict) and all(k in f for k in ("type", "severity", "evidence")) for f in red_flags
+        )
+
+    @staticmethod
+    def _valid_checklist(checklist: Any) -> bool:
+        return isinstance(checklist, list) and all(
+            isinstance(item, dict) and "suggestion" in item and "category" in item for item in checklist
+        )
+
+    def analyze_pair(self, profile_a: Dict[str, Any], profile_b: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Main method: returns score, reasons, red_flags, summary_explanation and
+        negotiation_checklist for a pair, filling any failed section from fallbacks.
+        """
+        llm_output: Dict[str, Any] = {}
+        if self.client:
+            try:
+                llm_output = self._analyze_llm(profile_a, profile_b)
+            except Exception as e:
+                print(f"⚠ Groq API/Execution Error: {e}. Falling back to rule-based logic.")
+                stage_metrics.count("fallback.analyst")
+        else:
+            print("⚠ Groq client not initialized. Using rule-based fallback.")
+            stage_metrics.count("fallback.analyst")
+
+        return self._merge_with_fallbacks(llm_output, profile_a, profile_b)
+
+    async def analyze_pair_async(self, profile_a: Dict[str, Any], profile_b: Dict[str, Any]) -> Dict[str, Any]:
+        """Async variant of analyze_pair using the shared async LLM pool."""
+        llm_output: Dict[str, Any] = {}
+        if self.client:
+            try:
+                chat_completion = await self.client.chat_completion_async(**self._build_analysis_request(profile_a, profile_b))
+                llm_output = self._parse_analysis_completion(chat_completion)
+            except Exception as e:
+                print(f"⚠ Groq API/Execution Error: {e}. Falling back to rule-based logic.")
+                stage_metrics.count("fallback.analyst")
+
+        return self._merge_with_fallbacks(llm_output, profile_a, profile_b)
+
+    def _merge_with_fallbacks(self, llm_output: Dict[str, Any], profile_a: Dict[str, Any], profile_b: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Validates each section of the LLM output and fills failed ones from rule-based
+        fallbacks. Any filled section marks the result degraded so it is not cached.
+        """
+        # 1. Score & reasons
+        try:
+            score = min(max(int(llm_output["score"]), 0), 100)
+            reasons = llm_output["reasons"]
+            if not isinstance(reasons, list):
+                # A string would otherwise be split into single-character reasons
+                raise TypeError("reasons is not a list")
+            reasons = [str(r) for r in reasons]
+        except (KeyError, TypeError, ValueError):
+            llm_gateway.mark_degraded()
+            scoring = self.scorer._rule_based_fallback(profile_a, profile_b)
+            score, reasons = scoring["score"], scoring["reasons"]
+
+        # 2. Red flags
+        red_flags = llm_output.get("red_flags")
+        if not self._valid_red_flags(red_flags):
+            llm_gateway.mark_degraded()
+            pair_id = f"{profile_a.get('id', 'P-A')}_{profile_b.get('id', 'P-B')}"
+            red_flags = self.flagger._rule_based_fallback(pair_id, profile_a, profile_b)["red_flags"]
+
+        # 3. Explanation & checklist
+        summary = llm_output.get("summary_explanation")
+        checklist = llm_output.get("negotiation_checklist")
+        if not isinstance(summary, str) or not summary or not self._valid_checklist(checklist):
+            llm_gateway.mark_degraded()
+            explanation = self.explainer._rule_based_fallback(score, reasons, red_flags)
+            summary, checklist = explanation["summary_explanation"], explanation["negotiation_checklist"]
+
+        return {
+            "score": score,
+            "reasons": reasons,
+            "red_flags": red_flags,
+            "summary_explanation": summary,
+            "negotiation_checklist": checklist,
+        }
+
+# Global instance
+match_analyst_agent: Optional[MatchAnalystAgent] = None
+try:
+    match_analyst_agent = MatchAnalystAgent(api_key=GROQ_API_KEY)
+except Exception as e:
+    print(f"⚠ Failed to initialize MatchAnalystAgent: {e}")
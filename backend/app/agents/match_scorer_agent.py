@@ -3,8 +3,10 @@ import re
 import json
 from typing import List, Dict, Any, Union
 from pydantic import BaseModel
-from groq import Groq
-from db.mongo import get_profiles_collection
+from services.llm_gateway import llm_gateway
+from services.tracing import stage_metrics
+from services.prompt_encoding import PROFILE_KEY_LEGEND, encode_profile, profile_json, dumps_compact, estimate_tokens
+from db.mongo import get_profiles_collection, build_candidate_query, CANDIDATE_PROJECTION
 from routes.profiles.profiles_response_schemas import ProfileResponse
 
 # --- Result Schema ---
@@ -16,6 +18,8 @@ class MatchResult(BaseModel):
 # --- Main Agent ---
 class MatchScorerAgent:
     GROQ_MODEL = "openai/gpt-oss-120b"
+    # Rough prompt budget for one batched request (~4 chars per token)
+    BATCH_MAX_PROMPT_TOKENS = 6000
 
     def __init__(self):  # <-- fix here
         if "GROQ_API_KEY" not in os.environ:
@@ -23,7 +27,7 @@ class MatchScorerAgent:
             print("⚠ GROQ_API_KEY not found. Agent will use fallback logic.")
             self.client = None
         else:
-            self.client = Groq(api_key=os.environ["GROQ_API_KEY"])
+            self.client = llm_gateway
 
     def _rule_based_fallback(self, profile_a: Dict[str, Any], profile_b: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -44,43 +48,44 @@ class MatchScorerAgent:
         else:
             reasons.append("Budgets differ significantly")
 
-        # 2. Match on core preferences
-        if profile_a.get("sleep_schedule") == profile_b.get("sleep_schedule"):
+        # 2. Match on core preferences (a field missing on both sides is not a match)
+        def same(field: str) -> bool:
+            value = profile_a.get(field)
+            return value is not None and value == profile_b.get(field)
+
+        if same("sleep_schedule"):
             score += 20
             reasons.append("Sleep schedules match")
-        if profile_a.get("cleanliness") == profile_b.get("cleanliness"):
+        if same("cleanliness"):
             score += 20
             reasons.append("Cleanliness preferences match")
-        if profile_a.get("noise_tolerance") == profile_b.get("noise_tolerance"):
+        if same("noise_tolerance"):
             score += 15
             reasons.append("Noise tolerance matches")
-        if profile_a.get("study_habits") == profile_b.get("study_habits"):
+        if same("study_habits"):
             score += 15
             reasons.append("Study habits match")
         
         return {"score": min(score, 100), "reasons": reasons}
 
-    def _score_profiles_llm(self, profile_a: Dict[str, Any], profile_b: Dict[str, Any]) -> Dict[str, Any]:
-        """
-        Uses Groq LLM to compute a nuanced compatibility score and reasons.
-        """
+    def _build_score_request(self, profile_a: Dict[str, Any], profile_b: Dict[str, Any]) -> Dict[str, Any]:
+        """Chat completion arguments for scoring one pair."""
         system_prompt = """
         You are a Roommate Compatibility Analyst. Your task is to analyze two roommate profiles and determine their compatibility.
         Provide a single JSON object as your output. The JSON must contain a 'score' (an integer from 0 to 100) and a list of 'reasons' (strings) for that score.
         A score of 100 means a perfect match, while 0 means a terrible match. Base your score on all provided information, including personality traits, habits, and budget.
         Be concise and direct in your analysis.
-        """
-        
-        user_prompt = f"""
-        Profile A: {json.dumps(profile_a, indent=2)}
-        ---
-        Profile B: {json.dumps(profile_b, indent=2)}
-        ---
-        Based on these two profiles, what is the compatibility score out of 100?
-        Provide the score and 2-3 key reasons in a JSON format.
-        """
+        """ + PROFILE_KEY_LEGEND
+
+        user_prompt = (
+            f"Profile A: {profile_json(profile_a)}\n"
+            f"Profile B: {profile_json(profile_b)}\n"
+            "Based on these two profiles, what is the compatibility score out of 100? "
+            "Provide the score and 2-3 key reasons in a JSON format."
+        )
 
-        chat_completion = self.client.chat.completions.create(
+        return dict(
+            prompt_name="score_pair",
             model=self.GROQ_MODEL,
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -90,8 +95,8 @@ class MatchScorerAgent:
             temperature=0.0,
         )
 
-        content = chat_completion.choices[0].message.content
-        
+    def _parse_score_content(self, content: str) -> Dict[str, Any]:
+        """Parses the scorer's JSON reply, tolerating markdown code fences."""
         # Robust parsing: Remove markdown code blocks if present
         try:
             cleaned_content = content
@@ -103,8 +108,109 @@ class MatchScorerAgent:
             return json.loads(cleaned_content.strip())
         except Exception:
             print(f"Failed to parse LLM response: {content[:100]}...")
-            # Return a dummy structure that will trigger fallback or be safe
-            return {"score": 0, "reasons": ["Error parsing AI response"]}
+            # Callers fall back to rule-based scoring rather than reporting a score of 0
+            raise ValueError("Unparseable scoring response")
+
+    @staticmethod
+    def _normalize_llm_score(llm_output: Dict[str, Any]) -> Dict[str, Any]:
+        # Ensure the LLM output is a valid number and list
+        score = min(max(int(llm_output.get("score", 0)), 0), 100)
+        reasons = llm_output.get("reasons", [])
+        return {"score": score, "reasons": reasons}
+
+    def _score_profiles_llm(self, profile_a: Dict[str, Any], profile_b: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Uses Groq LLM to compute a nuanced compatibility score and reasons.
+        """
+        chat_completion = self.client.chat_completion(**self._build_score_request(profile_a, profile_b))
+        return self._parse_score_content(chat_completion.choices[0].message.content)
+
+    @staticmethod
+    def _candidate_id(candidate: Dict[str, Any]) -> str:
+        return str(candidate.get("id") or candidate.get("_id"))
+
+    def _chunk_candidates(self, seeker_json: str, candidates: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """Splits candidates into chunks whose serialized prompt fits the token budget."""
+        budget = self.BATCH_MAX_PROMPT_TOKENS - estimate_tokens(seeker_json)
+        chunks, current, used = [], [], 0
+        for candidate in candidates:
+            cost = estimate_tokens(profile_json(candidate, include_id=True))
+            if current and used + cost > budget:
+                chunks.append(current)
+                current, used = [], 0
+            current.append(candidate)
+            used += cost
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def _score_many_llm(self, seeker_json: str, candidates: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Scores one chunk of candidates against the seeker in a single chat completion.
+        Returns the raw entries keyed by candidate id.
+        """
+        system_prompt = """
+        You are a Roommate Compatibility Analyst. Your task is to compare one Seeker profile against several Candidate profiles.
+        Provide a single JSON object as your output: {"results": [{"id": <candidate id>, "score": <integer 0-100>, "reasons": [<strings>]}]}.
+        Return exactly one entry per candidate, using the candidate's "id" unchanged.
+        A score of 100 means a perfect match, while 0 means a terrible match. Base your score on all provided information, including personality traits, habits, and budget.
+        Be concise and direct in your analysis, with 2-3 key reasons per candidate.
+        """ + PROFILE_KEY_LEGEND
+
+        candidates_json = dumps_compact([encode_profile(c, include_id=True) for c in candidates])
+        user_prompt = f"Seeker: {seeker_json}\nCandidates: {candidates_json}"
+
+        chat_completion = self.client.chat_completion(
+            prompt_name="score_batch",
+            model=self.GROQ_MODEL,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+            response_format={"type": "json_object"},
+            temperature=0.0,
+        )
+
+        content = json.loads(chat_completion.choices[0].message.content)
+        entries = content.get("results", []) if isinstance(content, dict) else []
+        return {str(e.get("id")): e for e in entries if isinstance(e, dict)}
+
+    def score_many(
+        self, seeker: Union[Dict[str, Any], ProfileResponse], candidates: List[Dict[str, Any]]
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Scores many candidates against one seeker, packing them into as few LLM requests
+        as the token budget allows. Returns {candidate_id: {"score", "reasons"}}, in
+        candidate order. Missing or malformed entries fall back to rule-based scoring for
+        that candidate only and are tagged "degraded": True, since the batch may run
+        outside the candidate's track_degradation scope.
+        """
+        seeker_dict = seeker.dict() if isinstance(seeker, ProfileResponse) else seeker
+        results: Dict[str, Dict[str, Any]] = {}
+
+        llm_entries: Dict[str, Any] = {}
+        if self.client and candidates:
+            seeker_json = profile_json(seeker_dict)
+            for chunk in self._chunk_candidates(seeker_json, candidates):
+                try:
+                    llm_entries.update(self._score_many_llm(seeker_json, chunk))
+                except Exception as e:
+                    print(f"⚠ Groq batch scoring failed for {len(chunk)} candidates: {e}. Falling back to rule-based logic.")
+                    stage_metrics.count("fallback.scorer")
+
+        for candidate in candidates:
+            candidate_id = self._candidate_id(candidate)
+            entry = llm_entries.get(candidate_id)
+            try:
+                score = min(max(int(entry["score"]), 0), 100)
+                reasons = entry["reasons"]
+                if not isinstance(reasons, list):
+                    raise ValueError("reasons must be a list")
+                results[candidate_id] = {"score": score, "reasons": [str(r) for r in reasons]}
+            except (KeyError, TypeError, ValueError):
+                results[candidate_id] = {**self._rule_based_fallback(seeker_dict, candidate), "degraded": True}
+
+        return results
 
     def score_profiles(
         self, profile_a: Union[Dict[str, Any], ProfileResponse], profile_b: Dict[str, Any]
@@ -118,54 +224,58 @@ class MatchScorerAgent:
             try:
                 # Tier 1: LLM-based scoring
                 llm_output = self._score_profiles_llm(profile_a_dict, profile_b)
-                # Ensure the LLM output is a valid number and list
-                score = min(max(int(llm_output.get("score", 0)), 0), 100)
-                reasons = llm_output.get("reasons", [])
-                return {"score": score, "reasons": reasons}
+                return self._normalize_llm_score(llm_output)
             except Exception as e:
                 # Tier 2: Fallback to rule-based scoring on API failure
                 print(f"⚠ Groq API call failed for scoring: {e}. Falling back to rule-based logic.")
+                stage_metrics.count("fallback.scorer")
+                llm_gateway.mark_degraded()
                 return self._rule_based_fallback(profile_a_dict, profile_b)
         else:
             # Tier 3: Use rule-based scoring directly if no API key is available
             print("⚠ No Groq client. Using rule-based scoring.")
+            llm_gateway.mark_degraded()
             return self._rule_based_fallback(profile_a_dict, profile_b)
 
+    async def score_profiles_async(self, profile_a: Dict[str, Any], profile_b: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Async variant of score_profiles using the shared async LLM pool.
+        """
+        if not self.client:
+            llm_gateway.mark_degraded()
+            return self._rule_based_fallback(profile_a, profile_b)
+        try:
+            chat_completion = await self.client.chat_completion_async(**self._build_score_request(profile_a, profile_b))
+            llm_output = self._parse_score_content(chat_completion.choices[0].message.content)
+            return self._normalize_llm_score(llm_output)
+        except Exception as e:
+            print(f"⚠ Groq API call failed for scoring: {e}. Falling back to rule-based logic.")
+            stage_metrics.count("fallback.scorer")
+            llm_gateway.mark_degraded()
+            return self._rule_based_fallback(profile_a, profile_b)
+
     def get_best_matches(
         self, user_profile: Union[Dict[str, Any], ProfileResponse], top_n: int = 5
     ) -> List[MatchResult]:
         """
         Returns top N recommended roommate profiles for the given user profile.
-        Compares against ALL profiles in the database, skipping the user's own profile.
+        Compares against profiles in the user's city, skipping the user's own profile.
         """
         user_profile_dict = user_profile.dict() if isinstance(user_profile, ProfileResponse) else user_profile
 
         profiles_collection = get_profiles_collection()
         
-        # Optimization: Pre-filter by city to reduce candidate pool
-        query = {}
-        user_city = user_profile_dict.get("city")
-        if user_city:
-            query["city"] = {"$regex": f"^{user_city}$", "$options": "i"} # Case-insensitive match
-            
-        candidate_profiles = list(profiles_collection.find(query))
-        
-        # If too many candidates, limit to recent/random 20 to prevent timeout
-        # Ideally this should be paginated or async, but for now we clamp it.
-        if len(candidate_profiles) > 20:
-             candidate_profiles = candidate_profiles[:20]
-
-        results: List[MatchResult] = []
+        # Self exclusion, city and required fields are filtered server-side on indexed fields.
+        # If too many candidates, limit to 20 to prevent timeout.
+        query = build_candidate_query(user_profile_dict)
+        valid_candidates = list(profiles_collection.find(query, CANDIDATE_PROJECTION).limit(20))
 
-        for candidate in candidate_profiles:
-            if str(candidate["_id"]) == user_profile_dict.get("id"):
-                continue  # Skip the user's own profile
-                
-            # Skip invalid profiles
-            if not candidate.get("full_name") or not candidate.get("city"):
-                continue
+        # Score all candidates in batched LLM requests
+        scores = self.score_many(user_profile_dict, valid_candidates)
 
-            score_data = self.score_profiles(user_profile_dict, candidate)
+        results: List[MatchResult] = []
+        for candidate in valid_candidates:
+            score_data = scores[self._candidate_id(candidate)]
             results.append(MatchResult(
                 profile_id=str(candidate["_id"]),
                 score=score_data["score"],
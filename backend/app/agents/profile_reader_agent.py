@@ -1,15 +1,18 @@
 import os
 import re
 import json
-from typing import Dict, Any, Optional
-from groq import Groq
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from services.llm_gateway import llm_gateway, Priority
+from services.tracing import stage_metrics, span
+from services.profile_cache import ProfileParseCache
+from services.near_duplicate import NearDuplicateIndex
+from services.profile_classifier import LocalProfileClassifier, extract_budget, extract_age
+from services.profile_keywords import match_profile_fields
 from pydantic import ValidationError
 from models.profile import ProfileCreate, SleepSchedule, Cleanliness, NoiseTolerance, StudyHabits, FoodPref
 
-# --- Low-Bandwidth and Offline Alternative Imports ---
-import sqlite3
-import time
-
 # Groq Profile Reader Agent with Offline Capabilities
 class ProfileReaderAgent:
     PHONE_NUMBER_REGEX = r'(?:\+92|03)\s?[-]?\s?\d{2,3}\s?[-]?\d{7,8}'
@@ -17,84 +20,85 @@ class ProfileReaderAgent:
     def __init__(self, api_key: str, model_name: str = "openai/gpt-oss-120b", cache_db_path: str = "profile_cache.db"):
         if not api_key:
             raise ValueError("❌ Groq API key not provided. Please set GROQ_API_KEY.")
-        self.client = Groq(api_key=api_key)
+        self.client = llm_gateway
         self.model_name = model_name
         self.cache_db_path = cache_db_path
-        self._init_db()
-
-    def _init_db(self):
-        """Initializes the SQLite database for caching parsed profiles."""
-        conn = sqlite3.connect(self.cache_db_path)
-        cursor = conn.cursor()
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS parsed_profiles (
-                raw_text TEXT PRIMARY KEY,
-                parsed_json TEXT,
-                timestamp INTEGER
+        # Offline/low-bandwidth support: parsed ads are served from a local two-tier cache
+        self.cache = ProfileParseCache(
+            db_path=cache_db_path,
+            ttl_seconds=int(os.getenv("PROFILE_CACHE_TTL_SECONDS", str(30 * 24 * 3600))),
+            max_memory_entries=int(os.getenv("PROFILE_CACHE_MEMORY_ENTRIES", "5000")),
+            max_entries=int(os.getenv("PROFILE_CACHE_MAX_ENTRIES", "100000")),
+            pool_size=int(os.getenv("PROFILE_CACHE_POOL_SIZE", "4")),
+        )
+        # Shared by all batch requests, so concurrent imports stay within one bound on LLM calls
+        self._batch_executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv("PROFILE_BATCH_WORKERS", "8")), thread_name_prefix="profile-parse"
+        )
+        # Reposted ads that differ only in phone numbers, emoji, punctuation or sentence order
+        self.near_duplicates: Optional[NearDuplicateIndex] = None
+        if os.getenv("PROFILE_DEDUP_ENABLED", "true").lower() in ("1", "true", "yes"):
+            self.near_duplicates = NearDuplicateIndex(
+                self.cache.pool,
+                threshold=float(os.getenv("PROFILE_DEDUP_THRESHOLD", "0.8")),
+                num_perm=int(os.getenv("PROFILE_DEDUP_NUM_PERM", "64")),
+                bands=int(os.getenv("PROFILE_DEDUP_BANDS", "16")),
+            )
+        # Local classifier trained on cached LLM parses (train_profile_classifier.py)
+        self.local_classifier: Optional[LocalProfileClassifier] = None
+        if os.getenv("PROFILE_CLASSIFIER_ENABLED", "true").lower() in ("1", "true", "yes"):
+            self.local_classifier = LocalProfileClassifier.load(
+                os.getenv("PROFILE_CLASSIFIER_PATH", "profile_classifier.json.gz"),
+                min_confidence=float(os.getenv("PROFILE_CLASSIFIER_MIN_CONFIDENCE", "0.85")),
+                min_slot_precision=float(os.getenv("PROFILE_CLASSIFIER_MIN_SLOT_PRECISION", "0.9")),
             )
-        """)
-        conn.commit()
-        conn.close()
 
     def _get_from_cache(self, raw_ad_text: str) -> Optional[Dict[str, Any]]:
         """Retrieves a parsed profile from the cache if it exists."""
-        conn = sqlite3.connect(self.cache_db_path)
-        cursor = conn.cursor()
-        cursor.execute("SELECT parsed_json FROM parsed_profiles WHERE raw_text = ?", (raw_ad_text,))
-        result = cursor.fetchone()
-        conn.close()
-        if result:
-            return json.loads(result[0])
-        return None
+        return self.cache.get(raw_ad_text)
 
     def _save_to_cache(self, raw_ad_text: str, parsed_profile: Dict[str, Any]):
-        """Saves a newly parsed profile to the cache."""
-        conn = sqlite3.connect(self.cache_db_path)
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT OR REPLACE INTO parsed_profiles (raw_text, parsed_json, timestamp) VALUES (?, ?, ?)",
-            (raw_ad_text, json.dumps(parsed_profile), int(time.time()))
-        )
-        conn.commit()
-        conn.close()
+        """Saves a newly parsed profile to the cache and indexes it for near-duplicate lookups."""
+        key = self.cache.put(raw_ad_text, parsed_profile)
+        if self.near_duplicates is not None:
+            self.near_duplicates.add(key, raw_ad_text)
+
+    def _get_near_duplicate(self, raw_ad_text: str) -> Optional[Dict[str, Any]]:
+        """Reuses the parse of a cached ad within the similarity threshold, if any."""
+        if self.near_duplicates is None:
+            return None
+        match = self.near_duplicates.query(raw_ad_text)
+        if match is None:
+            stage_metrics.count("cache.profile_reader_similar.miss")
+            return None
+        key, similarity = match
+        profile = self.cache.get_by_key(key, counter="cache.profile_reader_similar")
+        if profile is None:
+            # The cached parse has expired or been evicted since it was indexed
+            self.near_duplicates.remove(key)
+            return None
+        if profile.get("raw_profile_text"):
+            profile["raw_profile_text"] = raw_ad_text
+        print(f"✅ Reusing parse of a near-duplicate ad (similarity {similarity:.2f}).")
+        # Exact reposts of this variant now hit the cache directly
+        self.cache.put(raw_ad_text, profile, source="near_duplicate")
+        return profile
 
     def _rule_based_fallback(self, preprocessed_text: str) -> Dict[str, Any]:
-        """A simple, rule-based parser for use when the API fails."""
-        profile = {
-            "sleep_schedule": "Flexible",
-            "cleanliness": "Average",
-            "noise_tolerance": "Moderate",
-            "study_habits": "Library",
-            "food_pref": "Flexible"
-        }
-        text = preprocessed_text.lower()
-        
-        # Simple keyword matching for each category
-        if any(keyword in text for keyword in ["early bird", "wakes up early", "morning person"]):
-            profile["sleep_schedule"] = "Early Bird"
-        elif any(keyword in text for keyword in ["night owl", "stays up late", "late night"]):
-            profile["sleep_schedule"] = "Night Owl"
-
-        if any(keyword in text for keyword in ["neat freak", "very clean", "super tidy"]):
-            profile["cleanliness"] = "Very Clean"
-        elif any(keyword in text for keyword in ["a bit messy", "don't mind mess", "relaxed about cleaning"]):
-            profile["cleanliness"] = "A Bit Messy"
-
-        if any(keyword in text for keyword in ["quiet person", "need quiet", "low noise"]):
-            profile["noise_tolerance"] = "Low"
-        elif any(keyword in text for keyword in ["loud music", "parties", "friends over"]):
-            profile["noise_tolerance"] = "High"
-
-        if any(keyword in text for keyword in ["study a lot", "focus", "serious student"]):
-            profile["study_habits"] = "Quiet Room"
-        elif any(keyword in text for keyword in ["chill", "easygoing", "study on bed"]):
-            profile["study_habits"] = "Common Area"
-        
-        if any(keyword in text for keyword in ["vegetarian", "veg"]):
-            profile["food_pref"] = "Vegetarian Only"
-        elif any(keyword in text for keyword in ["eat out", "no cooking"]):
-            profile["food_pref"] = "Eats Out"
-        
+        """
+        Rule-based parser for use when the API fails: one pass of the compiled keyword
+        matcher for the enum fields and city, regexes for budget and age, and the same
+        placeholders the LLM uses for anything the ad does not state.
+        """
+        profile = {field: getattr(value, "value", value) for field, value in match_profile_fields(preprocessed_text).items()}
+        profile.update(
+            raw_profile_text=preprocessed_text,
+            area="Unknown",
+            budget_PKR=extract_budget(preprocessed_text, {}, profile) or 0,
+            age=extract_age(preprocessed_text, {}, profile) or 0,
+            occupation="Unknown",
+            full_name="Unknown",
+        )
         return profile
 
     def _preprocess(self, raw_ad_text: str) -> str:
@@ -130,7 +134,8 @@ class ProfileReaderAgent:
         {ProfileCreate.schema_json(indent=2)}
         """
 
-        chat_completion = self.client.chat.completions.create(
+        chat_completion = self.client.chat_completion(
+            prompt_name="profile_parse",
             model=self.model_name,
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -143,14 +148,44 @@ class ProfileReaderAgent:
 
     def parse_profile(self, raw_ad_text: str) -> Dict[str, Any]:
         """Main method: takes raw ad text and returns structured JSON using ProfileCreate schema."""
-        preprocessed_text = self._preprocess(raw_ad_text)
-        
-        # 1. Check for cached response
+        return self.parse_profile_with_source(raw_ad_text)[0]
+
+    def _classify_locally(self, preprocessed_text: str) -> Optional[Dict[str, Any]]:
+        """Local classifier parse when it is confident in every field, else None (escalate to the LLM)."""
+        if not self.local_classifier:
+            return None
+        with span("profile_reader.local_classifier"):
+            prediction = self.local_classifier.predict(preprocessed_text)
+        if prediction is None:
+            stage_metrics.count("profile_reader.local_classifier.escalated")
+            return None
+        try:
+            profile = ProfileCreate(**prediction).dict()
+        except ValidationError:
+            stage_metrics.count("profile_reader.local_classifier.escalated")
+            return None
+        stage_metrics.count("profile_reader.local_classifier.accepted")
+        # Cached for repeats, but tagged so it is never used as training data
+        self.cache.put(preprocessed_text, profile, source="local")
+        return profile
+
+    def _resolve_without_llm(self, preprocessed_text: str) -> Optional[Tuple[Dict[str, Any], str]]:
+        """Exact cache hit, a near-duplicate's parse or a confident local classification, with its source."""
         cached_profile = self._get_from_cache(preprocessed_text)
         if cached_profile:
             print("✅ Returning cached profile.")
-            return cached_profile
-        
+            return cached_profile, "cache"
+
+        similar_profile = self._get_near_duplicate(preprocessed_text)
+        if similar_profile:
+            return similar_profile, "near_duplicate"
+
+        local_profile = self._classify_locally(preprocessed_text)
+        if local_profile:
+            return local_profile, "local"
+        return None
+
+    def _parse_uncached(self, preprocessed_text: str) -> Tuple[Dict[str, Any], str]:
         try:
             # 2. Try to get response from Groq API
             llm_output = self._get_llm_response(preprocessed_text)
@@ -158,21 +193,78 @@ class ProfileReaderAgent:
             # 3. Validate and save to cache
             validated_profile = ProfileCreate(**llm_output)
             self._save_to_cache(preprocessed_text, validated_profile.dict())
-            return validated_profile.dict()
+            return validated_profile.dict(), "llm"
 
         except Exception as e:
             # 4. Graceful Fallback on API failure
             print(f"⚠ Groq API call failed: {e}. Falling back to rule-based parser.")
+            stage_metrics.count("fallback.profile_reader")
             rule_based_output = self._rule_based_fallback(preprocessed_text)
             
             try:
                 # 5. Validate fallback output
                 validated_profile = ProfileCreate(**rule_based_output)
-                return validated_profile.dict()
+                return validated_profile.dict(), "fallback"
             except ValidationError as ve:
                 # This should not happen if rule-based logic is correct
                 raise ValueError(f"Fallback Schema Validation Error: {ve.errors()}")
 
+    def parse_profile_with_source(self, raw_ad_text: str) -> Tuple[Dict[str, Any], str]:
+        """
+        parse_profile plus the source of the result: "cache", "near_duplicate",
+        "local" (local classifier), "llm" or "fallback" (rule-based parser after an LLM failure).
+        """
+        preprocessed_text = self._preprocess(raw_ad_text)
+
+        # 1. Check for cached response
+        cached = self._resolve_without_llm(preprocessed_text)
+        if cached:
+            return cached
+        return self._parse_uncached(preprocessed_text)
+
+    def parse_profile_without_llm(self, raw_ad_text: str) -> Optional[Tuple[Dict[str, Any], str]]:
+        """Cache, near-duplicate or local classifier result with its source, or None if the ad needs the LLM."""
+        return self._resolve_without_llm(self._preprocess(raw_ad_text))
+
+    def parse_profiles_batch(self, raw_ad_texts: List[str]) -> Iterator[Dict[str, Any]]:
+        """
+        Parses many ads, yielding one {"index", "status", "profile"/"error"} item per
+        input in input order. Ads that preprocess to the same text are parsed once,
+        cache hits and confident local classifications resolve immediately, and the
+        rest run concurrently on the shared batch pool at background LLM priority;
+        each item is yielded as soon as it and all earlier ones are done.
+        """
+        preprocessed = [self._preprocess(text) for text in raw_ad_texts]
+        resolved: Dict[str, Tuple[Dict[str, Any], str]] = {}
+        pending: Dict[str, Future] = {}
+        for text in preprocessed:
+            if text in resolved or text in pending:
+                continue
+            try:
+                cached = self._resolve_without_llm(text)
+            except Exception as e:
+                print(f"⚠ Profile cache lookup failed: {e}")
+                cached = None
+            if cached:
+                resolved[text] = cached
+            else:
+                # Bulk imports must not take the limiter capacity kept for interactive parses
+                with llm_gateway.priority(Priority.BACKGROUND):
+                    context = contextvars.copy_context()
+                pending[text] = self._batch_executor.submit(context.run, self._parse_uncached, text)
+
+        try:
+            for index, text in enumerate(preprocessed):
+                try:
+                    profile, source = resolved[text] if text in resolved else pending[text].result()
+                    yield {"index": index, "status": source, "profile": profile}
+                except Exception as e:
+                    yield {"index": index, "status": "error", "error": str(e)}
+        finally:
+            # Client went away: drop work that has not started yet
+            for future in pending.values():
+                future.cancel()
+
 
 # Global agent instance for re-use across the app
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
@@ -180,7 +272,9 @@ profile_reader: Optional[ProfileReaderAgent] = None
 
 if GROQ_API_KEY:
     try:
-        profile_reader = ProfileReaderAgent(api_key=GROQ_API_KEY)
+        profile_reader = ProfileReaderAgent(
+            api_key=GROQ_API_KEY, cache_db_path=os.getenv("PROFILE_CACHE_DB_PATH", "profile_cache.db")
+        )
     except Exception as e:
         print(f"⚠ Failed to initialize Groq Agent: {e}")
 else:
@@ -2,7 +2,10 @@ import os
 import re
 import json
 from typing import Dict, Any, Optional
-from groq import Groq
+from services.llm_gateway import llm_gateway
+from services.tracing import stage_metrics
+from services.prompt_encoding import PROFILE_KEY_LEGEND, profile_json
+from models.profile import SleepSchedule, Cleanliness, NoiseTolerance, StudyHabits
 
 # ----------------------------
 # Global Groq API key check
@@ -40,7 +43,7 @@ class RedFlagAgent:
         if not api_key:
             self.client = None
         else:
-            self.client = Groq(api_key=api_key)
+            self.client = llm_gateway
         self.model_name = model_name
 
     def _get_system_prompt(self) -> str:
@@ -55,7 +58,8 @@ class RedFlagAgent:
             "- HIGH: Dealbreaker, significant daily discomfort (Sleep, Major Cleanliness, Budget>30%)\n"
             "- MEDIUM: Manageable friction (Study, Food, Noise mismatches)\n"
             "- LOW: Minor nuisance (small differences)\n\n"
-            "Compare fields: Sleep, Cleanliness, Noise, Study, Food, Budget. Evidence must be concise."
+            "Compare fields: Sleep, Cleanliness, Noise, Study, Food, Budget. Evidence must be concise.\n"
+            + PROFILE_KEY_LEGEND
         )
 
     def _rule_based_fallback(self, pair_id: str, profile_a: Dict[str, Any], profile_b: Dict[str, Any]) -> Dict[str, Any]:
@@ -63,17 +67,17 @@ class RedFlagAgent:
         red_flags = []
         
         # Conflict 1: Sleep Schedule
-        if (profile_a.get("sleep_schedule") == "Early Bird" and profile_b.get("sleep_schedule") == "Night Owl") or \
-           (profile_a.get("sleep_schedule") == "Night Owl" and profile_b.get("sleep_schedule") == "Early Bird"):
+        sleep_pair = {profile_a.get("sleep_schedule"), profile_b.get("sleep_schedule")}
+        if sleep_pair == {SleepSchedule.EARLY_RISER.value, SleepSchedule.NIGHT_OWL.value}:
             red_flags.append({
                 "type": "Sleep Schedule Mismatch",
                 "severity": "HIGH",
-                "evidence": "One is an Early Bird, the other is a Night Owl."
+                "evidence": "One is an early riser, the other is a night owl."
             })
 
         # Conflict 2: Cleanliness
-        if (profile_a.get("cleanliness") == "Very Clean" and profile_b.get("cleanliness") == "A Bit Messy") or \
-           (profile_a.get("cleanliness") == "A Bit Messy" and profile_b.get("cleanliness") == "Very Clean"):
+        cleanliness_pair = {profile_a.get("cleanliness"), profile_b.get("cleanliness")}
+        if cleanliness_pair == {Cleanliness.TIDY.value, Cleanliness.MESSY.value}:
             red_flags.append({
                 "type": "Cleanliness Mismatch",
                 "severity": "HIGH",
@@ -81,8 +85,8 @@ class RedFlagAgent:
             })
         
         # Conflict 3: Noise Tolerance
-        if (profile_a.get("noise_tolerance") == "Low" and profile_b.get("noise_tolerance") == "High") or \
-           (profile_a.get("noise_tolerance") == "High" and profile_b.get("noise_tolerance") == "Low"):
+        noise_pair = {profile_a.get("noise_tolerance"), profile_b.get("noise_tolerance")}
+        if noise_pair == {NoiseTolerance.QUIET.value, NoiseTolerance.LOUD_OK.value}:
             red_flags.append({
                 "type": "Noise Tolerance Mismatch",
                 "severity": "MEDIUM",
@@ -90,12 +94,12 @@ class RedFlagAgent:
             })
 
         # Conflict 4: Study Habits
-        if (profile_a.get("study_habits") == "Quiet Room" and profile_b.get("study_habits") == "Common Area") or \
-           (profile_a.get("study_habits") == "Common Area" and profile_b.get("study_habits") == "Quiet Room"):
+        study_pair = {profile_a.get("study_habits"), profile_b.get("study_habits")}
+        if study_pair == {StudyHabits.ROOM_STUDY.value, StudyHabits.LATE_NIGHT.value}:
             red_flags.append({
                 "type": "Study Habits Mismatch",
                 "severity": "MEDIUM",
-                "evidence": "One needs a quiet room to study, the other is fine with a common area."
+                "evidence": "One studies in the room, the other studies late at night."
             })
         
         # Conflict 5: Budget
@@ -115,6 +119,50 @@ class RedFlagAgent:
             
         return {"pair_id": pair_id, "red_flags": red_flags}
 
+    def _build_conflict_request(self, pair_id: str, profile_a: Dict[str, Any], profile_b: Dict[str, Any]) -> Dict[str, Any]:
+        """Chat completion arguments for the conflict detection tool call."""
+        system_prompt = self._get_system_prompt()
+        user_prompt = (
+            f"Profile A: {profile_json(profile_a)}\n"
+            f"Profile B: {profile_json(profile_b)}\n"
+            f"Analyze conflicts and return a JSON object with 'pair_id': '{pair_id}' "
+            f"and structured 'red_flags' list."
+        )
+
+        tool = {
+            "type": "function",
+            "function": {
+                "name": "return_conflicts",
+                "description": "Returns structured red flags for roommate conflicts.",
+                "parameters": CONFLICT_OUTPUT_SCHEMA,
+            },
+        }
+
+        return dict(
+            prompt_name="red_flags",
+            model=self.model_name,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+            tools=[tool],
+            tool_choice={"type": "function", "function": {"name": "return_conflicts"}},
+            temperature=0.0,
+        )
+
+    def _parse_conflict_completion(self, chat_completion: Any, pair_id: str, profile_a: Dict[str, Any], profile_b: Dict[str, Any]) -> Dict[str, Any]:
+        """Extracts the tool call arguments, falling back to rules if the tool was not called."""
+        tool_calls = chat_completion.choices[0].message.tool_calls
+        if not tool_calls:
+            # Fallback if LLM doesn't call the tool for some reason
+            print("⚠ LLM did not call tool. Using rule-based fallback.")
+            stage_metrics.count("fallback.red_flags")
+            llm_gateway.mark_degraded()
+            return self._rule_based_fallback(pair_id, profile_a, profile_b)
+
+        function_args_str = tool_calls[0].function.arguments
+        return json.loads(function_args_str)
+
     def detect_conflicts(self, profile_a: Dict[str, Any], profile_b: Dict[str, Any]) -> Dict[str, Any]:
         """Main method: Takes two profiles and returns structured red-flag JSON."""
         pair_id = f"{profile_a.get('id', 'P-A')}_{profile_b.get('id', 'P-B')}"
@@ -122,49 +170,41 @@ class RedFlagAgent:
         # Check if Groq client is available
         if not self.client:
             print("⚠ Groq client not initialized. Using rule-based fallback.")
+            stage_metrics.count("fallback.red_flags")
+            llm_gateway.mark_degraded()
             return self._rule_based_fallback(pair_id, profile_a, profile_b)
         
         # Attempt to use the Groq API
         try:
-            system_prompt = self._get_system_prompt()
-            user_prompt = (
-                f"--- Profile A ---\n{json.dumps(profile_a)}\n\n"
-                f"--- Profile B ---\n{json.dumps(profile_b)}\n\n"
-                f"Analyze conflicts and return a JSON object with 'pair_id': '{pair_id}' "
-                f"and structured 'red_flags' list."
+            chat_completion = self.client.chat_completion(
+                **self._build_conflict_request(pair_id, profile_a, profile_b)
             )
+            return self._parse_conflict_completion(chat_completion, pair_id, profile_a, profile_b)
 
-            tool = {
-                "type": "function",
-                "function": {
-                    "name": "return_conflicts",
-                    "description": "Returns structured red flags for roommate conflicts.",
-                    "parameters": CONFLICT_OUTPUT_SCHEMA,
-                },
-            }
-
-            chat_completion = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt},
-                ],
-                tools=[tool],
-                tool_choice={"type": "function", "function": {"name": "return_conflicts"}},
-                temperature=0.0,
-            )
+        except Exception as e:
+            print(f"⚠ Groq API/Execution Error: {e}. Falling back to rule-based logic.")
+            stage_metrics.count("fallback.red_flags")
+            llm_gateway.mark_degraded()
+            return self._rule_based_fallback(pair_id, profile_a, profile_b)
+
+    async def detect_conflicts_async(self, profile_a: Dict[str, Any], profile_b: Dict[str, Any]) -> Dict[str, Any]:
+        """Async variant of detect_conflicts using the shared async LLM pool."""
+        pair_id = f"{profile_a.get('id', 'P-A')}_{profile_b.get('id', 'P-B')}"
 
-            tool_calls = chat_completion.choices[0].message.tool_calls
-            if not tool_calls:
-                # Fallback if LLM doesn't call the tool for some reason
-                print("⚠ LLM did not call tool. Using rule-based fallback.")
-                return self._rule_based_fallback(pair_id, profile_a, profile_b)
+        if not self.client:
+            llm_gateway.mark_degraded()
+            return self._rule_based_fallback(pair_id, profile_a, profile_b)
 
-            function_args_str = tool_calls[0].function.arguments
-            return json.loads(function_args_str)
+        try:
+            chat_completion = await self.client.chat_completion_async(
+                **self._build_conflict_request(pair_id, profile_a, profile_b)
+            )
+            return self._parse_conflict_completion(chat_completion, pair_id, profile_a, profile_b)
 
         except Exception as e:
             print(f"⚠ Groq API/Execution Error: {e}. Falling back to rule-based logic.")
+            stage_metrics.count("fallback.red_flags")
+            llm_gateway.mark_degraded()
             return self._rule_based_fallback(pair_id, profile_a, profile_b)
 
 # Global instance for reuse
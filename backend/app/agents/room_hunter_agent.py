@@ -3,7 +3,9 @@ import os
 import json
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
-from groq import Groq
+from services.llm_gateway import llm_gateway
+from services.tracing import stage_metrics
+from services.prompt_encoding import PROFILE_KEY_LEGEND, LISTING_KEY_LEGEND, profile_json, listing_json
 from bson import ObjectId
 from db.mongo import get_housing_collection
 from models.housing import Housing
@@ -19,33 +21,32 @@ class RoomHunterAgent:
             print("⚠ No GROQ_API_KEY found. RoomHunterAgent will use a rule-based fallback for explanations.")
             self.client = None
         else:
-            self.client = Groq(api_key=api_key)
+            self.client = llm_gateway
 
     def _generate_llm_reason(self, profile: Dict[str, Any], listing: Dict[str, Any], reasons: List[str]) -> str:
         """Generates a human-friendly reason using an LLM."""
         if not self.client:
             return "; ".join(reasons)[:self.MAX_REASON_LENGTH]
 
-        profile_safe = {k: str(v) if isinstance(v, ObjectId) else v for k, v in profile.items()}
-        listing_safe = {k: str(v) if isinstance(v, ObjectId) else v for k, v in listing.items()}
-
         system_prompt = (
             "You are a helpful Roommate Match Agent. Your job is to take a profile's preferences "
             "and a housing listing's details and generate a single, concise, human-friendly sentence "
             "explaining why the listing is a good match. Focus on key positive points like "
-            "city, area, budget, and amenities. Do not mention negative points."
+            "city, area, budget, and amenities. Do not mention negative points.\n"
+            f"{PROFILE_KEY_LEGEND}\n{LISTING_KEY_LEGEND}"
         )
 
         user_prompt = (
-            f"User Profile: {json.dumps(profile_safe)}\n"
-            f"Housing Listing: {json.dumps(listing_safe)}\n"
+            f"User Profile: {profile_json(profile)}\n"
+            f"Housing Listing: {listing_json(listing)}\n"
             f"Key matching reasons: {'; '.join(reasons)}\n"
             "Generate a one-sentence summary explaining why this listing is a great match. "
             "Start the sentence with 'This listing is a great match because...'"
         )
 
         try:
-            chat_completion = self.client.chat.completions.create(
+            chat_completion = self.client.chat_completion(
+                prompt_name="listing_reason",
                 model=self.GROQ_MODEL,
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -56,6 +57,7 @@ class RoomHunterAgent:
             return chat_completion.choices[0].message.content
         except Exception as e:
             print(f"⚠ LLM call failed: {e}. Falling back to rule-based reason.")
+            stage_metrics.count("fallback.room_hunter")
             return "; ".join(reasons)[:self.MAX_REASON_LENGTH]
 
     def score_listing(self, profile: Dict[str, Any], listing: Dict[str, Any]) -> Dict[str, Any]:
@@ -104,8 +106,8 @@ class RoomHunterAgent:
 
         return {"score": score, "reasons": list(dict.fromkeys(reasons))}
 
-    def get_top_housing_matches(self, profiles: List[Dict[str, Any]], top_n: int = 3) -> List[Housing]:
-        """Return top N housing listings for given profiles."""
+    def get_top_housing_matches(self, profiles: List[Dict[str, Any]], top_n: int = 3, use_llm: bool = True) -> List[Housing]:
+        """Return top N housing listings for given profiles. With use_llm off, reasons are rule-based only."""
         housing_collection = get_housing_collection()
         listings = list(housing_collection.find({"availability": "Available"}))
 
@@ -126,7 +128,10 @@ class RoomHunterAgent:
         for item in top_listings:
             l = item["listing"]
             _id = str(l.get("_id"))  # Always use MongoDB _id
-            reason_text = self._generate_llm_reason(profiles[0], l, item["reasons"])
+            if use_llm:
+                reason_text = self._generate_llm_reason(profiles[0], l, item["reasons"])
+            else:
+                reason_text = "; ".join(item["reasons"])[:self.MAX_REASON_LENGTH]
 
             results.append(Housing(
                 _id=_id,
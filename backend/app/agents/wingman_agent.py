@@ -1,7 +1,11 @@
 import os
 import json
 from typing import Dict, List, Any, Optional
-from groq import Groq
+from services.llm_gateway import llm_gateway
+from services.tracing import stage_metrics
+from services.prompt_encoding import dumps_compact
+from services.explanation_cache import explanation_cache, ExplanationCache
+from services.explanation_table import explanation_table, ExplanationTable
 
 # ----------------------------
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
@@ -29,18 +33,45 @@ EXPLANATION_OUTPUT_SCHEMA = {
 }
 
 
+def validate_explanation(output: Any) -> Optional[Dict[str, Any]]:
+    """The explanation reduced to the schema's fields, or None if any field is missing or mistyped."""
+    if not isinstance(output, dict):
+        return None
+    summary = output.get("summary_explanation")
+    checklist = output.get("negotiation_checklist")
+    if not isinstance(summary, str) or not summary.strip() or not isinstance(checklist, list):
+        return None
+    items = []
+    for item in checklist:
+        if not isinstance(item, dict):
+            return None
+        suggestion, category = item.get("suggestion"), item.get("category")
+        if not isinstance(suggestion, str) or not suggestion.strip() or not isinstance(category, str):
+            return None
+        items.append({"suggestion": suggestion, "category": category})
+    return {"summary_explanation": summary, "negotiation_checklist": items}
+
+
 class MatchExplainerAgent:
     """
     Converts match score, reasons, and red flags into a human-friendly summary
     and actionable negotiation checklist using Groq LLM, with a graceful fallback.
     """
 
-    def __init__(self, api_key: Optional[str] = GROQ_API_KEY, model_name: str = "openai/gpt-oss-120b"):
+    def __init__(
+        self,
+        api_key: Optional[str] = GROQ_API_KEY,
+        model_name: str = "openai/gpt-oss-120b",
+        cache: Optional[ExplanationCache] = explanation_cache,
+        table: Optional[ExplanationTable] = explanation_table,
+    ):
         if not api_key:
             self.client = None
         else:
-            self.client = Groq(api_key=api_key)
+            self.client = llm_gateway
         self.model_name = model_name
+        self.cache = cache
+        self.table = table
 
     def _get_system_prompt(self) -> str:
         """System prompt guiding LLM to output structured explanation and checklist."""
@@ -97,21 +128,16 @@ class MatchExplainerAgent:
             "negotiation_checklist": unique_checklist[:3]
         }
 
-    def generate_explanation(
+    def _build_explanation_request(
         self, match_score: int, match_reasons: List[str], red_flags: List[Dict[str, Any]]
     ) -> Dict[str, Any]:
-        """Main method: generates structured explanation and negotiation checklist."""
-        
-        if not self.client:
-            print("⚠ Groq client not initialized. Using rule-based fallback.")
-            return self._rule_based_fallback(match_score, match_reasons, red_flags)
-
+        """Chat completion arguments for the explanation tool call."""
         system_prompt = self._get_system_prompt()
 
         user_prompt = (
             f"Match Score: {match_score}/100\n"
-            f"Reasons: {json.dumps(match_reasons)}\n"
-            f"Red Flags: {json.dumps(red_flags)}\n\n"
+            f"Reasons: {dumps_compact(match_reasons)}\n"
+            f"Red Flags: {dumps_compact(red_flags)}\n\n"
             "Generate the JSON output as per schema."
         )
 
@@ -124,29 +150,110 @@ class MatchExplainerAgent:
             },
         }
 
+        return dict(
+            prompt_name="explanation",
+            model=self.model_name,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+            tools=[tool],
+            tool_choice={"type": "function", "function": {"name": "return_explanation"}},
+            temperature=0.0,
+        )
+
+    def _parse_explanation_completion(
+        self, chat_completion: Any, match_score: int, match_reasons: List[str], red_flags: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        Extracts the tool call arguments, falling back to rules if the tool was not
+        called or its output does not match the schema.
+        """
+        tool_calls = chat_completion.choices[0].message.tool_calls
+        if not tool_calls:
+            # Fallback if LLM doesn't call the tool for some reason
+            print("⚠ LLM did not call tool. Using rule-based fallback.")
+            stage_metrics.count("fallback.explainer")
+            llm_gateway.mark_degraded()
+            return self._rule_based_fallback(match_score, match_reasons, red_flags)
+
+        function_args_str = tool_calls[0].function.arguments
+        explanation = validate_explanation(json.loads(function_args_str))
+        if explanation is None:
+            print("⚠ LLM returned a malformed explanation. Using rule-based fallback.")
+            stage_metrics.count("fallback.explainer")
+            llm_gateway.mark_degraded()
+            return self._rule_based_fallback(match_score, match_reasons, red_flags)
+        # Only validated LLM output is memoized; rule-based fallbacks are cheap to recompute
+        if self.cache:
+            self.cache.put(match_score, match_reasons, red_flags, explanation)
+        return explanation
+
+    def _get_cached(
+        self, match_score: int, match_reasons: List[str], red_flags: List[Dict[str, Any]]
+    ) -> Optional[Dict[str, Any]]:
+        """Precomputed table entry for known flag combinations, else the memoized LLM output."""
+        if self.table:
+            precomputed = self.table.lookup(match_score, red_flags)
+            if precomputed is not None:
+                return precomputed
+        if not self.cache:
+            return None
+        try:
+            # Entries memoized before output validation existed may be malformed
+            return validate_explanation(self.cache.get(match_score, match_reasons, red_flags))
+        except Exception as e:
+            print(f"⚠ Explanation cache lookup failed: {e}")
+            return None
+
+    def generate_explanation(
+        self, match_score: int, match_reasons: List[str], red_flags: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Main method: generates structured explanation and negotiation checklist."""
+        cached = self._get_cached(match_score, match_reasons, red_flags)
+        if cached is not None:
+            return cached
+
+        if not self.client:
+            print("⚠ Groq client not initialized. Using rule-based fallback.")
+            stage_metrics.count("fallback.explainer")
+            llm_gateway.mark_degraded()
+            return self._rule_based_fallback(match_score, match_reasons, red_flags)
+
         try:
-            chat_completion = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt},
-                ],
-                tools=[tool],
-                tool_choice={"type": "function", "function": {"name": "return_explanation"}},
-                temperature=0.0,
+            chat_completion = self.client.chat_completion(
+                **self._build_explanation_request(match_score, match_reasons, red_flags)
             )
+            return self._parse_explanation_completion(chat_completion, match_score, match_reasons, red_flags)
+
+        except Exception as e:
+            print(f"⚠ Groq API/Execution Error: {e}. Falling back to rule-based logic.")
+            stage_metrics.count("fallback.explainer")
+            llm_gateway.mark_degraded()
+            return self._rule_based_fallback(match_score, match_reasons, red_flags)
+
+    async def generate_explanation_async(
+        self, match_score: int, match_reasons: List[str], red_flags: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Async variant of generate_explanation using the shared async LLM pool."""
+        cached = self._get_cached(match_score, match_reasons, red_flags)
+        if cached is not None:
+            return cached
 
-            tool_calls = chat_completion.choices[0].message.tool_calls
-            if not tool_calls:
-                # Fallback if LLM doesn't call the tool for some reason
-                print("⚠ LLM did not call tool. Using rule-based fallback.")
-                return self._rule_based_fallback(match_score, match_reasons, red_flags)
+        if not self.client:
+            llm_gateway.mark_degraded()
+            return self._rule_based_fallback(match_score, match_reasons, red_flags)
 
-            function_args_str = tool_calls[0].function.arguments
-            return json.loads(function_args_str)
+        try:
+            chat_completion = await self.client.chat_completion_async(
+                **self._build_explanation_request(match_score, match_reasons, red_flags)
+            )
+            return self._parse_explanation_completion(chat_completion, match_score, match_reasons, red_flags)
 
         except Exception as e:
             print(f"⚠ Groq API/Execution Error: {e}. Falling back to rule-based logic.")
+            stage_metrics.count("fallback.explainer")
+            llm_gateway.mark_degraded()
             return self._rule_based_fallback(match_score, match_reasons, red_flags)
 
 # Global instance
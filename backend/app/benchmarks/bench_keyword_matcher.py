@@ -0,0 +1,74 @@
+"""
+Microbenchmark for the rule-based profile parser's keyword matching.
+
+Compares the compiled single-pass matcher (services/profile_keywords.py) against
+scanning the text once per phrase of the same keyword table, which is what the
+old `any(keyword in text ...)` chain did, on synthetic ads of increasing length.
+
+Run from backend/app:
+    python -m benchmarks.bench_keyword_matcher
+    python -m benchmarks.bench_keyword_matcher --lengths 200,2000 --number 2000
+"""
+import os
+import sys
+import random
+import timeit
+import argparse
+from collections import Counter
+from typing import Any, Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.profile_keywords import PROFILE_KEYWORDS, PROFILE_DEFAULTS, match_profile_fields
+
+FILLER = (
+    "room available near campus with attached bath and wifi, looking for a decent roommate "
+    "kamra share karna hai, bijli ka bill alag, parking available, family area "
+).split()
+
+
+def per_keyword_scan(text: str) -> Dict[str, Any]:
+    """Baseline: one substring scan of the text per phrase, same table and tie-breaking."""
+    text = text.lower()
+    result = {}
+    for field, labels in PROFILE_KEYWORDS.items():
+        counts = Counter()
+        for label, phrases in labels:
+            for phrase in phrases:
+                if phrase in text:
+                    counts[label] += 1
+        result[field] = max(counts, key=counts.__getitem__) if counts else PROFILE_DEFAULTS[field]
+    return result
+
+
+def synthetic_ad(length: int, rng: random.Random) -> str:
+    """Filler text with a few keywords sprinkled in, about `length` characters long."""
+    phrases = [p for labels in PROFILE_KEYWORDS.values() for _, ps in labels for p in ps]
+    words: List[str] = []
+    while sum(len(w) + 1 for w in words) < length:
+        words.append(rng.choice(phrases) if rng.random() < 0.03 else rng.choice(FILLER))
+    return " ".join(words)[:length]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keyword matcher microbenchmark")
+    parser.add_argument("--lengths", default="100,1000,10000", help="Comma-separated ad lengths in characters")
+    parser.add_argument("--number", type=int, default=1000, help="Calls per measurement")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    phrase_count = sum(len(ps) for labels in PROFILE_KEYWORDS.values() for _, ps in labels)
+    print(f"⚡ {phrase_count} phrases, {args.number} calls x best of {args.repeat}")
+    print(f"  {'length':>8}  {'compiled us/ad':>15}  {'per-keyword us/ad':>18}  {'speedup':>8}")
+    for length in (int(n) for n in args.lengths.split(",") if n.strip()):
+        text = synthetic_ad(length, rng)
+        compiled = min(timeit.repeat(lambda: match_profile_fields(text), number=args.number, repeat=args.repeat))
+        scanned = min(timeit.repeat(lambda: per_keyword_scan(text), number=args.number, repeat=args.repeat))
+        compiled_us, scanned_us = compiled / args.number * 1e6, scanned / args.number * 1e6
+        print(f"  {length:>8}  {compiled_us:>15.2f}  {scanned_us:>18.2f}  {scanned_us / compiled_us:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""
+End-to-end benchmarks for the matching and housing paths.
+
+Seeds a throwaway database with synthetic profiles, listings and one user per
+dataset size, then measures the match pipeline, the housing agent and the
+profile/login routes. Each case reports latency percentiles, throughput, peak
+Python memory (tracemalloc) and MongoDB round-trips per operation, and the whole
+run is written as JSON so results can be compared across commits.
+
+Run from backend/app:
+    python -m benchmarks.run_benchmarks --sizes 100,1000 --output bench.json
+    python -m benchmarks.run_benchmarks --backend memory   # needs mongomock
+
+LLM calls go to the offline fake backend by default (services/fake_llm.py).
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import statistics
+import subprocess
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List
+
+# Must be set before the app modules (and their global agents) are imported
+os.environ.setdefault("LLM_BACKEND", "fake")
+os.environ.setdefault("GROQ_API_KEY", "offline")
+os.environ.setdefault("PAIR_CACHE_ENABLED", "false")
+os.environ.setdefault("EXPLANATION_CACHE_ENABLED", "false")
+os.environ.setdefault("EXPLANATION_TABLE_ENABLED", "false")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bcrypt
+from pymongo import MongoClient, monitoring
+import db.mongo as mongo
+from benchmarks.synthetic_data import generate_profiles, generate_listings, generate_user
+
+BENCH_PASSWORD = "bench-password"
+SEED_BATCH_SIZE = 5000
+
+
+class CommandCounter(monitoring.CommandListener):
+    """Counts commands sent to a real MongoDB server (one per round-trip)."""
+
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+class CountingCollection:
+    """In-memory backend: counts collection calls as round-trips (cursors count once)."""
+
+    def __init__(self, collection, counter: CommandCounter):
+        self._collection = collection
+        self._counter = counter
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            self._counter.count += 1
+            return attr(*args, **kwargs)
+        return call
+
+
+class CountingDatabase:
+    def __init__(self, database, counter: CommandCounter):
+        self._database = database
+        self._counter = counter
+
+    def __getitem__(self, name):
+        return CountingCollection(self._database[name], self._counter)
+
+    def __getattr__(self, name):
+        return getattr(self._database, name)
+
+
+def connect(backend: str, mongo_uri: str, db_name: str, counter: CommandCounter):
+    """Points db.mongo at a benchmark database; returns (client, raw database)."""
+    if backend == "memory":
+        try:
+            import mongomock
+        except ImportError:
+            sys.exit("The memory backend needs mongomock (pip install mongomock).")
+        client = mongomock.MongoClient()
+        database = client[db_name]
+        mongo.db = CountingDatabase(database, counter)
+    else:
+        client = MongoClient(mongo_uri, serverSelectionTimeoutMS=5000, event_listeners=[counter])
+        database = client[db_name]
+        mongo.db = database
+    mongo.client = client
+    return client, database
+
+
+def seed(database, size: int, rng: random.Random) -> Dict[str, Any]:
+    """Inserts `size` profiles and listings plus one user owning the first profile."""
+    for name in ("profiles", "housing", "users", "match_results"):
+        database[name].drop()
+
+    profiles = generate_profiles(size, rng)
+    for start in range(0, size, SEED_BATCH_SIZE):
+        database["profiles"].insert_many(profiles[start:start + SEED_BATCH_SIZE])
+    listings = generate_listings(size, rng)
+    for start in range(0, size, SEED_BATCH_SIZE):
+        database["housing"].insert_many(listings[start:start + SEED_BATCH_SIZE])
+
+    seeker = profiles[0]
+    password_hash = bcrypt.hashpw(BENCH_PASSWORD.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    user = generate_user(str(seeker["_id"]), "bench@example.com", password_hash)
+    database["users"].insert_one(user)
+
+    database["profiles"].create_index([("city_norm", 1), ("budget_PKR", 1)], name="city_budget")
+    database["users"].create_index([("email", 1)], name="email")
+    return {"seeker": seeker, "user": user}
+
+
+def percentiles(samples_ms: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples_ms)
+
+    def pick(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+    return {
+        "p50": round(pick(50), 3),
+        "p90": round(pick(90), 3),
+        "p99": round(pick(99), 3),
+        "mean": round(statistics.fmean(ordered), 3),
+        "min": round(ordered[0], 3),
+        "max": round(ordered[-1], 3),
+    }
+
+
+def measure(name: str, size: int, fn: Callable[[], Any], iterations: int, counter: CommandCounter) -> Dict[str, Any]:
+    """Runs fn once to warm up, then `iterations` times under tracemalloc."""
+    fn()
+    samples, start_count = [], counter.count
+    tracemalloc.start()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = {
+        "case": name,
+        "size": size,
+        "iterations": iterations,
+        "latency_ms": percentiles(samples),
+        "throughput_ops_s": round(iterations / elapsed, 3) if elapsed else None,
+        "peak_memory_mb": round(peak / (1024 * 1024), 3),
+        "db_round_trips_per_op": round((counter.count - start_count) / iterations, 2),
+    }
+    print(f"  {name:<28} p50={result['latency_ms']['p50']:>10.2f}ms  p99={result['latency_ms']['p99']:>10.2f}ms  "
+          f"mem={result['peak_memory_mb']:>8.2f}MB  db/op={result['db_round_trips_per_op']}")
+    return result
+
+
+def build_cases(seeded: Dict[str, Any], top_n: int, rerank_factor: int) -> Dict[str, Callable[[], Any]]:
+    from fastapi.testclient import TestClient
+    from main import app
+    from agents.agent_pipeline import match_pipeline, pipeline_profile
+    from agents.room_hunter_agent import room_hunter_agent
+    from utils.jwt_utils import create_access_token
+
+    seeker_profile = pipeline_profile(seeded["seeker"], include_photo=False)
+    user = seeded["user"]
+    # Not used as a context manager, so startup hooks (index backfill, refresh sweeper) do not run
+    client = TestClient(app)
+    client.cookies.set("access_token", create_access_token(
+        str(user["_id"]), user["username"], user["email"], None, user["profile_id"], is_verified=True
+    ))
+
+    def get_ok(path: str):
+        response = client.get(path)
+        response.raise_for_status()
+        return response
+
+    def login():
+        response = client.post("/users/login", json={"email": user["email"], "password": BENCH_PASSWORD})
+        response.raise_for_status()
+        return response
+
+    return {
+        "match_pipeline.get_best_matches": lambda: match_pipeline.get_best_matches(
+            seeker_profile, top_n=top_n, shortlist_size=rerank_factor * top_n
+        ),
+        "room_hunter.get_top_housing_matches": lambda: room_hunter_agent.get_top_housing_matches(
+            [seeker_profile], top_n=10
+        ),
+        "GET /profiles/": lambda: get_ok("/profiles/"),
+        "GET /profiles/locations": lambda: get_ok("/profiles/locations"),
+        "POST /users/login": login,
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Matching and housing performance benchmarks")
+    parser.add_argument("--sizes", default="100,1000,10000,100000", help="Comma-separated dataset sizes")
+    parser.add_argument("--backend", choices=["mongo", "memory"], default="mongo")
+    parser.add_argument("--mongo-uri", default=os.getenv("BENCH_MONGO_URI", "mongodb://localhost:27017"))
+    parser.add_argument("--db-name", default="flatwalay_bench")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--cases", default="", help="Comma-separated substrings of case names to run (default: all)")
+    parser.add_argument("--top-n", type=int, default=5)
+    parser.add_argument("--rerank-factor", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--keep", action="store_true", help="Keep the benchmark database afterwards")
+    args = parser.parse_args()
+
+    counter = CommandCounter()
+    client, database = connect(args.backend, args.mongo_uri, args.db_name, counter)
+    selected = [c.strip() for c in args.cases.split(",") if c.strip()]
+
+    results = []
+    try:
+        for size in (int(s) for s in args.sizes.split(",") if s.strip()):
+            print(f"⚡ Seeding {size} profiles and listings ({args.backend})...")
+            seeded = seed(database, size, random.Random(args.seed))
+            for name, fn in build_cases(seeded, args.top_n, args.rerank_factor).items():
+                if selected and not any(s in name for s in selected):
+                    continue
+                try:
+                    results.append(measure(name, size, fn, args.iterations, counter))
+                except Exception as e:
+                    print(f"  ❌ {name} failed: {e}")
+                    results.append({"case": name, "size": size, "error": str(e)})
+    finally:
+        if not args.keep:
+            client.drop_database(args.db_name)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "backend": args.backend,
+            "llm_backend": os.getenv("LLM_BACKEND"),
+            "fake_llm_latency_ms": os.getenv("FAKE_LLM_LATENCY_MS", "0"),
+            "iterations": args.iterations,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Wrote {len(results)} results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
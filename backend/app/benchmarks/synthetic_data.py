@@ -0,0 +1,80 @@
+import random
+from typing import Any, Dict, List
+from bson import ObjectId
+from db.mongo import location_fields
+from models.profile import SleepSchedule, Cleanliness, NoiseTolerance, StudyHabits, FoodPref
+
+CITIES = {
+    "Lahore": ["DHA", "Gulberg", "Johar Town", "Model Town", "Bahria Town"],
+    "Karachi": ["Clifton", "Gulshan", "PECHS", "North Nazimabad"],
+    "Islamabad": ["F-10", "G-11", "E-7", "I-8"],
+    "Rawalpindi": ["Saddar", "Satellite Town"],
+}
+AMENITIES = ["WiFi", "Security guard", "Parking", "Laundry", "Generator", "Furnished"]
+OCCUPATIONS = ["Student", "Software Engineer", "Designer", "Doctor", "Accountant"]
+AD_SNIPPETS = [
+    "Looking for a roommate near campus.",
+    "Working professional, mostly out during the day.",
+    "Prefer a clean and quiet flat.",
+    "Gamer, stays up late on weekends.",
+    "Cooks at home, happy to share groceries.",
+]
+
+
+def generate_profiles(n: int, rng: random.Random) -> List[Dict[str, Any]]:
+    """Profile documents shaped like the ones create_profile stores."""
+    profiles = []
+    for i in range(n):
+        city = rng.choice(list(CITIES))
+        doc = {
+            "_id": ObjectId(),
+            "raw_profile_text": " ".join(rng.sample(AD_SNIPPETS, 2)),
+            "city": city,
+            "area": rng.choice(CITIES[city]),
+            "budget_PKR": rng.randrange(8000, 80000, 500),
+            "sleep_schedule": rng.choice(list(SleepSchedule)).value,
+            "cleanliness": rng.choice(list(Cleanliness)).value,
+            "noise_tolerance": rng.choice(list(NoiseTolerance)).value,
+            "study_habits": rng.choice(list(StudyHabits)).value,
+            "food_pref": rng.choice(list(FoodPref)).value,
+            "age": rng.randint(18, 40),
+            "occupation": rng.choice(OCCUPATIONS),
+            "full_name": f"Bench User {i}",
+            "profile_photo": None,
+        }
+        doc.update(location_fields(doc))
+        profiles.append(doc)
+    return profiles
+
+
+def generate_listings(n: int, rng: random.Random) -> List[Dict[str, Any]]:
+    """Housing documents shaped like the housing collection."""
+    listings = []
+    for _ in range(n):
+        city = rng.choice(list(CITIES))
+        listings.append({
+            "_id": ObjectId(),
+            "city": city,
+            "area": rng.choice(CITIES[city]),
+            "monthly_rent_PKR": rng.randrange(10000, 120000, 1000),
+            "rooms_available": rng.randint(1, 4),
+            "availability": "Available" if rng.random() < 0.8 else "Not Available",
+            "amenities": rng.sample(AMENITIES, rng.randint(1, 4)),
+            "latitude": round(rng.uniform(24.8, 33.7), 5),
+            "longitude": round(rng.uniform(67.0, 74.4), 5),
+            "rating": round(rng.uniform(2.5, 5.0), 1),
+            "reviews": [],
+        })
+    return listings
+
+
+def generate_user(profile_id: str, email: str, password_hash: str) -> Dict[str, Any]:
+    """A verified user that owns the given profile."""
+    return {
+        "_id": ObjectId(),
+        "username": email.split("@")[0],
+        "email": email,
+        "password": password_hash,
+        "profile_id": profile_id,
+        "is_verified": True,
+    }
@@ -1,7 +1,10 @@
-from pymongo import MongoClient
+from pymongo import MongoClient, ASCENDING
+from bson import ObjectId
 import gridfs
 import os
+import re
 from dotenv import load_dotenv
+from services.tracing import stage_metrics, DBCommandListener
 
 load_dotenv()
 
@@ -11,7 +14,11 @@ DB_NAME = os.getenv("DB_NAME", "Flat-Waley")
 # Create global client
 # Added tlsAllowInvalidCertificates=True to handle potential SSL handshake errors in dev environments
 try:
-    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000, tlsAllowInvalidCertificates=True)
+    # Every command's round-trip time feeds the db.<command> stage histograms
+    client = MongoClient(
+        MONGO_URI, serverSelectionTimeoutMS=5000, tlsAllowInvalidCertificates=True,
+        event_listeners=[DBCommandListener(stage_metrics)],
+    )
 except Exception as e:
     print(f"Global MongoClient init failed: {e}")
     client = None
@@ -47,6 +54,21 @@ def get_profiles_collection():
         raise Exception("Database connection failed")
     return db["profiles"]
 
+def get_match_results_collection():
+    if db is None:
+        raise Exception("Database connection failed")
+    return db["match_results"]
+
+def get_result_upgrades_collection():
+    if db is None:
+        raise Exception("Database connection failed")
+    return db["result_upgrades"]
+
+def get_parse_jobs_collection():
+    if db is None:
+        raise Exception("Database connection failed")
+    return db["parse_jobs"]
+
 def check_connection():
     """Check if MongoDB connection works"""
     if not client:
@@ -56,4 +78,92 @@ def check_connection():
         return True
     except Exception as e:
         print("❌ MongoDB connection failed:", e)
-        return False
\ No newline at end of file
+        return False
+
+
+# ----- Candidate retrieval -----
+# Fields the match pipeline needs to score a candidate (no photos or reviews)
+CANDIDATE_PROJECTION = {
+    "raw_profile_text": 1, "city": 1, "area": 1, "budget_PKR": 1,
+    "sleep_schedule": 1, "cleanliness": 1, "noise_tolerance": 1, "study_habits": 1, "food_pref": 1,
+    "age": 1, "occupation": 1, "full_name": 1,
+}
+
+
+def normalize_location(value):
+    """Trimmed, lower-cased form used for indexed city/area lookups."""
+    if not isinstance(value, str):
+        return None
+    return value.strip().lower() or None
+
+
+def location_fields(doc: dict) -> dict:
+    """Normalized city_norm value for the city present in doc."""
+    if "city" not in doc:
+        return {}
+    return {"city_norm": normalize_location(doc.get("city"))}
+
+
+def build_candidate_query(user_profile: dict, budget_window_pkr: int = None) -> dict:
+    """
+    Server-side candidate filter: same city, budget within the window,
+    not the user's own profile and with the required fields present.
+    Profiles written without city_norm (e.g. by import scripts that bypass the
+    API) are matched on city case-insensitively until the startup backfill runs.
+    """
+    query = {"full_name": {"$nin": [None, ""]}}
+
+    city = normalize_location(user_profile.get("city"))
+    legacy_city = {"$regex": f"^\\s*{re.escape(city)}\\s*$", "$options": "i"} if city else {"$nin": [None, ""]}
+    # Both branches are served by the city_budget index; the second only reads docs missing city_norm
+    query["$or"] = [
+        {"city_norm": city or {"$nin": [None, ""]}},
+        {"city_norm": {"$exists": False}, "city": legacy_city},
+    ]
+
+    budget = user_profile.get("budget_PKR") or 0
+    if budget_window_pkr and budget:
+        query["budget_PKR"] = {"$gte": budget - budget_window_pkr, "$lte": budget + budget_window_pkr}
+
+    user_id = user_profile.get("id")
+    if user_id and ObjectId.is_valid(str(user_id)):
+        query["_id"] = {"$ne": ObjectId(str(user_id))}
+
+    return query
+
+
+def ensure_profile_indexes():
+    """Backfills the normalized city field and creates the candidate retrieval index."""
+    profiles = get_profiles_collection()
+    # Server-side backfill for docs written without city_norm
+    profiles.update_many(
+        {"city_norm": {"$exists": False}, "city": {"$type": "string"}},
+        [{"$set": {"city_norm": {"$toLower": {"$trim": {"input": "$city"}}}}}],
+    )
+    profiles.create_index([("city_norm", ASCENDING), ("budget_PKR", ASCENDING)], name="city_budget")
+
+
+def ensure_match_results_indexes():
+    """One stored ranked list per profile, plus lookups for staleness sweeps and reverse invalidation."""
+    match_results = get_match_results_collection()
+    match_results.create_index([("profile_id", ASCENDING)], name="profile_id", unique=True)
+    match_results.create_index([("computed_at", ASCENDING)], name="computed_at")
+    match_results.create_index([("results.profile_id", ASCENDING)], name="result_candidate_ids")
+
+
+def ensure_result_upgrades_indexes(ttl_seconds: int = 3600):
+    """Lookup by version token; upgrades expire after ttl_seconds."""
+    upgrades = get_result_upgrades_collection()
+    upgrades.create_index([("version", ASCENDING)], name="version", unique=True)
+    upgrades.create_index([("created_at", ASCENDING)], name="created_at_ttl", expireAfterSeconds=ttl_seconds)
+
+
+def ensure_parse_jobs_indexes(ttl_seconds: int = 24 * 3600):
+    """Lookup by job id, one job per (owner, idempotency key); jobs expire after ttl_seconds."""
+    jobs = get_parse_jobs_collection()
+    jobs.create_index([("job_id", ASCENDING)], name="job_id", unique=True)
+    jobs.create_index(
+        [("owner_id", ASCENDING), ("idempotency_key", ASCENDING)], name="owner_idempotency_key", unique=True,
+        partialFilterExpression={"idempotency_key": {"$type": "string"}},
+    )
+    jobs.create_index([("created_at", ASCENDING)], name="created_at_ttl", expireAfterSeconds=ttl_seconds)
@@ -1,7 +1,8 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from dotenv import load_dotenv
 from fastapi.middleware.cors import CORSMiddleware
 import os
+import time
 
 load_dotenv()
 
@@ -13,6 +14,7 @@ app = FastAPI(
         {"name": "Auth", "description": "Authentication related endpoints"},
         {"name": "Match", "description": "Roommate matching endpoints"},
         {"name": "Housing", "description": "Housing matching endpoints"},
+        {"name": "Metrics", "description": "Latency and LLM usage metrics"},
     ],
     openapi_security=[{
         "bearerAuth": {
@@ -35,15 +37,46 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allows all methods
     allow_headers=["*"],  # Allows all headers
+    expose_headers=["X-Matches-Computed-At", "X-Matches-Stale", "X-Matches-Degraded", "X-Result-Version", "X-Result-Quality", "Location", "Retry-After"],  # Match list freshness/quality
 )
 
+# ------------------ Request Metrics ------------------
+from services import metrics
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    metrics.http_in_flight.inc()
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Route template (e.g. /profiles/{profile_id}) keeps label cardinality bounded
+        route = request.scope.get("route")
+        path = getattr(route, "path", "unmatched")
+        metrics.http_requests.inc(path, request.method, str(status))
+        metrics.http_latency.observe(time.perf_counter() - started, path, request.method)
+        metrics.http_in_flight.dec()
+
 # ------------------ MongoDB Check ------------------
-from db.mongo import check_connection
+from db.mongo import check_connection, ensure_profile_indexes, ensure_match_results_indexes, ensure_result_upgrades_indexes, ensure_parse_jobs_indexes
+from services.match_refresher import match_refresh_worker
 
 @app.on_event("startup")
 def startup_db_check():
     if check_connection():
         print("✅ MongoDB connected successfully")
+        try:
+            ensure_profile_indexes()
+            ensure_match_results_indexes()
+            ensure_result_upgrades_indexes(int(os.getenv("RESULT_UPGRADE_TTL_SECONDS", "3600")))
+            ensure_parse_jobs_indexes(int(os.getenv("PARSE_JOB_TTL_SECONDS", str(24 * 3600))))
+        except Exception as e:
+            print(f"⚠ Failed to ensure profile indexes: {e}")
+        # Periodic refresh of stale precomputed match lists
+        match_refresh_worker.start()
     else:
         print("❌ Failed to connect to MongoDB")
 
@@ -56,6 +89,7 @@ from routes.red_flag.route import router as flag_router
 from routes.room_hunt.routes import router as room_hunter_router  
 from routes.wingman.routes import router as wingman_router
 from routes.auth.google_auth import router as google_auth_router
+from routes.metrics.routes import router as metrics_router
 
 # Include routers
 app.include_router(users_router)
@@ -65,4 +99,5 @@ app.include_router(match_router)
 app.include_router(flag_router)
 app.include_router(room_hunter_router)  # NEW: Housing matches
 app.include_router(wingman_router)
-app.include_router(google_auth_router)  # NEW: Google OAuth
\ No newline at end of file
+app.include_router(google_auth_router)  # NEW: Google OAuth
+app.include_router(metrics_router)
\ No newline at end of file
@@ -0,0 +1,120 @@
+"""
+Offline job that fills data/explanation_table.json with LLM explanations for every
+(score band, red-flag combination) the rule-based detector can produce.
+
+Run from backend/app with a real GROQ_API_KEY:
+    python precompute_explanations.py                 # fill missing entries
+    python precompute_explanations.py --rebuild       # regenerate everything
+    python precompute_explanations.py --limit 50      # try a few first
+
+Existing entries are kept unless --rebuild is given or they were produced by a
+different model, so an interrupted run can be resumed. Combinations the LLM fails
+on are reported and left out (the agent then falls back to its cache and the live
+LLM for them).
+"""
+import os
+import json
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, List, Optional
+
+from services.llm_gateway import llm_gateway, Priority
+from services.explanation_cache import templatize_explanation
+from services.explanation_table import (
+    DEFAULT_TABLE_PATH, FLAG_CATEGORIES, iter_combinations, save_table,
+)
+from agents.wingman_agent import MatchExplainerAgent, GROQ_API_KEY, validate_explanation
+
+# Representative scorer reasons for categories without a red flag
+MATCH_REASONS = {
+    "sleep": "Sleep schedules match",
+    "cleanliness": "Cleanliness preferences match",
+    "noise": "Noise tolerance matches",
+    "study": "Study habits match",
+    "budget": "Budgets are similar",
+}
+FLAG_EVIDENCE = {
+    "sleep": "One is an early riser, the other is a night owl.",
+    "cleanliness": "One is tidy, the other is relaxed about cleanliness.",
+    "noise": "One prefers quiet, the other tolerates noise.",
+    "study": "One studies in the room, the other studies late at night.",
+    "budget": "Their budgets differ noticeably.",
+}
+SAVE_EVERY = 50
+
+
+def representative_inputs(severities: Dict[str, str]):
+    red_flags = [
+        {"type": FLAG_CATEGORIES[category], "severity": severity, "evidence": FLAG_EVIDENCE[category]}
+        for category, severity in severities.items()
+    ]
+    reasons = [reason for category, reason in MATCH_REASONS.items() if category not in severities]
+    return reasons, red_flags
+
+
+def generate_entry(agent: MatchExplainerAgent, score: int, severities: Dict[str, str]) -> Optional[Dict[str, Any]]:
+    """One LLM explanation for the combination, or None if the model did not return the tool call."""
+    reasons, red_flags = representative_inputs(severities)
+    with llm_gateway.priority(Priority.BACKGROUND):
+        completion = llm_gateway.chat_completion(**agent._build_explanation_request(score, reasons, red_flags))
+    tool_calls = completion.choices[0].message.tool_calls
+    if not tool_calls:
+        return None
+    explanation = validate_explanation(json.loads(tool_calls[0].function.arguments))
+    if explanation is None:
+        return None
+    return templatize_explanation(explanation, score)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute the red-flag explanation table")
+    parser.add_argument("--output", default=os.getenv("EXPLANATION_TABLE_PATH", DEFAULT_TABLE_PATH))
+    parser.add_argument("--model", default="openai/gpt-oss-120b")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--limit", type=int, default=0, help="Generate at most this many entries")
+    parser.add_argument("--rebuild", action="store_true", help="Ignore entries already in the table")
+    args = parser.parse_args()
+
+    if not GROQ_API_KEY:
+        raise SystemExit("❌ GROQ_API_KEY is required to precompute explanations.")
+    agent = MatchExplainerAgent(api_key=GROQ_API_KEY, model_name=args.model, cache=None, table=None)
+
+    entries: Dict[str, Dict[str, Any]] = {}
+    if os.path.exists(args.output) and not args.rebuild:
+        with open(args.output, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("model") == args.model:
+            entries = data.get("entries", {})
+
+    combinations = list(iter_combinations())
+    pending = [c for c in combinations if c[0] not in entries]
+    if args.limit:
+        pending = pending[:args.limit]
+    print(f"⚡ {len(combinations)} combinations, {len(entries)} already in the table, generating {len(pending)}...")
+
+    failed: List[str] = []
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = {executor.submit(generate_entry, agent, score, severities): key for key, score, severities in pending}
+        for done, future in enumerate(as_completed(futures), start=1):
+            key = futures[future]
+            try:
+                entry = future.result()
+            except Exception as e:
+                print(f"  ⚠ {key}: {e}")
+                entry = None
+            if entry is None:
+                failed.append(key)
+            else:
+                entries[key] = entry
+            if done % SAVE_EVERY == 0:
+                save_table(args.output, entries, args.model)
+                print(f"  {done}/{len(pending)} done")
+
+    save_table(args.output, entries, args.model)
+    print(f"✅ Wrote {len(entries)}/{len(combinations)} entries to {args.output}")
+    if failed:
+        print(f"⚠ {len(failed)} combinations failed; rerun to retry them: {', '.join(sorted(failed)[:10])}...")
+
+
+if __name__ == "__main__":
+    main()
@@ -16,3 +16,4 @@ class RichMatchResult(BaseModel):
     negotiation_checklist: List[ChecklistItem]
     red_flags: List[Dict[str, Any]]
     score_reasons: List[str]
+    degraded: bool = False
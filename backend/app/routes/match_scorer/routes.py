@@ -1,28 +1,35 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from utils.jwt_utils import get_user_from_cookie
 from db.mongo import get_profiles_collection, get_users_collection
 from bson import ObjectId
-from agents.agent_pipeline import match_pipeline
+from agents.agent_pipeline import match_pipeline, pipeline_profile
+from services.match_refresher import match_refresh_worker
+from services.llm_gateway import Priority
+from services.result_upgrades import result_upgrades
 from .match_response_schemas import RichMatchResult
 from routes.profiles.profiles_response_schemas import ProfileResponse
 from routes.users.users_response_schemas import UserResponse
-from typing import List
+from typing import List, Dict, Any, Optional
+import os
+import json
+import anyio
+from datetime import timezone
+from functools import partial
 
 router = APIRouter(prefix="/ai", tags=["Match"])
 
-@router.get("/best_matches", response_model=List[RichMatchResult])
-def best_matches_route(
-    current_user: UserResponse = Depends(get_user_from_cookie),
-    top_n: int = 5
-):
-    """
-    Get top N best matching roommate profiles for the logged-in user using the 4-agent pipeline.
-    """
-    if not match_pipeline:
-        raise HTTPException(status_code=503, detail="Match pipeline not initialized")
+# Two-stage mode: how many candidates per requested match go through the LLM agents
+MATCH_RERANK_FACTOR = int(os.getenv("MATCH_RERANK_FACTOR", "3"))
+# Async mode: fan out on the event loop through the shared async LLM pool, with a per-request deadline
+MATCH_PIPELINE_ASYNC = os.getenv("MATCH_PIPELINE_ASYNC", "false").lower() in ("1", "true", "yes")
+MATCH_DEADLINE_SECONDS = float(os.getenv("MATCH_DEADLINE_SECONDS", "20"))
+
 
+def _get_profile_id(current_user: UserResponse) -> str:
+    """Resolves the logged-in user's profile id from the users collection."""
     users_collection = get_users_collection()
-    profiles_collection = get_profiles_collection()
 
     # Fetch user document
     try:
@@ -36,6 +43,13 @@ def best_matches_route(
     profile_id = user_doc.get("profile_id")
     if not profile_id:
         raise HTTPException(status_code=404, detail="No profile assigned to this user")
+    return profile_id
+
+
+def _get_user_profile(current_user: UserResponse) -> Dict[str, Any]:
+    """Loads the logged-in user's profile in the shape the match pipeline expects."""
+    profiles_collection = get_profiles_collection()
+    profile_id = _get_profile_id(current_user)
 
     # Fetch user's profile
     try:
@@ -46,26 +60,185 @@ def best_matches_route(
     if not profile_doc:
         raise HTTPException(status_code=404, detail="User profile not found")
 
-    user_profile = {
-        "id": str(profile_doc["_id"]),
-        "raw_profile_text": profile_doc.get("raw_profile_text", ""),
-        "city": profile_doc.get("city", ""),
-        "area": profile_doc.get("area", ""),
-        "budget_PKR": profile_doc.get("budget_PKR", 0),
-        "sleep_schedule": profile_doc.get("sleep_schedule"),
-        "cleanliness": profile_doc.get("cleanliness"),
-        "noise_tolerance": profile_doc.get("noise_tolerance"),
-        "study_habits": profile_doc.get("study_habits"),
-        "food_pref": profile_doc.get("food_pref"),
-        "age": profile_doc.get("age"),
-        "occupation": profile_doc.get("occupation"),
-        "full_name": profile_doc.get("full_name"),
-    }
+    return pipeline_profile(profile_doc, include_photo=False)
+
+
+def _set_freshness_headers(response: Response, stored: Dict[str, Any], stale: bool):
+    computed_at = stored.get("computed_at")
+    if computed_at:
+        # Mongo returns naive datetimes; they are stored in UTC
+        if computed_at.tzinfo is None:
+            computed_at = computed_at.replace(tzinfo=timezone.utc)
+        response.headers["X-Matches-Computed-At"] = computed_at.isoformat()
+    response.headers["X-Matches-Stale"] = "true" if stale else "false"
+
+
+def _set_degraded_header(response: Response, results: List[Dict[str, Any]]):
+    degraded = any(r.get("degraded") for r in results)
+    response.headers["X-Matches-Degraded"] = "true" if degraded else "false"
+
+
+@router.get("/best_matches", response_model=List[RichMatchResult])
+def best_matches_route(
+    response: Response,
+    current_user: UserResponse = Depends(get_user_from_cookie),
+    top_n: int = 5,
+    rerank: bool = True,
+    precomputed: bool = True,
+    swr: bool = False
+):
+    """
+    Get top N best matching roommate profiles for the logged-in user using the 4-agent pipeline.
+    With rerank enabled, a deterministic prefilter ranks every candidate first and only the
+    top MATCH_RERANK_FACTOR x top_n go through the LLM agents.
+    With precomputed enabled, the stored list from match_results is served and its freshness is
+    reported in the X-Matches-Computed-At / X-Matches-Stale headers. A stale list is still served
+    while a background refresh is scheduled.
+    X-Matches-Degraded is true when any result used rule-based fallbacks instead of the LLM.
+    With swr enabled, the rule-based ranking is returned immediately together with an
+    X-Result-Version token; the LLM-enriched list is then fetched from /ai/best_matches/upgrade.
+    """
+    if not match_pipeline:
+        raise HTTPException(status_code=503, detail="Match pipeline not initialized")
+
+    if swr:
+        return _best_matches_swr(response, current_user, top_n, rerank)
+
+    if precomputed and rerank and top_n <= match_refresh_worker.top_n:
+        profile_id = _get_profile_id(current_user)
+        try:
+            stored = match_refresh_worker.get_stored(profile_id)
+            if stored:
+                stale = match_refresh_worker.is_stale(stored)
+                if stale:
+                    match_refresh_worker.schedule_refresh(profile_id)
+            else:
+                # First visit: compute synchronously and store for next time
+                stored = match_refresh_worker.refresh_now(profile_id, priority=Priority.INTERACTIVE)
+                stale = False
+        except Exception as e:
+            print(f"Error in match pipeline: {e}")
+            raise HTTPException(status_code=500, detail=f"Match pipeline error: {e}")
+
+        if not stored:
+            raise HTTPException(status_code=404, detail="User profile not found")
+        _set_freshness_headers(response, stored, stale)
+        _set_degraded_header(response, stored["results"][:top_n])
+        return stored["results"][:top_n]
+
+    user_profile = _get_user_profile(current_user)
 
     # Get best matches using the pipeline
     try:
-        results = match_pipeline.get_best_matches(user_profile, top_n=top_n)
+        shortlist_size = MATCH_RERANK_FACTOR * top_n if rerank else None
+        if MATCH_PIPELINE_ASYNC:
+            # This sync route runs in the threadpool; hand the fan-out to the app's event loop
+            results = anyio.from_thread.run(partial(
+                match_pipeline.get_best_matches_async,
+                user_profile, top_n=top_n, shortlist_size=shortlist_size, deadline_seconds=MATCH_DEADLINE_SECONDS
+            ))
+        else:
+            results = match_pipeline.get_best_matches(user_profile, top_n=top_n, shortlist_size=shortlist_size)
+        _set_degraded_header(response, results)
         return results
     except Exception as e:
         print(f"Error in match pipeline: {e}")
         raise HTTPException(status_code=500, detail=f"Match pipeline error: {e}")
+
+
+def _best_matches_swr(response: Response, current_user: UserResponse, top_n: int, rerank: bool) -> List[Dict[str, Any]]:
+    """Rule-based ranking now, LLM-enriched ranking in the background under a version token."""
+    user_profile = _get_user_profile(current_user)
+    profile_id = user_profile["id"]
+    shortlist_size = MATCH_RERANK_FACTOR * top_n if rerank else None
+
+    def compute_upgrade() -> List[Dict[str, Any]]:
+        if rerank and top_n <= match_refresh_worker.top_n:
+            # Also refreshes the precomputed list served by the default mode
+            stored = match_refresh_worker.refresh_now(profile_id)
+            return [jsonable_encoder(RichMatchResult(**r)) for r in stored["results"][:top_n]]
+        results = match_pipeline.get_best_matches(user_profile, top_n=top_n, shortlist_size=shortlist_size)
+        return [jsonable_encoder(RichMatchResult(**r)) for r in results]
+
+    try:
+        results = match_pipeline.get_rule_based_matches(user_profile, top_n=top_n, shortlist_size=shortlist_size)
+        version = result_upgrades.start("matches", profile_id, compute_upgrade)
+    except Exception as e:
+        print(f"Error in match pipeline: {e}")
+        raise HTTPException(status_code=500, detail=f"Match pipeline error: {e}")
+
+    response.headers["X-Result-Version"] = version
+    response.headers["X-Result-Quality"] = "rule_based"
+    _set_degraded_header(response, results)
+    return results
+
+
+@router.get("/best_matches/upgrade", response_model=List[RichMatchResult])
+async def best_matches_upgrade_route(
+    response: Response,
+    version: str,
+    wait_seconds: float = 0,
+    current_user: UserResponse = Depends(get_user_from_cookie),
+):
+    """
+    LLM-enriched match list for a version token from /ai/best_matches?swr=true.
+    Returns 202 with an empty list while it is still being computed; set wait_seconds
+    (up to 25) to long-poll instead of polling.
+    """
+    profile_id = await anyio.to_thread.run_sync(_get_profile_id, current_user)
+    upgrade = await result_upgrades.wait(version, "matches", profile_id, min(wait_seconds, 25))
+    return result_upgrades.respond(response, upgrade)
+
+
+def _serialize_match(result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Validates a pipeline result against RichMatchResult and makes it JSON-safe."""
+    try:
+        return jsonable_encoder(RichMatchResult(**result))
+    except Exception as e:
+        print(f"⚠ Skipping invalid match result: {e}")
+        return None
+
+
+@router.get("/best_matches/stream")
+def best_matches_stream_route(
+    current_user: UserResponse = Depends(get_user_from_cookie),
+    top_n: int = 5,
+    rerank: bool = True,
+    snapshot_every: int = 3,
+    format: str = "ndjson"
+):
+    """
+    Streaming variant of /ai/best_matches. Emits each RichMatchResult as soon as it is scored,
+    a "snapshot" frame with the current top N every `snapshot_every` matches, and a "final"
+    frame with the ranked top N. `format` is "ndjson" (one JSON object per line) or "sse".
+    """
+    if not match_pipeline:
+        raise HTTPException(status_code=503, detail="Match pipeline not initialized")
+    if format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'sse'")
+
+    user_profile = _get_user_profile(current_user)
+    shortlist_size = MATCH_RERANK_FACTOR * top_n if rerank else None
+
+    def frames():
+        try:
+            for frame in match_pipeline.iter_best_matches(
+                user_profile, top_n=top_n, shortlist_size=shortlist_size, snapshot_every=snapshot_every
+            ):
+                if frame["event"] == "match":
+                    data = _serialize_match(frame["data"])
+                    if data is None:
+                        continue
+                else:
+                    data = [m for m in map(_serialize_match, frame["data"]) if m is not None]
+                yield frame["event"], data
+        except Exception as e:
+            print(f"Error in match pipeline: {e}")
+            yield "error", {"detail": f"Match pipeline error: {e}"}
+
+    if format == "sse":
+        body = (f"event: {event}\ndata: {json.dumps(data)}\n\n" for event, data in frames())
+        return StreamingResponse(body, media_type="text/event-stream")
+
+    body = (json.dumps({"event": event, "data": data}) + "\n" for event, data in frames())
+    return StreamingResponse(body, media_type="application/x-ndjson")
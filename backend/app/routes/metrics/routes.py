@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Response
+from typing import Dict, Any
+from services.tracing import stage_metrics
+from services.llm_gateway import llm_gateway
+from services.explanation_cache import explanation_cache
+from agents.profile_reader_agent import profile_reader
+from services.metrics import render_prometheus, PROMETHEUS_CONTENT_TYPE
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+
+@router.get("")
+def prometheus_metrics_route() -> Response:
+    """
+    Prometheus scrape endpoint: per-route request counts/latency and in-flight gauge,
+    LLM calls, latency and tokens per prompt and model, agent fallbacks, cache hit/miss
+    counts (pair, explanation, explanation table and ProfileReaderAgent caches), pipeline stages and MongoDB command timings.
+    """
+    return Response(content=render_prometheus(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@router.get("/stages")
+def stage_metrics_route() -> Dict[str, Any]:
+    """
+    Per-stage latency histograms (pipeline stages, LLM calls by prompt, MongoDB commands),
+    fallback/retry counters, prompt token totals, circuit breaker states and explanation
+    and profile parse cache hit rates.
+    """
+    return {
+        **stage_metrics.snapshot(),
+        "prompt_tokens": llm_gateway.prompt_stats.snapshot(),
+        "circuit_breakers": {model: breaker.state for model, breaker in llm_gateway.breakers.items()},
+        "explanation_cache": explanation_cache.stats() if explanation_cache else None,
+        "profile_cache": profile_reader.cache.stats() if profile_reader else None,
+    }
@@ -1,15 +1,26 @@
-from fastapi import APIRouter, HTTPException, Depends
+import os
+import json
+from typing import List, Optional
+import anyio
+from fastapi import APIRouter, HTTPException, Depends, Header, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from utils.jwt_utils import get_user_from_cookie
 from routes.users.users_response_schemas import UserResponse
 from models.profile import ProfileCreate
 from agents.profile_reader_agent import  profile_reader
+from services.parse_jobs import parse_jobs
 
 router = APIRouter(prefix="/ai", tags=["AI Profile Reader"])
 
+MAX_BATCH_SIZE = int(os.getenv("PROFILE_BATCH_MAX_SIZE", "500"))
+
 class ParseProfileRequest(BaseModel):
     raw_profile_text: str
 
+class ParseProfileBatchRequest(BaseModel):
+    raw_profile_texts: List[str]
+
 @router.post("/parse-profile", response_model=ProfileCreate)
 def parse_profile(
     request: ParseProfileRequest,
@@ -24,3 +35,59 @@ def parse_profile(
         return ProfileCreate(**parsed)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/parse-profile/batch")
+def parse_profile_batch(
+    request: ParseProfileBatchRequest,
+    current_user: UserResponse = Depends(get_user_from_cookie)
+):
+    """
+    Parse many ads in one request. Duplicate ads are parsed once, cached ads are
+    returned immediately and the rest are parsed concurrently.
+
+    Streams newline-delimited JSON in input order, one line per ad:
+    {"index": 0, "status": "cache" | "near_duplicate" | "local" | "llm" | "fallback", "profile": {...}}
+    or {"index": 0, "status": "error", "error": "..."}. Does NOT save to MongoDB.
+    """
+    if not request.raw_profile_texts:
+        raise HTTPException(status_code=400, detail="raw_profile_texts must not be empty")
+    if len(request.raw_profile_texts) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_SIZE} ads per batch")
+    if profile_reader is None:
+        raise HTTPException(status_code=503, detail="Profile reader is not configured")
+
+    # Profiles are already validated against ProfileCreate (enum members serialize as their values)
+    lines = (json.dumps(item, default=str) + "\n" for item in profile_reader.parse_profiles_batch(request.raw_profile_texts))
+    return StreamingResponse(lines, media_type="application/x-ndjson")
+
+@router.post("/parse-profile/jobs")
+async def submit_parse_profile_job(
+    request: ParseProfileRequest,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    current_user: UserResponse = Depends(get_user_from_cookie)
+):
+    """
+    Queue an ad for parsing and return its job id without waiting for the LLM.
+    Ads already known to the cache or local tiers come back done (200) at once;
+    otherwise 202 with a Location to poll. Retrying with the same Idempotency-Key
+    returns the original job instead of parsing again. Does NOT save to MongoDB.
+    """
+    job, _ = await anyio.to_thread.run_sync(
+        parse_jobs.submit, current_user.id, request.raw_profile_text, idempotency_key
+    )
+    return parse_jobs.respond(response, job)
+
+@router.get("/parse-profile/jobs/{job_id}")
+async def get_parse_profile_job(
+    job_id: str,
+    response: Response,
+    wait_seconds: float = 0,
+    current_user: UserResponse = Depends(get_user_from_cookie)
+):
+    """
+    Status of a parse job: 202 while queued or running, 200 once done or failed.
+    Set wait_seconds (up to 25) to long-poll instead of polling.
+    """
+    job = await parse_jobs.wait(job_id, current_user.id, min(wait_seconds, 25))
+    return parse_jobs.respond(response, job)
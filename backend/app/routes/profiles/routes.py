@@ -1,11 +1,13 @@
 from fastapi import APIRouter, HTTPException, Path, Depends, Body
 from models.profile import ProfileCreate
 from routes.profiles.profiles_response_schemas import ProfileResponse
-from db.mongo import get_profiles_collection, get_users_collection
+from db.mongo import get_profiles_collection, get_users_collection, location_fields
 from bson import ObjectId
 from typing import List
 from utils.jwt_utils import get_user_from_cookie
 from routes.users.users_response_schemas import UserResponse
+from services.pair_cache import pair_cache
+from services.match_refresher import match_refresh_worker
 
 router = APIRouter(prefix="/profiles", tags=["Profiles"])
 
@@ -50,7 +52,9 @@ def create_profile(
         raise HTTPException(status_code=400, detail="User already has a profile")
 
     # Insert the new profile
-    result = profiles_collection.insert_one(request.dict())
+    profile_doc = request.dict()
+    profile_doc.update(location_fields(profile_doc))
+    result = profiles_collection.insert_one(profile_doc)
     db_profile = profiles_collection.find_one({"_id": result.inserted_id})
 
     # Update the user's profile_id in the users collection
@@ -63,6 +67,9 @@ def create_profile(
         profiles_collection.delete_one({"_id": result.inserted_id})
         raise HTTPException(status_code=500, detail="Failed to assign profile to user")
 
+    # Precompute the new user's match list in the background
+    match_refresh_worker.on_profile_changed(str(result.inserted_id))
+
     # Return the created profile
     return ProfileResponse(
         id=str(db_profile["_id"]),
@@ -222,6 +229,10 @@ def delete_profile(profile_id: str = Path(..., description="Profile ID"), curren
     result = profiles_collection.delete_one({"_id": obj_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Profile not found")
+
+    if pair_cache:
+        pair_cache.invalidate_profile(profile_id)
+    match_refresh_worker.on_profile_deleted(profile_id)
     return {"detail": "Profile deleted successfully"}
 
 
@@ -237,8 +248,15 @@ def update_profile(profile_id: str, update: dict, current_user: UserResponse = D
     if not update:
         raise HTTPException(status_code=400, detail="No fields to update")
 
+    # Keep the indexed city_norm field in sync
+    update = {**update, **location_fields(update)}
     result = profiles_collection.update_one({"_id": obj_id}, {"$set": update})
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Profile not found")
 
+    # Cached match results involving this profile are now stale
+    if pair_cache:
+        pair_cache.invalidate_profile(profile_id)
+    match_refresh_worker.on_profile_changed(profile_id)
+
     return {"detail": "Profile updated successfully"}
\ No newline at end of file
@@ -1,12 +1,15 @@
 # routes/ai/room_hunter_route.py
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Response
 from typing import List, Dict, Any
 from bson import ObjectId
+from bson.errors import InvalidId
+import anyio
 
-from db.mongo import get_profiles_collection, get_housing_collection
+from db.mongo import get_profiles_collection, get_housing_collection, get_users_collection
 from utils.jwt_utils import get_user_from_cookie
 from routes.users.users_response_schemas import UserResponse
 from agents.room_hunter_agent import room_hunter_agent
+from services.result_upgrades import result_upgrades
 
 router = APIRouter(prefix="/ai", tags=["Housing"])
 
@@ -75,27 +78,56 @@ def top_housing_matches_route(
         raise HTTPException(status_code=500, detail=f"Error computing housing matches: {e}")
 
 
+def _get_user_profile_id(current_user: UserResponse) -> str:
+    """Resolves the logged-in user's profile id."""
+    try:
+        user_id = ObjectId(current_user.id)
+    except (InvalidId, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid user ID")
+    user_doc = get_users_collection().find_one({"_id": user_id})
+    if not user_doc or not user_doc.get("profile_id"):
+        raise HTTPException(status_code=404, detail="User profile not found. Please create a profile first.")
+    return str(user_doc["profile_id"])
+
+
+def _serialize_housing_matches(matches: List[Any]) -> List[Dict[str, Any]]:
+    json_matches = []
+    for m in matches:
+        match_dict = m.dict() if hasattr(m, "dict") else dict(m)
+        # MongoDB IDs and other cleanup if needed
+        if "_id" in match_dict:
+            match_dict["id"] = str(match_dict["_id"])
+            del match_dict["_id"]
+        elif "id" not in match_dict:
+            # Fallback id if missing
+            match_dict["id"] = "H" + str(hash(match_dict.get("short_reason", "")))[:6]
+
+        json_matches.append(match_dict)
+    return json_matches
+
+
 @router.get("/best_housing_matches")
 def best_housing_matches_route(
+    response: Response,
     current_user: UserResponse = Depends(get_user_from_cookie),
-    top_n: int = 10
+    top_n: int = 10,
+    swr: bool = False
 ) -> List[Dict[str, Any]]:
     """
     Get top N housing matches for the currently logged-in user.
+    With swr enabled, listings come back immediately with rule-based reasons and an
+    X-Result-Version token; the LLM-written reasons are fetched from /ai/best_housing_matches/upgrade.
     """
     if not room_hunter_agent:
         raise HTTPException(status_code=500, detail="RoomHunterAgent not initialized.")
 
     try:
         profiles_collection = get_profiles_collection()
-        users_collection = get_users_collection()
 
         # 1. Find user's profile
-        user_doc = users_collection.find_one({"_id": ObjectId(current_user.id)})
-        if not user_doc or not user_doc.get("profile_id"):
-            raise HTTPException(status_code=404, detail="User profile not found. Please create a profile first.")
+        profile_id = _get_user_profile_id(current_user)
 
-        profile_doc = profiles_collection.find_one({"_id": ObjectId(user_doc["profile_id"])})
+        profile_doc = profiles_collection.find_one({"_id": ObjectId(profile_id)})
         if not profile_doc:
             raise HTTPException(status_code=404, detail="Profile document not found.")
 
@@ -112,25 +144,37 @@ def best_housing_matches_route(
             "food_pref": profile_doc.get("food_pref"),
         }
 
-        # 3. Get matches
-        matches = room_hunter_agent.get_top_housing_matches([user_profile], top_n=top_n)
-
-        # 4. JSON-ify
-        json_matches = []
-        for m in matches:
-            match_dict = m.dict() if hasattr(m, "dict") else dict(m)
-            # MongoDB IDs and other cleanup if needed
-            if "_id" in match_dict:
-                match_dict["id"] = str(match_dict["_id"])
-                del match_dict["_id"]
-            elif "id" not in match_dict:
-                # Fallback id if missing
-                match_dict["id"] = "H" + str(hash(match_dict.get("short_reason", "")))[:6]
-                
-            json_matches.append(match_dict)
-
-        return json_matches
-
+        # 3. Get matches (JSON-ified)
+        if swr:
+            matches = room_hunter_agent.get_top_housing_matches([user_profile], top_n=top_n, use_llm=False)
+            response.headers["X-Result-Version"] = result_upgrades.start(
+                "housing", profile_id,
+                lambda: _serialize_housing_matches(room_hunter_agent.get_top_housing_matches([user_profile], top_n=top_n)),
+            )
+            response.headers["X-Result-Quality"] = "rule_based"
+        else:
+            matches = room_hunter_agent.get_top_housing_matches([user_profile], top_n=top_n)
+
+        return _serialize_housing_matches(matches)
+
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in housing match: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/best_housing_matches/upgrade")
+async def best_housing_matches_upgrade_route(
+    response: Response,
+    version: str,
+    wait_seconds: float = 0,
+    current_user: UserResponse = Depends(get_user_from_cookie),
+) -> List[Dict[str, Any]]:
+    """
+    Housing matches with LLM-written reasons for a version token from /ai/best_housing_matches?swr=true.
+    Returns 202 with an empty list while pending; wait_seconds (up to 25) long-polls.
+    """
+    profile_id = await anyio.to_thread.run_sync(_get_user_profile_id, current_user)
+    upgrade = await result_upgrades.wait(version, "housing", profile_id, min(wait_seconds, 25))
+    return result_upgrades.respond(response, upgrade)
@@ -0,0 +1,99 @@
+import time
+import threading
+from collections import deque
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the provider while a model's circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Rolling-window circuit breaker for one model. Trips open when, over the last
+    `window_seconds`, either the error rate or the share of slow calls crosses its
+    threshold (given at least `min_calls` samples). After `open_seconds` it goes
+    half-open and lets a single probe through: success closes it, failure re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        window_seconds: float = 60.0,
+        min_calls: int = 5,
+        error_rate_threshold: float = 0.5,
+        slow_call_seconds: float = 10.0,
+        slow_rate_threshold: float = 0.5,
+        open_seconds: float = 30.0,
+    ):
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.error_rate_threshold = error_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_rate_threshold = slow_rate_threshold
+        self.open_seconds = open_seconds
+
+        self.state = self.CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._calls = deque()  # (timestamp, ok, latency)
+        self._lock = threading.Lock()
+
+    def _trim(self, now: float):
+        while self._calls and now - self._calls[0][0] > self.window_seconds:
+            self._calls.popleft()
+
+    def allow_request(self) -> bool:
+        """True if a call may go to the provider now."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.open_seconds:
+                    return False
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            # Half-open: a single probe at a time
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record(self, ok: bool, latency: float):
+        """Records the outcome of a call that allow_request let through."""
+        now = time.monotonic()
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probe_in_flight = False
+                if ok and latency < self.slow_call_seconds:
+                    self.state = self.CLOSED
+                    self._calls.clear()
+                else:
+                    self._trip(now)
+                return
+
+            self._calls.append((now, ok, latency))
+            self._trim(now)
+            total = len(self._calls)
+            if self.state != self.CLOSED or total < self.min_calls:
+                return
+            errors = sum(1 for _, call_ok, _ in self._calls if not call_ok)
+            slow = sum(1 for _, _, call_latency in self._calls if call_latency >= self.slow_call_seconds)
+            if errors / total >= self.error_rate_threshold or slow / total >= self.slow_rate_threshold:
+                self._trip(now)
+
+    def release(self):
+        """
+        Ends a call that allow_request let through without recording an outcome, for
+        failures that say nothing about the provider's health (e.g. a rejected request).
+        """
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probe_in_flight = False
+
+    def _trip(self, now: float):
+        self.state = self.OPEN
+        self._opened_at = now
+        print(f"⚠ Circuit opened for {self.open_seconds:.0f}s. LLM calls will use rule-based fallbacks.")
@@ -0,0 +1,192 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+from services.tracing import stage_metrics
+
+# Stored summaries mention the exact score; it is swapped for this placeholder so a
+# cached explanation can be served for any score in the same bucket.
+SCORE_PLACEHOLDER = "{match_score}"
+
+
+def normalize_reason(reason: Any) -> str:
+    return " ".join(str(reason).split()).lower().rstrip(".")
+
+
+def explanation_key_parts(
+    match_score: int, match_reasons: List[str], red_flags: List[Dict[str, Any]], score_bucket: int
+) -> Dict[str, Any]:
+    """Normalized explainer inputs: score bucket, sorted (type, severity) pairs and the reason set."""
+    try:
+        bucket = int(match_score) // score_bucket * score_bucket
+    except (TypeError, ValueError):
+        bucket = None
+    flags = sorted({
+        (" ".join(str(flag.get("type", "")).split()).lower(), str(flag.get("severity", "")).upper())
+        for flag in red_flags or [] if isinstance(flag, dict)
+    })
+    reasons = sorted({normalize_reason(r) for r in match_reasons or [] if str(r).strip()})
+    return {"score_bucket": bucket, "flags": flags, "reasons": reasons}
+
+
+def explanation_key(
+    match_score: int, match_reasons: List[str], red_flags: List[Dict[str, Any]], score_bucket: int
+) -> str:
+    payload = json.dumps(
+        explanation_key_parts(match_score, match_reasons, red_flags, score_bucket),
+        sort_keys=True, separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def templatize_explanation(explanation: Dict[str, Any], match_score: int) -> Dict[str, Any]:
+    summary = explanation.get("summary_explanation")
+    if isinstance(summary, str):
+        return {**explanation, "summary_explanation": summary.replace(f"{match_score}/100", f"{SCORE_PLACEHOLDER}/100")}
+    return explanation
+
+
+def render_explanation(explanation: Dict[str, Any], match_score: int) -> Dict[str, Any]:
+    summary = explanation.get("summary_explanation")
+    if isinstance(summary, str):
+        return {**explanation, "summary_explanation": summary.replace(SCORE_PLACEHOLDER, str(match_score))}
+    return explanation
+
+
+class ExplanationCache:
+    """
+    Memoizes MatchExplainerAgent outputs keyed by the normalized inputs (score
+    bucket, flag type/severity pairs, reason set). A bounded in-memory LRU with
+    TTL sits in front of a SQLite table, so entries survive restarts and are
+    shared by workers on the same host.
+    """
+
+    def __init__(
+        self,
+        db_path: str = "explanation_cache.db",
+        ttl_seconds: int = 7 * 24 * 3600,
+        max_memory_entries: int = 2000,
+        max_entries: int = 50000,
+        score_bucket: int = 5,
+    ):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_memory_entries = max_memory_entries
+        self.max_entries = max_entries
+        self.score_bucket = max(1, score_bucket)
+        self._memory: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._init_db()
+
+    def _init_db(self):
+        """Initializes the explanations table and its access index."""
+        with self._lock:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS explanations (
+                    explanation_key TEXT PRIMARY KEY,
+                    explanation_json TEXT,
+                    created_at INTEGER,
+                    last_access INTEGER
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_explanation_access ON explanations (last_access)")
+            self._conn.commit()
+
+    def _remember(self, key: str, created_at: float, explanation: Dict[str, Any]):
+        """Adds to the in-memory LRU, evicting the least recently used entry over capacity."""
+        self._memory[key] = (created_at, explanation)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached and now - cached[0] <= self.ttl_seconds:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return cached[1]
+            if cached:
+                del self._memory[key]
+
+            row = self._conn.execute(
+                "SELECT explanation_json, created_at FROM explanations WHERE explanation_key = ?", (key,)
+            ).fetchone()
+            if not row or now - row[1] > self.ttl_seconds:
+                if row:
+                    self._conn.execute("DELETE FROM explanations WHERE explanation_key = ?", (key,))
+                    self._conn.commit()
+                self._stats["misses"] += 1
+                return None
+            self._conn.execute(
+                "UPDATE explanations SET last_access = ? WHERE explanation_key = ?", (int(now), key)
+            )
+            self._conn.commit()
+            explanation = json.loads(row[0])
+            self._remember(key, row[1], explanation)
+            self._stats["disk_hits"] += 1
+            return explanation
+
+    def get(
+        self, match_score: int, match_reasons: List[str], red_flags: List[Dict[str, Any]]
+    ) -> Optional[Dict[str, Any]]:
+        """Returns a cached explanation rendered for this score, or None if missing/expired."""
+        explanation = self._lookup(explanation_key(match_score, match_reasons, red_flags, self.score_bucket))
+        stage_metrics.count("cache.explanation.hit" if explanation is not None else "cache.explanation.miss")
+        return render_explanation(explanation, match_score) if explanation is not None else None
+
+    def put(
+        self, match_score: int, match_reasons: List[str], red_flags: List[Dict[str, Any]], explanation: Dict[str, Any]
+    ):
+        """Stores an LLM explanation and evicts the least recently used rows over capacity."""
+        key = explanation_key(match_score, match_reasons, red_flags, self.score_bucket)
+        stored = templatize_explanation(explanation, match_score)
+        now = int(time.time())
+        with self._lock:
+            self._remember(key, now, stored)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO explanations (explanation_key, explanation_json, created_at, last_access) "
+                "VALUES (?, ?, ?, ?)",
+                (key, json.dumps(stored), now, now),
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM explanations").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM explanations WHERE explanation_key IN "
+                    "(SELECT explanation_key FROM explanations ORDER BY last_access ASC LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+            self._conn.commit()
+            self._stats["stores"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self._stats["memory_hits"] + self._stats["disk_hits"]
+            lookups = hits + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+            }
+
+
+# Global cache instance
+explanation_cache: Optional[ExplanationCache] = None
+if os.getenv("EXPLANATION_CACHE_ENABLED", "true").lower() in ("1", "true", "yes"):
+    try:
+        explanation_cache = ExplanationCache(
+            db_path=os.getenv("EXPLANATION_CACHE_DB_PATH", "explanation_cache.db"),
+            ttl_seconds=int(os.getenv("EXPLANATION_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+            max_memory_entries=int(os.getenv("EXPLANATION_CACHE_MEMORY_ENTRIES", "2000")),
+            max_entries=int(os.getenv("EXPLANATION_CACHE_MAX_ENTRIES", "50000")),
+            score_bucket=int(os.getenv("EXPLANATION_CACHE_SCORE_BUCKET", "5")),
+        )
+    except Exception as e:
+        print(f"⚠ Failed to initialize ExplanationCache: {e}")
@@ -0,0 +1,150 @@
+import os
+import json
+import itertools
+from typing import Dict, Any, List, Optional, Tuple
+from services.tracing import stage_metrics
+from services.explanation_cache import render_explanation
+
+TABLE_VERSION = 1
+# Marker of tables built from the explainer's rule-based templates; serving them ahead
+# of the LLM would pass fallback text off as full-quality output
+RULE_BASED_MODEL = "rule-based"
+DEFAULT_TABLE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "explanation_table.json")
+
+# Red-flag categories in key order, matched against the flag type. The rule-based
+# detector emits exactly these; LLM flags outside them (e.g. food) miss the table.
+FLAG_CATEGORIES = {
+    "sleep": "Sleep Schedule Mismatch",
+    "cleanliness": "Cleanliness Mismatch",
+    "noise": "Noise Tolerance Mismatch",
+    "study": "Study Habits Mismatch",
+    "budget": "Budget Mismatch",
+}
+# LOW flags never reach the explainer's checklist, so they share the "no flag" entry
+KEY_SEVERITIES = ("HIGH", "MEDIUM")
+SEVERITY_RANK = {"LOW": 0, "MEDIUM": 1, "HIGH": 2}
+
+# Inclusive score bands; each band gets its own entry per flag combination
+SCORE_BANDS: List[Tuple[int, int]] = [(0, 39), (40, 59), (60, 79), (80, 100)]
+
+
+def flag_category(flag_type: str) -> Optional[str]:
+    text = str(flag_type).lower()
+    for category in FLAG_CATEGORIES:
+        if category in text:
+            return category
+    return None
+
+
+def score_band(match_score: int, bands: List[Tuple[int, int]] = SCORE_BANDS) -> Optional[str]:
+    try:
+        score = int(match_score)
+    except (TypeError, ValueError):
+        return None
+    for low, high in bands:
+        if low <= score <= high:
+            return f"{low}-{high}"
+    return None
+
+
+def combination_key(band: str, severities: Dict[str, str]) -> str:
+    """Canonical key, e.g. '60-79|budget:MEDIUM,sleep:HIGH' ('60-79|' when there are no flags)."""
+    flags = ",".join(f"{category}:{severities[category]}" for category in sorted(severities))
+    return f"{band}|{flags}"
+
+
+def table_key(match_score: int, red_flags: List[Dict[str, Any]], bands: List[Tuple[int, int]] = SCORE_BANDS) -> Optional[str]:
+    """Table key for the explainer inputs, or None if a flag falls outside the known categories."""
+    band = score_band(match_score, bands)
+    if band is None:
+        return None
+    severities: Dict[str, str] = {}
+    for flag in red_flags or []:
+        if not isinstance(flag, dict):
+            return None
+        category = flag_category(flag.get("type", ""))
+        severity = str(flag.get("severity", "")).upper()
+        if category is None or severity not in SEVERITY_RANK:
+            return None
+        if severity not in KEY_SEVERITIES:
+            continue
+        # Duplicate flags for one category collapse to the most severe
+        if SEVERITY_RANK[severity] > SEVERITY_RANK.get(severities.get(category), -1):
+            severities[category] = severity
+    return combination_key(band, severities)
+
+
+def iter_combinations(bands: List[Tuple[int, int]] = SCORE_BANDS):
+    """Yields (key, representative score, severities) for the whole combination space."""
+    options = [(None,) + KEY_SEVERITIES] * len(FLAG_CATEGORIES)
+    for low, high in bands:
+        for choice in itertools.product(*options):
+            severities = {category: s for category, s in zip(FLAG_CATEGORIES, choice) if s}
+            yield combination_key(f"{low}-{high}", severities), (low + high) // 2, severities
+
+
+class ExplanationTable:
+    """
+    Read-only lookup of precomputed explanations for every (score band, red-flag
+    combination). The table is generated offline by precompute_explanations.py and
+    shipped as JSON; summaries carry a score placeholder filled in per request.
+    Only tables generated by an LLM are loaded.
+    """
+
+    def __init__(self, entries: Dict[str, Dict[str, Any]], bands: List[Tuple[int, int]] = SCORE_BANDS, model: Optional[str] = None):
+        self.entries = entries
+        self.bands = bands
+        self.model = model
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_TABLE_PATH) -> Optional["ExplanationTable"]:
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != TABLE_VERSION:
+            print(f"⚠ Ignoring explanation table {path}: unsupported version {data.get('version')}")
+            return None
+        if data.get("model") in (None, "", RULE_BASED_MODEL):
+            print(f"⚠ Ignoring explanation table {path}: not generated by an LLM (model {data.get('model')!r})")
+            return None
+        bands = [tuple(band) for band in data.get("score_bands", SCORE_BANDS)]
+        return cls(data.get("entries", {}), bands=bands, model=data.get("model"))
+
+    def lookup(self, match_score: int, red_flags: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Precomputed explanation rendered for this score, or None for unseen combinations."""
+        key = table_key(match_score, red_flags, self.bands)
+        entry = self.entries.get(key) if key is not None else None
+        stage_metrics.count("cache.explanation_table.hit" if entry else "cache.explanation_table.miss")
+        if not entry:
+            return None
+        return render_explanation(
+            {**entry, "negotiation_checklist": [dict(item) for item in entry.get("negotiation_checklist", [])]},
+            match_score,
+        )
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+def save_table(path: str, entries: Dict[str, Dict[str, Any]], model: str, bands: List[Tuple[int, int]] = SCORE_BANDS):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = {
+        "version": TABLE_VERSION,
+        "model": model,
+        "score_bands": [list(band) for band in bands],
+        "entries": dict(sorted(entries.items())),
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=1, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+# Global table instance
+explanation_table: Optional[ExplanationTable] = None
+if os.getenv("EXPLANATION_TABLE_ENABLED", "true").lower() in ("1", "true", "yes"):
+    try:
+        explanation_table = ExplanationTable.load(os.getenv("EXPLANATION_TABLE_PATH", DEFAULT_TABLE_PATH))
+    except Exception as e:
+        print(f"⚠ Failed to load explanation table: {e}")
@@ -0,0 +1,327 @@
+"""
+Offline stand-in for the Groq chat completions API, used as the LLM gateway's
+backend for benchmarks and load tests (LLM_BACKEND=fake). It exposes the same
+`client.chat.completions.create(**request)` surface as Groq/AsyncGroq and can
+  - synthesize deterministic responses (tool calls satisfy the request's tool
+    schema, e.g. CONFLICT_OUTPUT_SCHEMA / EXPLANATION_OUTPUT_SCHEMA),
+  - replay responses captured from the real API (LLM_BACKEND=record writes them),
+  - inject latency (log-normal) and provider errors at a configurable rate.
+Agents still enable their LLM path on GROQ_API_KEY, so set it to any value offline.
+"""
+import os
+import re
+import json
+import math
+import time
+import random
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
+import httpx
+from groq import APIConnectionError, APITimeoutError, RateLimitError, InternalServerError
+from models.profile import SleepSchedule, Cleanliness, NoiseTolerance, StudyHabits, FoodPref
+from services.prompt_encoding import dumps_compact, estimate_prompt_tokens
+
+ERROR_KINDS = ("rate_limit", "timeout", "server", "connection")
+_FAKE_URL = "https://fake-llm.local/openai/v1/chat/completions"
+
+
+def request_key(request: Dict[str, Any]) -> str:
+    """Stable key of the parts of a request that determine the response."""
+    relevant = {k: request.get(k) for k in ("model", "messages", "tools", "tool_choice", "response_format")}
+    return hashlib.sha256(json.dumps(relevant, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def build_completion(content: Optional[str], tool_calls: Optional[List[Dict[str, str]]], usage: Dict[str, int], model: str = "") -> Any:
+    """Object with the attributes the agents read from a Groq ChatCompletion."""
+    calls = None
+    if tool_calls:
+        calls = [
+            SimpleNamespace(id=f"call_{i}", type="function", function=SimpleNamespace(name=c["name"], arguments=c["arguments"]))
+            for i, c in enumerate(tool_calls)
+        ]
+    message = SimpleNamespace(role="assistant", content=content, tool_calls=calls)
+    return SimpleNamespace(
+        model=model,
+        choices=[SimpleNamespace(index=0, message=message, finish_reason="tool_calls" if calls else "stop")],
+        usage=SimpleNamespace(**usage),
+    )
+
+
+def completion_to_record(chat_completion: Any) -> Dict[str, Any]:
+    """Serializable form of a (real or fake) completion for the recordings file."""
+    message = chat_completion.choices[0].message
+    tool_calls = [
+        {"name": c.function.name, "arguments": c.function.arguments} for c in (message.tool_calls or [])
+    ]
+    usage = getattr(chat_completion, "usage", None)
+    return {
+        "content": message.content,
+        "tool_calls": tool_calls or None,
+        "usage": {
+            "prompt_tokens": getattr(usage, "prompt_tokens", 0),
+            "completion_tokens": getattr(usage, "completion_tokens", 0),
+            "total_tokens": getattr(usage, "total_tokens", 0),
+        },
+    }
+
+
+class SyntheticResponder:
+    """Deterministic, schema-valid responses for every prompt the agents send."""
+
+    SEVERITIES = ["HIGH", "MEDIUM", "LOW"]
+    CATEGORIES = ["Sleep", "Cleanliness", "Noise", "Study", "Food", "Budget"]
+    CITIES = {"Lahore": ["DHA", "Gulberg", "Johar Town"], "Karachi": ["Clifton", "Gulshan"], "Islamabad": ["F-10", "G-11"]}
+
+    def respond(
+        self, request: Dict[str, Any], rng: random.Random, prompt_name: str = "chat"
+    ) -> Tuple[Optional[str], Optional[List[Dict[str, str]]]]:
+        """Picks the response shape by the gateway's prompt name, so prompt wording can change freely."""
+        tools = request.get("tools")
+        if tools:
+            function = tools[0]["function"]
+            arguments = self.from_schema(function.get("parameters", {}), rng)
+            return None, [{"name": function["name"], "arguments": dumps_compact(arguments)}]
+
+        user = str(request["messages"][-1].get("content", ""))
+        if request.get("response_format", {}).get("type") != "json_object":
+            return "This listing is a great match because it fits your budget and preferred area.", None
+        if prompt_name == "score_batch":
+            return dumps_compact({"results": [self._score(rng, cid) for cid in self._candidate_ids(user)]}), None
+        if prompt_name == "profile_parse":
+            return dumps_compact(self._parsed_profile(rng)), None
+        return dumps_compact(self._score(rng)), None
+
+    def from_schema(self, schema: Dict[str, Any], rng: random.Random, name: str = "") -> Any:
+        """Random value satisfying a (simple) JSON schema, with field-name-aware strings."""
+        kind = schema.get("type")
+        if kind == "object":
+            return {key: self.from_schema(sub, rng, key) for key, sub in schema.get("properties", {}).items()}
+        if kind == "array":
+            return [self.from_schema(schema.get("items", {}), rng, name) for _ in range(rng.randint(0, 3))]
+        if kind == "integer":
+            return rng.randint(0, 100)
+        if kind == "number":
+            return round(rng.uniform(0, 100), 2)
+        if kind == "boolean":
+            return rng.random() < 0.5
+        if "enum" in schema:
+            return rng.choice(schema["enum"])
+        if name == "severity":
+            return rng.choice(self.SEVERITIES)
+        if name in ("type", "category"):
+            return rng.choice(self.CATEGORIES)
+        if name == "reasons":
+            return rng.choice(["Budgets are close", "Same city", "Compatible sleep schedules", "Similar cleanliness"])
+        return f"Synthetic {name or 'text'} {rng.randint(1000, 9999)}"
+
+    def _score(self, rng: random.Random, candidate_id: Optional[str] = None) -> Dict[str, Any]:
+        entry = {"score": rng.randint(20, 95), "reasons": [self.from_schema({}, rng, "reasons") for _ in range(2)]}
+        return {"id": candidate_id, **entry} if candidate_id is not None else entry
+
+    @staticmethod
+    def _candidate_ids(user_prompt: str) -> List[str]:
+        try:
+            candidates = json.loads(user_prompt.split("Candidates:", 1)[1].strip())
+            return [str(c.get("id")) for c in candidates]
+        except (ValueError, AttributeError):
+            return re.findall(r'"id"\s*:\s*"([^"]+)"', user_prompt)
+
+    def _parsed_profile(self, rng: random.Random) -> Dict[str, Any]:
+        city = rng.choice(sorted(self.CITIES))
+        return {
+            "city": city,
+            "area": rng.choice(self.CITIES[city]),
+            "budget_PKR": rng.randrange(10000, 60000, 1000),
+            "sleep_schedule": rng.choice(list(SleepSchedule)).value,
+            "cleanliness": rng.choice(list(Cleanliness)).value,
+            "noise_tolerance": rng.choice(list(NoiseTolerance)).value,
+            "study_habits": rng.choice(list(StudyHabits)).value,
+            "food_pref": rng.choice(list(FoodPref)).value,
+            "age": rng.randint(18, 35),
+            "occupation": rng.choice(["Student", "Engineer", "Designer"]),
+            "full_name": f"Synthetic User {rng.randint(100, 999)}",
+        }
+
+
+class FakeLLMBackend:
+    """Shared engine behind FakeGroq / FakeAsyncGroq."""
+
+    def __init__(
+        self,
+        mode: str = "synthetic",
+        recordings_path: Optional[str] = None,
+        replay_miss: str = "synthetic",
+        latency_median_ms: float = 0.0,
+        latency_sigma: float = 0.5,
+        error_rate: float = 0.0,
+        error_kinds: Tuple[str, ...] = ERROR_KINDS,
+        seed: int = 0,
+        max_tracked_requests: int = 10000,
+    ):
+        if mode not in ("synthetic", "replay"):
+            raise ValueError(f"Unknown fake LLM mode: {mode}")
+        self.mode = mode
+        self.replay_miss = replay_miss
+        self.latency_median_ms = latency_median_ms
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.error_kinds = error_kinds
+        self.seed = seed
+        self.responder = SyntheticResponder()
+        self.recordings: Dict[str, Dict[str, Any]] = {}
+        if mode == "replay" and recordings_path:
+            self.recordings = load_recordings(recordings_path)
+        # Repeat count per request key, least recently used first; bounded for long load tests
+        self._calls: "OrderedDict[str, int]" = OrderedDict()
+        self.max_tracked_requests = max_tracked_requests
+        self._lock = threading.Lock()
+
+    def _rng(self, key: str) -> random.Random:
+        # Seeded per request and repeat count, so results do not depend on call interleaving.
+        # A request evicted from the counter starts its repeat sequence over.
+        with self._lock:
+            n = self._calls.pop(key, 0)
+            self._calls[key] = n + 1
+            if len(self._calls) > self.max_tracked_requests:
+                self._calls.popitem(last=False)
+        return random.Random(f"{self.seed}:{key}:{n}")
+
+    def _delay(self, rng: random.Random) -> float:
+        if self.latency_median_ms <= 0:
+            return 0.0
+        return self.latency_median_ms / 1000.0 * math.exp(self.latency_sigma * rng.gauss(0, 1))
+
+    def _error(self, rng: random.Random) -> Optional[Exception]:
+        if self.error_rate <= 0 or rng.random() >= self.error_rate:
+            return None
+        kind = rng.choice(self.error_kinds)
+        request = httpx.Request("POST", _FAKE_URL)
+        if kind == "rate_limit":
+            return RateLimitError("Rate limit reached (fake)", response=httpx.Response(429, request=request), body=None)
+        if kind == "server":
+            return InternalServerError("Internal server error (fake)", response=httpx.Response(500, request=request), body=None)
+        if kind == "timeout":
+            return APITimeoutError(request=request)
+        return APIConnectionError(request=request)
+
+    def plan(self, request: Dict[str, Any], prompt_name: str = "chat") -> Tuple[float, Optional[Exception], Any]:
+        """(delay seconds, error to raise or None, completion) for one request."""
+        key = request_key(request)
+        rng = self._rng(key)
+        delay, error = self._delay(rng), self._error(rng)
+
+        record = self.recordings.get(key)
+        if record is None:
+            if self.mode == "replay" and self.replay_miss == "error":
+                raise KeyError(f"No recorded response for request {key[:12]}")
+            content, tool_calls = self.responder.respond(request, rng, prompt_name)
+            prompt_tokens = estimate_prompt_tokens(request.get("messages", []), request.get("tools"))
+            completion_tokens = len(content or dumps_compact(tool_calls)) // 4 + 1
+            record = {
+                "content": content,
+                "tool_calls": tool_calls,
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                          "total_tokens": prompt_tokens + completion_tokens},
+            }
+        completion = build_completion(record["content"], record["tool_calls"], record["usage"], request.get("model", ""))
+        return delay, error, completion
+
+
+def load_recordings(path: str) -> Dict[str, Dict[str, Any]]:
+    recordings = {}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    recordings[entry["key"]] = entry["response"]
+    return recordings
+
+
+class _Completions:
+    def __init__(self, backend: FakeLLMBackend):
+        self._backend = backend
+
+    def create(self, prompt_name: str = "chat", **request) -> Any:
+        delay, error, completion = self._backend.plan(request, prompt_name)
+        time.sleep(delay)
+        if error:
+            raise error
+        return completion
+
+
+class _AsyncCompletions(_Completions):
+    async def create(self, prompt_name: str = "chat", **request) -> Any:
+        delay, error, completion = self._backend.plan(request, prompt_name)
+        await asyncio.sleep(delay)
+        if error:
+            raise error
+        return completion
+
+
+class FakeGroq:
+    """Drop-in for groq.Groq as used by the gateway."""
+
+    def __init__(self, backend: FakeLLMBackend):
+        self.chat = SimpleNamespace(completions=_Completions(backend))
+
+
+class FakeAsyncGroq:
+    """Drop-in for groq.AsyncGroq as used by the gateway."""
+
+    def __init__(self, backend: FakeLLMBackend):
+        self.chat = SimpleNamespace(completions=_AsyncCompletions(backend))
+
+
+class _RecordingCompletions:
+    def __init__(self, completions: Any, recorder: "Recorder"):
+        self._completions = completions
+        self._recorder = recorder
+
+    def create(self, **request) -> Any:
+        completion = self._completions.create(**request)
+        self._recorder.write(request, completion)
+        return completion
+
+
+class _AsyncRecordingCompletions(_RecordingCompletions):
+    async def create(self, **request) -> Any:
+        completion = await self._completions.create(**request)
+        self._recorder.write(request, completion)
+        return completion
+
+
+class Recorder:
+    """Appends real API responses to a JSONL file that replay mode can load."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def write(self, request: Dict[str, Any], completion: Any):
+        line = json.dumps({"key": request_key(request), "response": completion_to_record(completion)}, default=str)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+    def wrap(self, client: Any, is_async: bool = False) -> Any:
+        completions_cls = _AsyncRecordingCompletions if is_async else _RecordingCompletions
+        return SimpleNamespace(chat=SimpleNamespace(completions=completions_cls(client.chat.completions, self)))
+
+
+def fake_backend_from_env() -> FakeLLMBackend:
+    kinds = tuple(k.strip() for k in os.getenv("FAKE_LLM_ERROR_KINDS", ",".join(ERROR_KINDS)).split(",") if k.strip())
+    return FakeLLMBackend(
+        mode=os.getenv("FAKE_LLM_MODE", "synthetic"),
+        recordings_path=os.getenv("FAKE_LLM_RECORDINGS", "llm_recordings.jsonl"),
+        replay_miss=os.getenv("FAKE_LLM_REPLAY_MISS", "synthetic"),
+        latency_median_ms=float(os.getenv("FAKE_LLM_LATENCY_MS", "0")),
+        latency_sigma=float(os.getenv("FAKE_LLM_LATENCY_SIGMA", "0.5")),
+        error_rate=float(os.getenv("FAKE_LLM_ERROR_RATE", "0")),
+        error_kinds=kinds,
+        seed=int(os.getenv("FAKE_LLM_SEED", "0")),
+        max_tracked_requests=int(os.getenv("FAKE_LLM_MAX_TRACKED_REQUESTS", "10000")),
+    )
@@ -0,0 +1,412 @@
+import os
+import time
+import random
+import asyncio
+import threading
+import contextvars
+from enum import IntEnum
+from contextlib import contextmanager
+from typing import Any, Dict, Optional, Tuple
+import httpx
+from groq import Groq, AsyncGroq, APIConnectionError, APITimeoutError, RateLimitError, InternalServerError
+from services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from services.prompt_encoding import PromptTokenStats, estimate_prompt_tokens
+from services.tracing import span, stage_metrics
+from services import metrics
+
+
+class Priority(IntEnum):
+    """Interactive (request-path) calls are allowed to drain the limiter; background work is not."""
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+# Priority of LLM calls made from the current context (set by background workers)
+_current_priority: contextvars.ContextVar[Priority] = contextvars.ContextVar("llm_priority", default=Priority.INTERACTIVE)
+
+RETRYABLE_ERRORS = (APIConnectionError, APITimeoutError, RateLimitError, InternalServerError)
+
+
+def is_provider_failure(error: Exception) -> bool:
+    """Transport errors, 429s and 5xx count against a model's breaker; other errors are ours."""
+    if isinstance(error, RETRYABLE_ERRORS):
+        return True
+    status_code = getattr(error, "status_code", None)
+    return isinstance(status_code, int) and (status_code == 429 or status_code >= 500)
+
+
+class DegradationTracker:
+    """Collects whether any LLM call in a scope was skipped or failed (so a fallback was used)."""
+
+    def __init__(self, parent: Optional["DegradationTracker"] = None):
+        self.parent = parent
+        self.degraded = False
+
+    def mark(self):
+        tracker = self
+        while tracker is not None:
+            tracker.degraded = True
+            tracker = tracker.parent
+
+
+_current_tracker: contextvars.ContextVar[Optional[DegradationTracker]] = contextvars.ContextVar("llm_degradation", default=None)
+
+
+class RateLimitBudgetExceeded(Exception):
+    """Raised when an interactive call would wait on the rate limiter longer than its budget."""
+
+
+class RateLimiter:
+    """
+    Token-bucket limiter over both requests and (estimated) tokens per minute.
+    Background calls only proceed while the buckets stay above a reserved
+    fraction of capacity, so interactive calls always get through first.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int, background_reserve: float = 0.25):
+        self.capacity = (float(requests_per_minute), float(tokens_per_minute))
+        self.rates = (requests_per_minute / 60.0, tokens_per_minute / 60.0)
+        self.levels = list(self.capacity)
+        self.background_reserve = background_reserve
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        for i in range(2):
+            self.levels[i] = min(self.capacity[i], self.levels[i] + elapsed * self.rates[i])
+
+    def reserve(self, tokens: int, priority: Priority) -> float:
+        """
+        Takes one request and `tokens` tokens if available and returns 0.
+        Otherwise takes nothing and returns the number of seconds to wait before retrying.
+        """
+        floor_fraction = self.background_reserve if priority == Priority.BACKGROUND else 0.0
+        with self._lock:
+            self._refill()
+            wanted = (1.0, float(tokens))
+            wait = 0.0
+            for i in range(2):
+                floor = floor_fraction * self.capacity[i]
+                # Never ask for more than the bucket can ever hold
+                amount = min(wanted[i], self.capacity[i] - floor)
+                if self.levels[i] - amount < floor:
+                    wait = max(wait, (amount + floor - self.levels[i]) / self.rates[i])
+            if wait > 0:
+                return wait
+            for i in range(2):
+                floor = floor_fraction * self.capacity[i]
+                self.levels[i] -= min(wanted[i], self.capacity[i] - floor)
+            return 0.0
+
+    def acquire(self, tokens: int, priority: Priority, max_wait: Optional[float] = None):
+        """
+        Blocks until the call is admitted. Raises RateLimitBudgetExceeded instead of
+        waiting if admission is more than `max_wait` seconds away (None waits indefinitely).
+        """
+        deadline = time.monotonic() + max_wait if max_wait is not None else None
+        while (wait := self.reserve(tokens, priority)) > 0:
+            if deadline is not None and time.monotonic() + wait > deadline:
+                raise RateLimitBudgetExceeded(f"Rate limited for another {wait:.1f}s")
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: int, priority: Priority, max_wait: Optional[float] = None):
+        """Async variant of acquire."""
+        deadline = time.monotonic() + max_wait if max_wait is not None else None
+        while (wait := self.reserve(tokens, priority)) > 0:
+            if deadline is not None and time.monotonic() + wait > deadline:
+                raise RateLimitBudgetExceeded(f"Rate limited for another {wait:.1f}s")
+            await asyncio.sleep(wait)
+
+
+class LLMGateway:
+    """
+    Single entry point for every agent's chat completions: one pooled Groq client
+    (sync and async), a global request/token rate limiter, jittered exponential
+    retries on transient errors, priority classes for background work and a
+    per-model circuit breaker that fails fast while the provider is unhealthy.
+    Interactive calls wait at most `max_rate_limit_wait` seconds for the limiter, then
+    fail fast so the agent answers from its rule-based fallback; background calls wait.
+    """
+
+    DEFAULT_COMPLETION_TOKENS = 512
+
+    def __init__(
+        self,
+        api_key: Optional[str],
+        requests_per_minute: int = 30,
+        tokens_per_minute: int = 60000,
+        max_retries: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 8.0,
+        max_connections: int = 20,
+        max_in_flight: int = 32,
+        timeout: float = 30.0,
+        max_rate_limit_wait: Optional[float] = 2.0,
+        breaker_settings: Optional[Dict[str, Any]] = None,
+        backend: str = "groq",
+    ):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_in_flight = max_in_flight
+        self.max_rate_limit_wait = max_rate_limit_wait
+        self.limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.breaker_settings = breaker_settings or {}
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self._breakers_lock = threading.Lock()
+        self.prompt_stats = PromptTokenStats()
+
+        self.backend = backend
+        self.client = None
+        self.async_client = None
+        if backend == "fake":
+            # Offline stand-in with the same surface (benchmarks, load tests)
+            from services.fake_llm import FakeGroq, FakeAsyncGroq, fake_backend_from_env
+            fake = fake_backend_from_env()
+            self.client, self.async_client = FakeGroq(fake), FakeAsyncGroq(fake)
+        elif api_key:
+            limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+            # Retries are handled here, so the SDK's own retry loop is disabled
+            self.client = Groq(
+                api_key=api_key, max_retries=0, timeout=timeout,
+                http_client=httpx.Client(limits=limits, timeout=timeout),
+            )
+            self.async_client = AsyncGroq(
+                api_key=api_key, max_retries=0, timeout=timeout,
+                http_client=httpx.AsyncClient(limits=limits, timeout=timeout),
+            )
+            if backend == "record":
+                # Captures real responses for replay by the fake backend
+                from services.fake_llm import Recorder
+                recorder = Recorder(os.getenv("FAKE_LLM_RECORDINGS", "llm_recordings.jsonl"))
+                self.client = recorder.wrap(self.client)
+                self.async_client = recorder.wrap(self.async_client, is_async=True)
+
+    @property
+    def available(self) -> bool:
+        return self.client is not None
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        return self._semaphore
+
+    def breaker(self, model: str) -> CircuitBreaker:
+        with self._breakers_lock:
+            if model not in self.breakers:
+                self.breakers[model] = CircuitBreaker(**self.breaker_settings)
+            return self.breakers[model]
+
+    @contextmanager
+    def track_degradation(self):
+        """Yields a tracker whose `degraded` flag is set if any LLM call in this scope fell back."""
+        tracker = DegradationTracker(parent=_current_tracker.get())
+        token = _current_tracker.set(tracker)
+        try:
+            yield tracker
+        finally:
+            _current_tracker.reset(token)
+
+    @staticmethod
+    def mark_degraded():
+        """Flags the enclosing track_degradation scope; agents call it when a rule-based fallback replaces LLM output."""
+        tracker = _current_tracker.get()
+        if tracker is not None:
+            tracker.mark()
+
+    @contextmanager
+    def priority(self, priority: Priority):
+        """Runs the enclosed LLM calls (in this context) at the given priority."""
+        token = _current_priority.set(priority)
+        try:
+            yield
+        finally:
+            _current_priority.reset(token)
+
+    @staticmethod
+    def current_priority() -> Priority:
+        """Priority that LLM calls made in this context will run at."""
+        return _current_priority.get()
+
+    def _estimate_tokens(self, request: Dict[str, Any]) -> Tuple[int, int]:
+        """(estimated prompt tokens, prompt + completion tokens to reserve from the limiter)."""
+        prompt = estimate_prompt_tokens(request.get("messages", []), request.get("tools"))
+        completion = request.get("max_tokens") or self.DEFAULT_COMPLETION_TOKENS
+        return prompt, prompt + completion
+
+    def _record_prompt(self, prompt_name: str, estimated: int, response: Any):
+        usage = getattr(response, "usage", None)
+        prompt_tokens = getattr(usage, "prompt_tokens", None)
+        self.prompt_stats.record(prompt_name, estimated, prompt_tokens)
+        model = getattr(response, "model", "") or ""
+        metrics.llm_tokens.inc(prompt_name, model, "prompt", amount=prompt_tokens or estimated)
+        metrics.llm_tokens.inc(prompt_name, model, "completion", amount=getattr(usage, "completion_tokens", None) or 0)
+
+    @contextmanager
+    def _observe_call(self, prompt_name: str, model: str):
+        """Span plus per-prompt/model call count (by outcome) and latency for one gateway call."""
+        started = time.monotonic()
+        outcome = "error"
+        try:
+            with span(f"llm.{prompt_name}"):
+                yield
+            outcome = "ok"
+        except CircuitOpenError:
+            outcome = "circuit_open"
+            raise
+        finally:
+            metrics.llm_calls.inc(prompt_name, model, outcome)
+            metrics.llm_latency.observe(time.monotonic() - started, prompt_name, model)
+
+    def _retry_delay(self, attempt: int, error: Exception) -> float:
+        """Honours Retry-After when the provider sends it, otherwise full-jitter backoff."""
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), self.max_delay)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def _prepare(self, request: Dict[str, Any], priority: Optional[Priority]) -> Tuple[int, int, Priority]:
+        if not self.available:
+            self.mark_degraded()
+            raise RuntimeError("Groq client not initialized")
+        prompt_tokens, tokens = self._estimate_tokens(request)
+        return prompt_tokens, tokens, priority if priority is not None else _current_priority.get()
+
+    def _admit(self, breaker: CircuitBreaker, model: str):
+        if not breaker.allow_request():
+            stage_metrics.count("llm.circuit_open_rejections")
+            self.mark_degraded()
+            raise CircuitOpenError(f"Circuit open for model {model}")
+
+    def _max_wait(self, priority: Priority) -> Optional[float]:
+        return self.max_rate_limit_wait if priority == Priority.INTERACTIVE else None
+
+    def _provider_request(self, prompt_name: str, request: Dict[str, Any]) -> Dict[str, Any]:
+        # The fake backend picks its synthetic response by prompt name; the Groq SDK takes no such argument
+        return {**request, "prompt_name": prompt_name} if self.backend == "fake" else request
+
+    def chat_completion(self, priority: Optional[Priority] = None, prompt_name: str = "chat", **request) -> Any:
+        """Rate-limited, retried chat.completions.create. Prompt tokens and latency are tallied under `prompt_name`."""
+        with self._observe_call(prompt_name, request.get("model", "")):
+            return self._chat_completion(priority, prompt_name, request)
+
+    def _chat_completion(self, priority: Optional[Priority], prompt_name: str, request: Dict[str, Any]) -> Any:
+        prompt_tokens, tokens, priority = self._prepare(request, priority)
+        model = request.get("model", "")
+        breaker = self.breaker(model)
+
+        for attempt in range(self.max_retries + 1):
+            # Capacity is taken before admission so a rate-limit fallback never holds the half-open probe
+            try:
+                self.limiter.acquire(tokens, priority, self._max_wait(priority))
+            except RateLimitBudgetExceeded:
+                stage_metrics.count("llm.rate_limit_fallbacks")
+                self.mark_degraded()
+                raise
+            self._admit(breaker, model)
+            started = time.monotonic()
+            settled = False
+            try:
+                response = self.client.chat.completions.create(**self._provider_request(prompt_name, request))
+                breaker.record(True, time.monotonic() - started)
+                settled = True
+                self._record_prompt(prompt_name, prompt_tokens, response)
+                return response
+            except Exception as e:
+                if not settled:
+                    if is_provider_failure(e):
+                        breaker.record(False, time.monotonic() - started)
+                    else:
+                        breaker.release()
+                    settled = True
+                if not isinstance(e, RETRYABLE_ERRORS) or attempt == self.max_retries:
+                    self.mark_degraded()
+                    raise
+                delay = self._retry_delay(attempt, e)
+                print(f"⚠ LLM call failed ({type(e).__name__}), retrying in {delay:.2f}s...")
+                stage_metrics.count("llm.retries")
+                time.sleep(delay)
+            finally:
+                # BaseExceptions (e.g. KeyboardInterrupt) must not leak the half-open probe
+                if not settled:
+                    breaker.release()
+
+    async def chat_completion_async(self, priority: Optional[Priority] = None, prompt_name: str = "chat", **request) -> Any:
+        """Async variant; also bounded by the process-wide in-flight semaphore."""
+        with self._observe_call(prompt_name, request.get("model", "")):
+            return await self._chat_completion_async(priority, prompt_name, request)
+
+    async def _chat_completion_async(self, priority: Optional[Priority], prompt_name: str, request: Dict[str, Any]) -> Any:
+        prompt_tokens, tokens, priority = self._prepare(request, priority)
+        model = request.get("model", "")
+        breaker = self.breaker(model)
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                await self.limiter.acquire_async(tokens, priority, self._max_wait(priority))
+            except RateLimitBudgetExceeded:
+                stage_metrics.count("llm.rate_limit_fallbacks")
+                self.mark_degraded()
+                raise
+            async with self.semaphore:
+                # Admitted only once a slot is free, so the half-open probe is never held while queued
+                self._admit(breaker, model)
+                started = time.monotonic()
+                settled = False
+                try:
+                    response = await self.async_client.chat.completions.create(**self._provider_request(prompt_name, request))
+                    breaker.record(True, time.monotonic() - started)
+                    settled = True
+                    self._record_prompt(prompt_name, prompt_tokens, response)
+                    return response
+                except Exception as e:
+                    if not settled:
+                        if is_provider_failure(e):
+                            breaker.record(False, time.monotonic() - started)
+                        else:
+                            breaker.release()
+                        settled = True
+                    if not isinstance(e, RETRYABLE_ERRORS) or attempt == self.max_retries:
+                        self.mark_degraded()
+                        raise
+                    delay = self._retry_delay(attempt, e)
+                    print(f"⚠ LLM call failed ({type(e).__name__}), retrying in {delay:.2f}s...")
+                finally:
+                    # asyncio.CancelledError is a BaseException and must not leak the half-open probe
+                    if not settled:
+                        breaker.release()
+            # Back off outside the in-flight semaphore
+            stage_metrics.count("llm.retries")
+            await asyncio.sleep(delay)
+
+
+# Global gateway instance shared by all agents
+llm_gateway = LLMGateway(
+    api_key=os.getenv("GROQ_API_KEY"),
+    requests_per_minute=int(os.getenv("LLM_REQUESTS_PER_MINUTE", "30")),
+    tokens_per_minute=int(os.getenv("LLM_TOKENS_PER_MINUTE", "60000")),
+    max_retries=int(os.getenv("LLM_MAX_RETRIES", "3")),
+    max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "20")),
+    max_in_flight=int(os.getenv("LLM_MAX_IN_FLIGHT", "32")),
+    timeout=float(os.getenv("LLM_TIMEOUT_SECONDS", "30")),
+    max_rate_limit_wait=float(os.getenv("LLM_RATE_LIMIT_MAX_WAIT_SECONDS", "2")),
+    backend=os.getenv("LLM_BACKEND", "groq"),
+    breaker_settings={
+        "window_seconds": float(os.getenv("LLM_BREAKER_WINDOW_SECONDS", "60")),
+        "min_calls": int(os.getenv("LLM_BREAKER_MIN_CALLS", "5")),
+        "error_rate_threshold": float(os.getenv("LLM_BREAKER_ERROR_RATE", "0.5")),
+        "slow_call_seconds": float(os.getenv("LLM_BREAKER_SLOW_SECONDS", "10")),
+        "slow_rate_threshold": float(os.getenv("LLM_BREAKER_SLOW_RATE", "0.5")),
+        "open_seconds": float(os.getenv("LLM_BREAKER_OPEN_SECONDS", "30")),
+    },
+)
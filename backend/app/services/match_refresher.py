@@ -0,0 +1,179 @@
+import os
+import time
+import threading
+from datetime import datetime, timezone, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+from bson import ObjectId
+from services.llm_gateway import llm_gateway, Priority
+
+
+class MatchRefreshWorker:
+    """
+    Keeps a precomputed, ranked top-N match list per profile in the match_results
+    collection. Refreshes run on a small background pool, triggered when a profile
+    is created or updated, when a stored list is served stale, and by a periodic
+    sweep over lists older than the staleness threshold.
+
+    Stored results hold the candidate's profile_id and the pipeline scores only;
+    candidate profiles (and their photos) are loaded when the list is read.
+    """
+
+    def __init__(self, top_n: int = 10, rerank_factor: int = 3, max_age_seconds: int = 6 * 3600, sweep_interval_seconds: int = 600, max_workers: int = 2):
+        self.top_n = top_n
+        # Same two-stage shortlist as /ai/best_matches (0 runs every candidate through the LLM)
+        self.shortlist_size = rerank_factor * top_n or None
+        self.max_age_seconds = max_age_seconds
+        self.sweep_interval_seconds = sweep_interval_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="match-refresh")
+        self._in_flight = set()
+        self._lock = threading.Lock()
+        self._sweeper: Optional[threading.Thread] = None
+
+    def is_stale(self, stored: Dict[str, Any]) -> bool:
+        """A stored list is stale if flagged or older than the staleness threshold."""
+        if stored.get("stale"):
+            return True
+        computed_at = stored.get("computed_at")
+        if not computed_at:
+            return True
+        if computed_at.tzinfo is None:
+            computed_at = computed_at.replace(tzinfo=timezone.utc)
+        return datetime.now(timezone.utc) - computed_at > timedelta(seconds=self.max_age_seconds)
+
+    def get_stored(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        """Indexed read of the stored match list for a profile, with candidate profiles loaded."""
+        from db.mongo import get_match_results_collection
+        stored = get_match_results_collection().find_one({"profile_id": str(profile_id)})
+        if stored:
+            stored["results"] = self._hydrate(stored["results"])
+        return stored
+
+    @staticmethod
+    def _compact(result: Dict[str, Any]) -> Dict[str, Any]:
+        """Stored form of a pipeline result: the candidate's id instead of its profile."""
+        stored = {key: value for key, value in result.items() if key != "profile"}
+        stored["profile_id"] = result["profile"]["id"]
+        return stored
+
+    @staticmethod
+    def _hydrate(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Loads the candidate profiles for stored results in one query. Deleted candidates are dropped."""
+        from db.mongo import get_profiles_collection
+        from agents.agent_pipeline import pipeline_profile
+
+        ids = [r["profile_id"] for r in results]
+        docs = {
+            str(doc["_id"]): doc
+            for doc in get_profiles_collection().find({"_id": {"$in": [ObjectId(i) for i in ids]}})
+        }
+        hydrated = []
+        for profile_id, result in zip(ids, results):
+            doc = docs.get(profile_id)
+            if doc is not None:
+                hydrated.append({**result, "profile_id": profile_id, "profile": pipeline_profile(doc)})
+        return hydrated
+
+    def refresh_now(self, profile_id: str, priority: Priority = Priority.BACKGROUND) -> Optional[Dict[str, Any]]:
+        """Recomputes and stores the match list for a profile synchronously."""
+        from db.mongo import get_profiles_collection, get_match_results_collection
+        from agents.agent_pipeline import match_pipeline, pipeline_profile
+
+        profile_doc = get_profiles_collection().find_one({"_id": ObjectId(profile_id)})
+        if not profile_doc:
+            return None
+
+        user_profile = pipeline_profile(profile_doc, include_photo=False)
+        # Background refreshes must not starve interactive requests of LLM capacity
+        with llm_gateway.priority(priority):
+            results = match_pipeline.get_best_matches(user_profile, top_n=self.top_n, shortlist_size=self.shortlist_size)
+
+        stored = {
+            "profile_id": str(profile_id),
+            "top_n": self.top_n,
+            "results": [self._compact(r) for r in results],
+            "computed_at": datetime.now(timezone.utc),
+            # Lists built from rule-based fallbacks are recomputed on the next sweep
+            "stale": any(r.get("degraded") for r in results),
+        }
+        get_match_results_collection().replace_one({"profile_id": str(profile_id)}, stored, upsert=True)
+        return {**stored, "results": results}
+
+    def _run_refresh(self, profile_id: str):
+        try:
+            self.refresh_now(profile_id)
+            print(f"✅ Refreshed match list for profile {profile_id}")
+        except Exception as e:
+            print(f"❌ Match refresh failed for profile {profile_id}: {e}")
+        finally:
+            with self._lock:
+                self._in_flight.discard(profile_id)
+
+    def schedule_refresh(self, profile_id: str) -> bool:
+        """Queues a background refresh. Returns False if one is already queued for the profile."""
+        profile_id = str(profile_id)
+        with self._lock:
+            if profile_id in self._in_flight:
+                return False
+            self._in_flight.add(profile_id)
+        self._executor.submit(self._run_refresh, profile_id)
+        return True
+
+    def mark_stale_for(self, profile_id: str):
+        """Flags every stored list that contains the given profile as stale."""
+        from db.mongo import get_match_results_collection
+        get_match_results_collection().update_many(
+            {"results.profile_id": str(profile_id)}, {"$set": {"stale": True}}
+        )
+
+    def on_profile_changed(self, profile_id: str):
+        """Called after a profile is created or updated."""
+        try:
+            self.mark_stale_for(profile_id)
+        except Exception as e:
+            print(f"⚠ Failed to mark match lists stale for {profile_id}: {e}")
+        self.schedule_refresh(profile_id)
+
+    def on_profile_deleted(self, profile_id: str):
+        """Called after a profile is deleted: drops its own list and flags lists that contain it."""
+        from db.mongo import get_match_results_collection
+        try:
+            self.mark_stale_for(profile_id)
+            get_match_results_collection().delete_one({"profile_id": str(profile_id)})
+        except Exception as e:
+            print(f"⚠ Failed to clean up match lists for deleted profile {profile_id}: {e}")
+
+    def sweep_stale(self, limit: int = 100) -> int:
+        """Schedules refreshes for stored lists that are flagged or past the staleness threshold."""
+        from db.mongo import get_match_results_collection
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.max_age_seconds)
+        docs = get_match_results_collection().find(
+            {"$or": [{"stale": True}, {"computed_at": {"$lt": cutoff}}]}, {"profile_id": 1}
+        ).limit(limit)
+        return sum(1 for doc in docs if self.schedule_refresh(doc["profile_id"]))
+
+    def _sweep_loop(self):
+        while True:
+            time.sleep(self.sweep_interval_seconds)
+            try:
+                scheduled = self.sweep_stale()
+                if scheduled:
+                    print(f"⚡ Scheduled {scheduled} stale match list refreshes")
+            except Exception as e:
+                print(f"⚠ Match refresh sweep failed: {e}")
+
+    def start(self):
+        """Starts the periodic staleness sweep (idempotent)."""
+        if self._sweeper is None:
+            self._sweeper = threading.Thread(target=self._sweep_loop, name="match-refresh-sweeper", daemon=True)
+            self._sweeper.start()
+
+
+# Global worker instance
+match_refresh_worker = MatchRefreshWorker(
+    top_n=int(os.getenv("MATCH_RESULTS_TOP_N", "10")),
+    rerank_factor=int(os.getenv("MATCH_RERANK_FACTOR", "3")),
+    max_age_seconds=int(os.getenv("MATCH_RESULTS_MAX_AGE_SECONDS", str(6 * 3600))),
+    sweep_interval_seconds=int(os.getenv("MATCH_REFRESH_INTERVAL_SECONDS", "600")),
+    max_workers=int(os.getenv("MATCH_REFRESH_WORKERS", "2")),
+)
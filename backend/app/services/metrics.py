@@ -0,0 +1,140 @@
+import threading
+from typing import Dict, List, Optional, Tuple
+from services.tracing import Histogram, stage_metrics
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+NAMESPACE = "flatwalay"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: Optional[Dict[str, str]] = None) -> str:
+    pairs = list(zip(names, values)) + list((extra or {}).items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _render_histogram(lines: List[str], name: str, label_names: Tuple[str, ...], values: Tuple[str, ...], histogram: Histogram):
+    """Histogram series in seconds (tracing histograms are kept in milliseconds)."""
+    cumulative = 0
+    for bound, count in zip(histogram.bounds, histogram.counts):
+        cumulative += count
+        lines.append(f"{name}_bucket{_labels(label_names, values, {'le': repr(bound / 1000)})} {cumulative}")
+    lines.append(f"{name}_bucket{_labels(label_names, values, {'le': '+Inf'})} {histogram.count}")
+    lines.append(f"{name}_sum{_labels(label_names, values)} {histogram.sum_ms / 1000}")
+    lines.append(f"{name}_count{_labels(label_names, values)} {histogram.count}")
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = ()):
+        self.name = f"{NAMESPACE}_{name}"
+        self.help_text = help_text
+        self.label_names = label_names
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1):
+        with self._lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            return self.header() + [
+                f"{self.name}{_labels(self.label_names, values)} {value}" for values, value in sorted(self.values.items())
+            ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *label_values: str, amount: float = 1):
+        self.inc(*label_values, amount=-amount)
+
+
+class LabeledHistogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.series: Dict[Tuple[str, ...], Histogram] = {}
+
+    def observe(self, seconds: float, *label_values: str):
+        with self._lock:
+            histogram = self.series.get(label_values)
+            if histogram is None:
+                histogram = self.series[label_values] = Histogram()
+            histogram.observe(seconds * 1000)
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        with self._lock:
+            for values, histogram in sorted(self.series.items()):
+                _render_histogram(lines, self.name, self.label_names, values, histogram)
+        return lines
+
+
+# ----- HTTP -----
+http_requests = Counter("http_requests_total", "HTTP requests by route template, method and status.", ("route", "method", "status"))
+http_latency = LabeledHistogram("http_request_duration_seconds", "HTTP request latency by route template and method.", ("route", "method"))
+http_in_flight = Gauge("http_requests_in_flight", "HTTP requests currently being served.")
+
+# ----- LLM -----
+llm_calls = Counter("llm_calls_total", "LLM chat completions by prompt (agent), model and outcome.", ("prompt", "model", "outcome"))
+llm_latency = LabeledHistogram("llm_call_duration_seconds", "LLM call latency including retries and rate-limit waits.", ("prompt", "model"))
+llm_tokens = Counter("llm_tokens_total", "Provider-reported tokens by prompt, model and kind (prompt/completion).", ("prompt", "model", "kind"))
+
+
+def _render_stage_metrics() -> List[str]:
+    """Pipeline stages, MongoDB commands and event counters from the tracing registry."""
+    with stage_metrics._lock:
+        histograms = dict(stage_metrics.histograms)
+        counters = dict(stage_metrics.counters)
+
+    stage_name, mongo_name = f"{NAMESPACE}_stage_duration_seconds", f"{NAMESPACE}_mongo_command_duration_seconds"
+    stages = [f"# HELP {stage_name} Latency of traced pipeline stages.", f"# TYPE {stage_name} histogram"]
+    mongo = [f"# HELP {mongo_name} MongoDB command round-trip time.", f"# TYPE {mongo_name} histogram"]
+    for name, histogram in sorted(histograms.items()):
+        if name.startswith("db."):
+            _render_histogram(mongo, mongo_name, ("command",), (name[3:],), histogram)
+        elif not name.startswith("llm."):  # LLM calls are exported with model labels above
+            _render_histogram(stages, stage_name, ("stage",), (name,), histogram)
+
+    fallbacks_name, cache_name, events_name = (
+        f"{NAMESPACE}_agent_fallbacks_total", f"{NAMESPACE}_cache_requests_total", f"{NAMESPACE}_events_total"
+    )
+    fallbacks = [f"# HELP {fallbacks_name} Rule-based fallback activations per agent.", f"# TYPE {fallbacks_name} counter"]
+    caches = [f"# HELP {cache_name} Cache lookups by cache and result.", f"# TYPE {cache_name} counter"]
+    events = [f"# HELP {events_name} Other pipeline and LLM events (retries, circuit rejections, errors).", f"# TYPE {events_name} counter"]
+    for name, value in sorted(counters.items()):
+        if name.startswith("fallback."):
+            fallbacks.append(f"{fallbacks_name}{_labels(('agent',), (name.split('.', 1)[1],))} {value}")
+        elif name.startswith("cache."):
+            cache, result = name[len("cache."):].rsplit(".", 1)
+            caches.append(f"{cache_name}{_labels(('cache', 'result'), (cache, result))} {value}")
+        else:
+            events.append(f"{events_name}{_labels(('event',), (name,))} {value}")
+    return stages + mongo + fallbacks + caches + events
+
+
+def render_prometheus() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines: List[str] = []
+    for metric in (http_requests, http_latency, http_in_flight, llm_calls, llm_latency, llm_tokens):
+        lines.extend(metric.render())
+    lines.extend(_render_stage_metrics())
+    return "\n".join(lines) + "\n"
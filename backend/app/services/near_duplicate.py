@@ -0,0 +1,161 @@
+import re
+import random
+import hashlib
+import threading
+from array import array
+from typing import Dict, List, Optional, Set, Tuple
+from services.profile_cache import SQLitePool
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 64) - 1
+NUMBER_REGEX = re.compile(r"\d+(?:[.,]\d+)*")
+# Emoji, punctuation and symbols are dropped before shingling; letters and digits stay
+NON_WORD_REGEX = re.compile(r"[^\w\s]|_", re.UNICODE)
+
+
+def normalize_ad(text: str) -> str:
+    return " ".join(NON_WORD_REGEX.sub(" ", text.lower()).split())
+
+
+def numbers_fingerprint(text: str) -> str:
+    """
+    Hash of the numbers in the ad (budget, age, ...). Two ads only count as
+    near-duplicates when these match, so a repost with a new budget is re-parsed.
+    """
+    numbers = sorted(n.replace(",", "") for n in NUMBER_REGEX.findall(text))
+    return hashlib.sha1(" ".join(numbers).encode("utf-8")).hexdigest()
+
+
+def shingles(text: str, k: int = 5) -> Set[int]:
+    """64-bit hashes of the character k-grams of the normalized text."""
+    if len(text) <= k:
+        text = text.ljust(k)
+    return {
+        int.from_bytes(hashlib.blake2b(text[i:i + k].encode("utf-8"), digest_size=8).digest(), "little")
+        for i in range(len(text) - k + 1)
+    }
+
+
+class MinHasher:
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        rng = random.Random(seed)
+        self.permutations = [
+            (rng.randrange(1, MERSENNE_PRIME), rng.randrange(0, MERSENNE_PRIME)) for _ in range(num_perm)
+        ]
+
+    def signature(self, hashes: Set[int]) -> array:
+        return array("Q", (
+            min((a * h + b) % MERSENNE_PRIME for h in hashes) if hashes else MAX_HASH
+            for a, b in self.permutations
+        ))
+
+
+def estimated_similarity(first: array, second: array) -> float:
+    """Fraction of equal MinHash slots, an estimate of the Jaccard similarity."""
+    return sum(1 for x, y in zip(first, second) if x == y) / len(first)
+
+
+class NearDuplicateIndex:
+    """
+    MinHash/LSH index over the ads already in the profile parse cache. Each ad is
+    shingled into character 5-grams of its normalized text (no emoji, punctuation
+    or phone numbers, whitespace collapsed), so reposts that only differ in those
+    or in sentence order share most shingles. Signatures are split into LSH bands;
+    candidates sharing a band are verified against `threshold`. The index is
+    persisted next to the cache table and grows as new ads are parsed.
+    """
+
+    def __init__(self, pool: SQLitePool, threshold: float = 0.8, num_perm: int = 64, bands: int = 16):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.pool = pool
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm)
+        self._signatures: Dict[str, Tuple[str, array]] = {}
+        self._buckets: Dict[Tuple[int, bytes], List[str]] = {}
+        self._lock = threading.Lock()
+        self._init_db()
+
+    def _init_db(self):
+        """Creates the signature table and loads signatures of ads still in the cache."""
+        with self.pool.connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS profile_signatures (
+                    text_hash TEXT PRIMARY KEY,
+                    numbers_hash TEXT,
+                    signature BLOB
+                )
+            """)
+            conn.execute("DELETE FROM profile_signatures WHERE text_hash NOT IN (SELECT text_hash FROM profile_cache)")
+            conn.commit()
+            rows = conn.execute("SELECT text_hash, numbers_hash, signature FROM profile_signatures").fetchall()
+        expected = len(self.hasher.permutations)
+        for key, numbers_hash, blob in rows:
+            signature = array("Q")
+            signature.frombytes(blob)
+            if len(signature) == expected:  # Skip signatures built with another num_perm
+                self._insert(key, numbers_hash, signature)
+
+    def _band_keys(self, signature: array):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def _insert(self, key: str, numbers_hash: str, signature: array):
+        if key in self._signatures:
+            return
+        self._signatures[key] = (numbers_hash, signature)
+        for band_key in self._band_keys(signature):
+            self._buckets.setdefault(band_key, []).append(key)
+
+    def _sketch(self, text: str) -> Tuple[str, array]:
+        return numbers_fingerprint(text), self.hasher.signature(shingles(normalize_ad(text)))
+
+    def add(self, key: str, text: str):
+        """Indexes a newly cached ad under its cache key."""
+        numbers_hash, signature = self._sketch(text)
+        with self._lock:
+            self._insert(key, numbers_hash, signature)
+        with self.pool.connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO profile_signatures (text_hash, numbers_hash, signature) VALUES (?, ?, ?)",
+                (key, numbers_hash, signature.tobytes()),
+            )
+            conn.commit()
+
+    def remove(self, key: str):
+        """Drops a key whose cache entry has expired or been evicted."""
+        with self._lock:
+            entry = self._signatures.pop(key, None)
+            if entry is None:
+                return
+            for band_key in self._band_keys(entry[1]):
+                bucket = self._buckets.get(band_key)
+                if bucket and key in bucket:
+                    bucket.remove(key)
+                    if not bucket:
+                        del self._buckets[band_key]
+        with self.pool.connection() as conn:
+            conn.execute("DELETE FROM profile_signatures WHERE text_hash = ?", (key,))
+            conn.commit()
+
+    def query(self, text: str) -> Optional[Tuple[str, float]]:
+        """Best indexed (key, similarity) at or above the threshold, or None."""
+        numbers_hash, signature = self._sketch(text)
+        best: Optional[Tuple[str, float]] = None
+        with self._lock:
+            candidates = set()
+            for band_key in self._band_keys(signature):
+                candidates.update(self._buckets.get(band_key, ()))
+            for key in candidates:
+                candidate_numbers, candidate_signature = self._signatures[key]
+                if candidate_numbers != numbers_hash:
+                    continue
+                similarity = estimated_similarity(signature, candidate_signature)
+                if similarity >= self.threshold and (best is None or similarity > best[1]):
+                    best = (key, similarity)
+        return best
+
+    def __len__(self) -> int:
+        return len(self._signatures)
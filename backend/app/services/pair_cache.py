@@ -0,0 +1,159 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, Any, Optional
+
+# Fields that influence the pipeline output. Ids, names and photos are left out
+# so the key only changes when the matching-relevant content changes.
+PAIR_KEY_FIELDS = [
+    "raw_profile_text", "city", "area", "budget_PKR",
+    "sleep_schedule", "cleanliness", "noise_tolerance", "study_habits", "food_pref",
+    "age", "occupation",
+]
+
+
+def normalize_profile(profile: Dict[str, Any]) -> Dict[str, Any]:
+    """Keeps only the matching fields, with strings trimmed and lower-cased."""
+    normalized = {}
+    for field in PAIR_KEY_FIELDS:
+        value = profile.get(field)
+        if hasattr(value, "value"):
+            value = value.value
+        if isinstance(value, str):
+            value = " ".join(value.split()).lower()
+        normalized[field] = value
+    return normalized
+
+
+def profile_hash(profile: Dict[str, Any]) -> str:
+    payload = json.dumps(normalize_profile(profile), sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def pair_key(profile_a: Dict[str, Any], profile_b: Dict[str, Any]) -> str:
+    """Symmetric key: A->B and B->A map to the same entry."""
+    first, second = sorted((profile_hash(profile_a), profile_hash(profile_b)))
+    return hashlib.sha256(f"{first}:{second}".encode("utf-8")).hexdigest()
+
+
+class PairResultCache:
+    """
+    SQLite-backed cache of run_pipeline outputs keyed by the content of both
+    profiles in canonical order, with TTL expiry and LRU eviction. The table is
+    trimmed every prune_every writes rather than on each one, so it can briefly
+    exceed max_entries by up to that many rows.
+    """
+
+    def __init__(
+        self,
+        db_path: str = "pair_cache.db",
+        ttl_seconds: int = 24 * 3600,
+        max_entries: int = 50000,
+        prune_every: int = 100,
+    ):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.prune_every = max(1, prune_every)
+        self._writes_since_prune = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._init_db()
+
+    def _init_db(self):
+        """Initializes the pair results table and its indexes."""
+        with self._lock:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS pair_results (
+                    pair_key TEXT PRIMARY KEY,
+                    profile_a_id TEXT,
+                    profile_b_id TEXT,
+                    result_json TEXT,
+                    created_at INTEGER,
+                    last_access INTEGER
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_pair_a ON pair_results (profile_a_id)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_pair_b ON pair_results (profile_b_id)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_pair_access ON pair_results (last_access)")
+            self._conn.commit()
+
+    def get(self, profile_a: Dict[str, Any], profile_b: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Returns the cached pipeline result for the pair, or None if missing/expired."""
+        key = pair_key(profile_a, profile_b)
+        now = int(time.time())
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result_json, created_at FROM pair_results WHERE pair_key = ?", (key,)
+            ).fetchone()
+            if not row:
+                return None
+            if now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM pair_results WHERE pair_key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE pair_results SET last_access = ? WHERE pair_key = ?", (now, key))
+            self._conn.commit()
+        return json.loads(row[0])
+
+    def put(self, profile_a: Dict[str, Any], profile_b: Dict[str, Any], result: Dict[str, Any]):
+        """Stores a pipeline result; every prune_every writes the table is trimmed."""
+        key = pair_key(profile_a, profile_b)
+        now = int(time.time())
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pair_results "
+                "(pair_key, profile_a_id, profile_b_id, result_json, created_at, last_access) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, str(profile_a.get("id")), str(profile_b.get("id")), json.dumps(result, default=str), now, now),
+            )
+            self._conn.commit()
+            self._writes_since_prune += 1
+            prune = self._writes_since_prune >= self.prune_every
+            if prune:
+                self._writes_since_prune = 0
+        if prune:
+            self.prune()
+
+    def prune(self) -> int:
+        """Deletes expired rows and the least recently used rows over max_entries."""
+        now = int(time.time())
+        with self._lock:
+            removed = self._conn.execute(
+                "DELETE FROM pair_results WHERE created_at < ?", (now - self.ttl_seconds,)
+            ).rowcount
+            count = self._conn.execute("SELECT COUNT(*) FROM pair_results").fetchone()[0]
+            if count > self.max_entries:
+                removed += self._conn.execute(
+                    "DELETE FROM pair_results WHERE pair_key IN "
+                    "(SELECT pair_key FROM pair_results ORDER BY last_access ASC LIMIT ?)",
+                    (count - self.max_entries,),
+                ).rowcount
+            self._conn.commit()
+        return removed
+
+    def invalidate_profile(self, profile_id: str) -> int:
+        """Drops every cached pair involving the given profile. Returns the number removed."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM pair_results WHERE profile_a_id = ? OR profile_b_id = ?",
+                (str(profile_id), str(profile_id)),
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+
+# Global cache instance
+pair_cache: Optional[PairResultCache] = None
+if os.getenv("PAIR_CACHE_ENABLED", "true").lower() in ("1", "true", "yes"):
+    try:
+        pair_cache = PairResultCache(
+            db_path=os.getenv("PAIR_CACHE_DB_PATH", "pair_cache.db"),
+            ttl_seconds=int(os.getenv("PAIR_CACHE_TTL_SECONDS", str(24 * 3600))),
+            max_entries=int(os.getenv("PAIR_CACHE_MAX_ENTRIES", "50000")),
+            prune_every=int(os.getenv("PAIR_CACHE_PRUNE_EVERY", "100")),
+        )
+    except Exception as e:
+        print(f"⚠ Failed to initialize PairResultCache: {e}")
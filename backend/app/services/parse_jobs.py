@@ -0,0 +1,204 @@
+import os
+import uuid
+import asyncio
+import hashlib
+import threading
+from datetime import datetime, timezone, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+from fastapi import HTTPException, Response
+from fastapi.encoders import jsonable_encoder
+from pymongo.errors import DuplicateKeyError
+from services.llm_gateway import llm_gateway, Priority
+from services.tracing import stage_metrics
+
+
+class ParseJobQueue:
+    """
+    Job-queue mode for profile parsing: a submit stores a job in the parse_jobs
+    collection and returns its id at once, and a bounded worker pool runs the LLM
+    parse off the request threads. Ads the cache or local tiers can answer complete
+    during the submit. An Idempotency-Key makes retries return the original job
+    instead of parsing (and billing) the ad again.
+    """
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    def __init__(self, max_workers: int = 4, max_queued: int = 200, timeout_seconds: int = 300, queue_timeout_seconds: int = 3600):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="parse-job")
+        self.max_queued = max_queued
+        self.timeout_seconds = timeout_seconds
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self._queued = 0
+        self._lock = threading.Lock()
+
+    def submit(self, owner_id: str, raw_text: str, idempotency_key: Optional[str] = None) -> Tuple[Dict[str, Any], bool]:
+        """Creates (or, for a repeated idempotency key, returns) a job. Returns (job, created)."""
+        from db.mongo import get_parse_jobs_collection
+        from agents.profile_reader_agent import profile_reader
+
+        if profile_reader is None:
+            raise HTTPException(status_code=503, detail="Profile reader is not configured")
+
+        text_hash = hashlib.sha256(raw_text.encode("utf-8")).hexdigest()
+        jobs = get_parse_jobs_collection()
+        if idempotency_key:
+            existing = jobs.find_one({"owner_id": str(owner_id), "idempotency_key": idempotency_key}, {"_id": 0})
+            if existing:
+                return self._replay(existing, raw_text, text_hash), False
+
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "owner_id": str(owner_id),
+            "status": self.QUEUED,
+            "text_hash": text_hash,
+            "profile": None,
+            "source": None,
+            "error": None,
+            "created_at": datetime.now(timezone.utc),
+        }
+        if idempotency_key:
+            job["idempotency_key"] = idempotency_key
+
+        # Cache, near-duplicate and local-classifier hits need no worker
+        try:
+            resolved = profile_reader.parse_profile_without_llm(raw_text)
+        except Exception as e:
+            print(f"⚠ Parse job fast path failed: {e}")
+            resolved = None
+        if resolved:
+            profile, source = resolved
+            job.update(status=self.DONE, profile=jsonable_encoder(profile), source=source, completed_at=job["created_at"])
+        elif not self._reserve_slot():
+            raise HTTPException(status_code=503, detail="Parse queue is full", headers={"Retry-After": "5"})
+
+        try:
+            jobs.insert_one(job)
+        except Exception as e:
+            if job["status"] == self.QUEUED:
+                self._release_slot()
+            if not isinstance(e, DuplicateKeyError):
+                raise
+            # A concurrent retry with the same idempotency key won the insert
+            existing = jobs.find_one({"owner_id": str(owner_id), "idempotency_key": idempotency_key}, {"_id": 0})
+            return self._replay(existing, raw_text, text_hash), False
+
+        job.pop("_id", None)
+        if job["status"] == self.QUEUED:
+            self._executor.submit(self._run, job["job_id"], raw_text)
+        stage_metrics.count(f"parse_jobs.{'completed_on_submit' if job['status'] == self.DONE else 'queued'}")
+        return job, True
+
+    def _replay(self, existing: Dict[str, Any], raw_text: str, text_hash: str) -> Dict[str, Any]:
+        """Returns the job already stored under an idempotency key, re-queuing it if it failed."""
+        from db.mongo import get_parse_jobs_collection
+
+        if existing["text_hash"] != text_hash:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different ad")
+        stage_metrics.count("parse_jobs.idempotent_replays")
+        # Only a failure recorded by the worker is retried. A job that merely reads as timed
+        # out may still be running, and re-queuing it would parse (and bill) the ad twice.
+        if existing["status"] != self.FAILED:
+            return self._expire_if_stuck(existing)
+        # A failed attempt produced no profile, so the retry runs the parse again under the same job
+        if not self._reserve_slot():
+            raise HTTPException(status_code=503, detail="Parse queue is full", headers={"Retry-After": "5"})
+        reset = {"status": self.QUEUED, "error": None, "created_at": datetime.now(timezone.utc), "started_at": None}
+        updated = get_parse_jobs_collection().find_one_and_update(
+            {"job_id": existing["job_id"], "status": self.FAILED}, {"$set": reset}, projection={"_id": 0}
+        )
+        if updated is None:
+            # Another retry re-queued it first
+            self._release_slot()
+            return self.get(existing["job_id"], existing["owner_id"]) or existing
+        self._executor.submit(self._run, existing["job_id"], raw_text)
+        return {**existing, **reset}
+
+    def _reserve_slot(self) -> bool:
+        with self._lock:
+            if self._queued >= self.max_queued:
+                stage_metrics.count("parse_jobs.rejected")
+                return False
+            self._queued += 1
+            return True
+
+    def _release_slot(self):
+        with self._lock:
+            self._queued -= 1
+
+    def _run(self, job_id: str, raw_text: str):
+        from db.mongo import get_parse_jobs_collection
+        from agents.profile_reader_agent import profile_reader
+
+        jobs = get_parse_jobs_collection()
+        update: Dict[str, Any] = {}
+        try:
+            jobs.update_one({"job_id": job_id}, {"$set": {"status": self.RUNNING, "started_at": datetime.now(timezone.utc)}})
+            # Off the request path: wait for limiter capacity rather than falling back to rules
+            with llm_gateway.priority(Priority.BACKGROUND):
+                profile, source = profile_reader.parse_profile_with_source(raw_text)
+            update.update(status=self.DONE, profile=jsonable_encoder(profile), source=source)
+        except Exception as e:
+            print(f"❌ Parse job {job_id} failed: {e}")
+            update.update(status=self.FAILED, error=str(e))
+        finally:
+            self._release_slot()
+        update["completed_at"] = datetime.now(timezone.utc)
+        stage_metrics.count(f"parse_jobs.{update['status']}")
+        jobs.update_one({"job_id": job_id}, {"$set": update})
+
+    def _expire_if_stuck(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Jobs running past timeout_seconds since they started, or still queued past
+        queue_timeout_seconds (e.g. lost in a restart), read as failed. Queue wait does
+        not count toward the parse timeout.
+        """
+        if job["status"] == self.RUNNING:
+            since, limit = job.get("started_at") or job["created_at"], self.timeout_seconds
+        elif job["status"] == self.QUEUED:
+            since, limit = job["created_at"], self.queue_timeout_seconds
+        else:
+            return job
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        if datetime.now(timezone.utc) - since > timedelta(seconds=limit):
+            return {**job, "status": self.FAILED, "error": "Parse job timed out"}
+        return job
+
+    def get(self, job_id: str, owner_id: str) -> Optional[Dict[str, Any]]:
+        """The job, or None if unknown, expired or owned by someone else."""
+        from db.mongo import get_parse_jobs_collection
+        job = get_parse_jobs_collection().find_one({"job_id": job_id, "owner_id": str(owner_id)}, {"_id": 0})
+        return self._expire_if_stuck(job) if job else None
+
+    async def wait(self, job_id: str, owner_id: str, wait_seconds: float = 0, poll_interval: float = 0.5) -> Optional[Dict[str, Any]]:
+        """Long-poll: re-reads the job until it is done or failed, or wait_seconds elapse."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + max(wait_seconds, 0)
+        while True:
+            job = await asyncio.to_thread(self.get, job_id, owner_id)
+            if not job or job["status"] in (self.DONE, self.FAILED) or loop.time() >= deadline:
+                return job
+            await asyncio.sleep(poll_interval)
+
+    def respond(self, response: Response, job: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Route helper: 404 unknown job, 202 with Retry-After while queued/running, else the job."""
+        if not job:
+            raise HTTPException(status_code=404, detail="Unknown or expired parse job")
+        response.headers["Location"] = f"/ai/parse-profile/jobs/{job['job_id']}"
+        if job["status"] in (self.QUEUED, self.RUNNING):
+            response.status_code = 202
+            response.headers["Retry-After"] = "2"
+        return {key: job.get(key) for key in ("job_id", "status", "source", "profile", "error")}
+
+
+# Global queue instance
+parse_jobs = ParseJobQueue(
+    max_workers=int(os.getenv("PARSE_JOB_WORKERS", "4")),
+    max_queued=int(os.getenv("PARSE_JOB_MAX_QUEUED", "200")),
+    timeout_seconds=int(os.getenv("PARSE_JOB_TIMEOUT_SECONDS", "300")),
+    queue_timeout_seconds=int(os.getenv("PARSE_JOB_QUEUE_TIMEOUT_SECONDS", "3600")),
+)
@@ -0,0 +1,214 @@
+import json
+import time
+import queue
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Tuple
+from services.tracing import stage_metrics
+
+
+def text_key(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class SQLitePool:
+    """
+    Fixed set of long-lived SQLite connections in WAL mode. Readers never block
+    the writer (or each other), and connections are reused instead of being
+    opened per call.
+    """
+
+    def __init__(self, db_path: str, size: int = 4, busy_timeout_ms: int = 5000):
+        self.db_path = db_path
+        self._connections: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        for _ in range(max(1, size)):
+            conn = sqlite3.connect(db_path, check_same_thread=False, timeout=busy_timeout_ms / 1000)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}")
+            self._connections.put(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self._connections.get()
+        try:
+            yield conn
+        finally:
+            self._connections.put(conn)
+
+    def close(self):
+        while not self._connections.empty():
+            self._connections.get_nowait().close()
+
+
+class ProfileParseCache:
+    """
+    Two-tier cache of parsed profiles keyed by the SHA-256 of the preprocessed ad
+    text: a bounded in-process LRU answers repeat lookups without touching disk,
+    and a pooled WAL-mode SQLite table keeps entries across restarts. Both tiers
+    expire entries after ttl_seconds; the table is trimmed to max_entries by last
+    access every prune_every writes.
+    """
+
+    def __init__(
+        self,
+        db_path: str = "profile_cache.db",
+        ttl_seconds: int = 30 * 24 * 3600,
+        max_memory_entries: int = 5000,
+        max_entries: int = 100000,
+        pool_size: int = 4,
+        prune_every: int = 100,
+    ):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_memory_entries = max_memory_entries
+        self.max_entries = max_entries
+        self.prune_every = max(1, prune_every)
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._writes_since_prune = 0
+        self._lock = threading.Lock()
+        self.pool = SQLitePool(db_path, size=pool_size)
+        self._init_db()
+
+    def _init_db(self):
+        """Creates the hashed-key table and migrates rows from the old raw-text table."""
+        with self.pool.connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS profile_cache (
+                    text_hash TEXT PRIMARY KEY,
+                    parsed_json TEXT,
+                    created_at INTEGER,
+                    last_access INTEGER,
+                    ad_text TEXT,
+                    source TEXT
+                )
+            """)
+            # ad_text and source (which tier produced the parse) are kept as training data
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(profile_cache)")}
+            for column in ("ad_text", "source"):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE profile_cache ADD COLUMN {column} TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_profile_cache_access ON profile_cache (last_access)")
+            legacy = conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'parsed_profiles'"
+            ).fetchone()
+            if legacy:
+                rows = conn.execute("SELECT raw_text, parsed_json, timestamp FROM parsed_profiles").fetchall()
+                conn.executemany(
+                    "INSERT OR IGNORE INTO profile_cache (text_hash, parsed_json, created_at, last_access, ad_text, source) "
+                    "VALUES (?, ?, ?, ?, ?, 'llm')",
+                    [(text_key(raw), parsed, ts or 0, ts or 0, raw) for raw, parsed, ts in rows],
+                )
+                conn.execute("DROP TABLE parsed_profiles")
+            conn.commit()
+
+    def _remember(self, key: str, created_at: float, parsed_json: str):
+        self._memory[key] = (created_at, parsed_json)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, text: str) -> Optional[Dict[str, Any]]:
+        """Returns a fresh copy of the cached parse for the text, or None if missing/expired."""
+        return self.get_by_key(text_key(text))
+
+    def get_by_key(self, key: str, counter: str = "cache.profile_reader") -> Optional[Dict[str, Any]]:
+        """Lookup by text hash; hits and misses are counted under `counter`."""
+        now = time.time()
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached and now - cached[0] <= self.ttl_seconds:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                stage_metrics.count(f"{counter}.hit")
+                return json.loads(cached[1])
+            if cached:
+                del self._memory[key]
+
+        with self.pool.connection() as conn:
+            row = conn.execute(
+                "SELECT parsed_json, created_at FROM profile_cache WHERE text_hash = ?", (key,)
+            ).fetchone()
+            if row and now - row[1] > self.ttl_seconds:
+                conn.execute("DELETE FROM profile_cache WHERE text_hash = ?", (key,))
+                conn.commit()
+                row = None
+            elif row:
+                conn.execute("UPDATE profile_cache SET last_access = ? WHERE text_hash = ?", (int(now), key))
+                conn.commit()
+
+        with self._lock:
+            if row:
+                self._remember(key, row[1], row[0])
+                self._stats["disk_hits"] += 1
+            else:
+                self._stats["misses"] += 1
+        stage_metrics.count(f"{counter}.hit" if row else f"{counter}.miss")
+        return json.loads(row[0]) if row else None
+
+    def put(self, text: str, parsed: Dict[str, Any], source: str = "llm") -> str:
+        """Stores a validated parse in both tiers and returns its key."""
+        key = text_key(text)
+        parsed_json = json.dumps(parsed, default=str)
+        now = int(time.time())
+        with self._lock:
+            self._remember(key, now, parsed_json)
+            self._stats["stores"] += 1
+            self._writes_since_prune += 1
+            prune = self._writes_since_prune >= self.prune_every
+            if prune:
+                self._writes_since_prune = 0
+
+        with self.pool.connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO profile_cache (text_hash, parsed_json, created_at, last_access, ad_text, source) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, parsed_json, now, now, text, source),
+            )
+            conn.commit()
+        if prune:
+            self.prune()
+        return key
+
+    def prune(self) -> int:
+        """Deletes expired rows and the least recently used rows over max_entries."""
+        now = int(time.time())
+        with self.pool.connection() as conn:
+            removed = conn.execute(
+                "DELETE FROM profile_cache WHERE created_at < ?", (now - self.ttl_seconds,)
+            ).rowcount
+            count = conn.execute("SELECT COUNT(*) FROM profile_cache").fetchone()[0]
+            if count > self.max_entries:
+                removed += conn.execute(
+                    "DELETE FROM profile_cache WHERE text_hash IN "
+                    "(SELECT text_hash FROM profile_cache ORDER BY last_access ASC LIMIT ?)",
+                    (count - self.max_entries,),
+                ).rowcount
+            conn.commit()
+        with self._lock:
+            self._stats["evictions"] += removed
+        return removed
+
+    def labeled_examples(self, sources: Tuple[str, ...] = ("llm",)) -> List[Tuple[str, Dict[str, Any]]]:
+        """(ad text, parse) pairs produced by the given tiers, for training the local classifier."""
+        placeholders = ",".join("?" for _ in sources)
+        with self.pool.connection() as conn:
+            rows = conn.execute(
+                f"SELECT ad_text, parsed_json FROM profile_cache WHERE ad_text IS NOT NULL AND source IN ({placeholders})",
+                sources,
+            ).fetchall()
+        return [(text, json.loads(parsed)) for text, parsed in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self._stats["memory_hits"] + self._stats["disk_hits"]
+            lookups = hits + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+            }
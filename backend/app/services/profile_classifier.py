@@ -0,0 +1,320 @@
+import os
+import re
+import gzip
+import json
+import math
+import zlib
+import random
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from services.near_duplicate import normalize_ad
+from models.profile import SleepSchedule, Cleanliness, NoiseTolerance, StudyHabits, FoodPref
+
+MODEL_VERSION = 1
+NUM_BUCKETS = 1 << 18
+
+ENUM_FIELDS = {
+    "sleep_schedule": SleepSchedule,
+    "cleanliness": Cleanliness,
+    "noise_tolerance": NoiseTolerance,
+    "study_habits": StudyHabits,
+    "food_pref": FoodPref,
+}
+# Non-enum ProfileCreate fields, filled by extractors or by a default learned from the training labels
+SLOT_FIELDS = ["city", "area", "budget_PKR", "age", "occupation", "full_name"]
+
+MONEY_REGEX = re.compile(r"(\d+(?:[.,]\d+)*)\s*(k|thousand|hazar|hazaar|lac|lakh)?\b")
+MONEY_MULTIPLIERS = {"k": 1000, "thousand": 1000, "hazar": 1000, "hazaar": 1000, "lac": 100000, "lakh": 100000}
+AGE_REGEX = re.compile(r"\bage[d]?\s*:?\s*(\d{2})\b|\b(\d{2})\s*(?:years?|yrs?|y/o|yo|saal)\b")
+
+
+def hashed_features(text: str) -> Dict[int, float]:
+    """Word unigrams/bigrams and character 4-grams, hashed into NUM_BUCKETS and L2-normalized."""
+    tokens = normalize_ad(text).split()
+    grams = [f"w:{t}" for t in tokens]
+    grams += [f"b:{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    for token in tokens:
+        padded = f"#{token}#"
+        grams += [f"c:{padded[i:i + 4]}" for i in range(max(1, len(padded) - 3))]
+    counts = Counter(zlib.crc32(g.encode("utf-8")) % NUM_BUCKETS for g in grams)
+    norm = math.sqrt(sum(c * c for c in counts.values())) or 1.0
+    return {index: count / norm for index, count in counts.items()}
+
+
+def _softmax(scores: List[float]) -> List[float]:
+    top = max(scores)
+    exps = [math.exp(s - top) for s in scores]
+    total = sum(exps)
+    return [e / total for e in exps]
+
+
+class LinearClassifier:
+    """Multinomial logistic regression over sparse hashed features."""
+
+    def __init__(self, classes: List[str], weights: Optional[Dict[int, List[float]]] = None, bias: Optional[List[float]] = None):
+        self.classes = classes
+        self.weights = weights or {}
+        self.bias = bias or [0.0] * len(classes)
+
+    def probabilities(self, features: Dict[int, float]) -> List[float]:
+        scores = list(self.bias)
+        for index, value in features.items():
+            row = self.weights.get(index)
+            if row is not None:
+                for c, w in enumerate(row):
+                    scores[c] += w * value
+        return _softmax(scores)
+
+    def predict(self, features: Dict[int, float]) -> Tuple[str, float]:
+        probabilities = self.probabilities(features)
+        best = max(range(len(self.classes)), key=probabilities.__getitem__)
+        return self.classes[best], probabilities[best]
+
+    def fit(self, examples: List[Tuple[Dict[int, float], str]], epochs: int = 15, learning_rate: float = 1.0, seed: int = 13):
+        """Plain SGD on the cross-entropy loss with a decaying learning rate."""
+        rng = random.Random(seed)
+        order = list(range(len(examples)))
+        index_of = {label: i for i, label in enumerate(self.classes)}
+        for epoch in range(epochs):
+            rng.shuffle(order)
+            rate = learning_rate / (1 + 0.1 * epoch)
+            for i in order:
+                features, label = examples[i]
+                probabilities = self.probabilities(features)
+                target = index_of[label]
+                gradient = [p - (1.0 if c == target else 0.0) for c, p in enumerate(probabilities)]
+                for c, g in enumerate(gradient):
+                    self.bias[c] -= rate * g
+                for index, value in features.items():
+                    row = self.weights.setdefault(index, [0.0] * len(self.classes))
+                    for c, g in enumerate(gradient):
+                        row[c] -= rate * g * value
+        return self
+
+    def to_dict(self, min_weight: float = 1e-3) -> Dict[str, Any]:
+        return {
+            "classes": self.classes,
+            "bias": [round(b, 5) for b in self.bias],
+            "weights": {
+                str(index): [round(w, 5) for w in row]
+                for index, row in self.weights.items() if max(abs(w) for w in row) >= min_weight
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LinearClassifier":
+        return cls(data["classes"], {int(k): v for k, v in data["weights"].items()}, data["bias"])
+
+
+# ----- Slot extractors: (preprocessed text, vocabularies, fields so far) -> value or None -----
+def _phrase_in(phrase: str, normalized_text: str) -> bool:
+    return bool(phrase) and f" {phrase} " in f" {normalized_text} "
+
+
+def _longest_match(vocabulary: Dict[str, str], normalized_text: str) -> Optional[str]:
+    matches = [phrase for phrase in vocabulary if _phrase_in(phrase, normalized_text)]
+    return vocabulary[max(matches, key=len)] if matches else None
+
+
+def extract_city(text: str, vocab: Dict[str, Any], _: Dict[str, Any]) -> Optional[str]:
+    return _longest_match(vocab.get("city", {}), normalize_ad(text))
+
+
+def extract_area(text: str, vocab: Dict[str, Any], found: Dict[str, Any]) -> Optional[str]:
+    return _longest_match(vocab.get("area", {}).get(found.get("city") or "", {}), normalize_ad(text))
+
+
+def extract_budget(text: str, vocab: Dict[str, Any], _: Dict[str, Any]) -> Optional[int]:
+    amounts = set()
+    for match in MONEY_REGEX.finditer(text):
+        try:
+            amount = float(match.group(1).replace(",", ""))
+        except ValueError:
+            continue
+        amount *= MONEY_MULTIPLIERS.get(match.group(2) or "", 1)
+        if 1000 <= amount <= 1000000:
+            amounts.add(int(amount))
+    # Only an unambiguous single amount is trusted
+    return amounts.pop() if len(amounts) == 1 else None
+
+
+def extract_age(text: str, vocab: Dict[str, Any], _: Dict[str, Any]) -> Optional[int]:
+    for match in AGE_REGEX.finditer(text):
+        age = int(match.group(1) or match.group(2))
+        if 15 <= age <= 80:
+            return age
+    return None
+
+
+def extract_occupation(text: str, vocab: Dict[str, Any], _: Dict[str, Any]) -> Optional[str]:
+    return _longest_match(vocab.get("occupation", {}), normalize_ad(text))
+
+
+def extract_nothing(text: str, vocab: Dict[str, Any], _: Dict[str, Any]) -> None:
+    return None
+
+
+SLOT_EXTRACTORS: Dict[str, Callable[[str, Dict[str, Any], Dict[str, Any]], Any]] = {
+    "city": extract_city,
+    "area": extract_area,
+    "budget_PKR": extract_budget,
+    "age": extract_age,
+    "occupation": extract_occupation,
+    "full_name": extract_nothing,
+}
+
+
+def build_vocabularies(labels: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Phrase -> label maps for the extractors, taken from values the LLM produced."""
+    cities: Dict[str, str] = {}
+    areas: Dict[str, Dict[str, str]] = {}
+    occupations: Dict[str, str] = {}
+    for label in labels:
+        city, area, occupation = label.get("city"), label.get("area"), label.get("occupation")
+        if isinstance(city, str) and city.strip() and city.lower() != "unknown":
+            cities.setdefault(normalize_ad(city), city)
+            if isinstance(area, str) and area.strip() and area.lower() != "unknown":
+                areas.setdefault(city, {}).setdefault(normalize_ad(area), area)
+        if isinstance(occupation, str) and occupation.strip() and occupation.lower() != "unknown":
+            occupations.setdefault(normalize_ad(occupation), occupation)
+    return {"city": cities, "area": areas, "occupation": occupations}
+
+
+class LocalProfileClassifier:
+    """
+    Local tier between the parse cache and the LLM, trained on cached LLM parses.
+    Per-field linear classifiers predict the five enum fields; the remaining
+    ProfileCreate fields come from extractors over vocabularies seen in training,
+    or from the value the LLM gave most often when the ad did not state it. A
+    prediction is only returned when every enum field clears min_confidence and
+    every slot is filled by an extractor or default that was reliable on the
+    training data, otherwise the caller escalates to the LLM.
+    """
+
+    def __init__(
+        self,
+        classifiers: Dict[str, LinearClassifier],
+        vocabularies: Dict[str, Any],
+        slots: Dict[str, Dict[str, Any]],
+        min_confidence: float = 0.85,
+        min_slot_precision: float = 0.9,
+    ):
+        self.classifiers = classifiers
+        self.vocabularies = vocabularies
+        self.slots = slots
+        self.min_confidence = min_confidence
+        self.min_slot_precision = min_slot_precision
+
+    def predict(self, text: str) -> Optional[Dict[str, Any]]:
+        """A full ProfileCreate-shaped dict, or None when the LLM should decide."""
+        features = hashed_features(text)
+        profile: Dict[str, Any] = {"raw_profile_text": text}
+        for field, classifier in self.classifiers.items():
+            label, confidence = classifier.predict(features)
+            if confidence < self.min_confidence:
+                return None
+            profile[field] = label
+
+        for field in SLOT_FIELDS:
+            slot = self.slots.get(field, {})
+            value = None
+            if slot.get("precision", 0.0) >= self.min_slot_precision:
+                value = SLOT_EXTRACTORS[field](text, self.vocabularies, profile)
+            if value is None and slot.get("default_share", 0.0) >= self.min_slot_precision:
+                value = slot.get("default")
+            if value is None:
+                return None
+            profile[field] = value
+        return profile
+
+    def save(self, path: str):
+        data = {
+            "version": MODEL_VERSION,
+            "classifiers": {field: c.to_dict() for field, c in self.classifiers.items()},
+            "vocabularies": self.vocabularies,
+            "slots": self.slots,
+        }
+        tmp_path = f"{path}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, min_confidence: float = 0.85, min_slot_precision: float = 0.9) -> Optional["LocalProfileClassifier"]:
+        if not os.path.exists(path):
+            return None
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != MODEL_VERSION:
+            print(f"⚠ Ignoring profile classifier {path}: unsupported version {data.get('version')}")
+            return None
+        classifiers = {field: LinearClassifier.from_dict(c) for field, c in data["classifiers"].items()}
+        return cls(classifiers, data["vocabularies"], data["slots"], min_confidence, min_slot_precision)
+
+
+def fit_slots(examples: List[Tuple[str, Dict[str, Any]]], vocabularies: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Extractor precision and the most common label for ads where the extractor finds nothing."""
+    slots = {}
+    for field in SLOT_FIELDS:
+        extracted = correct = 0
+        missing: Counter = Counter()
+        for text, label in examples:
+            value = SLOT_EXTRACTORS[field](text, vocabularies, label)
+            if value is None:
+                missing[json.dumps(label.get(field))] += 1
+            else:
+                extracted += 1
+                correct += value == label.get(field)
+        default, default_count = missing.most_common(1)[0] if missing else ("null", 0)
+        slots[field] = {
+            "precision": round(correct / extracted, 4) if extracted else 0.0,
+            "coverage": round(extracted / len(examples), 4) if examples else 0.0,
+            "default": json.loads(default),
+            "default_share": round(default_count / sum(missing.values()), 4) if missing else 0.0,
+        }
+    return slots
+
+
+def usable_examples(examples: List[Tuple[str, Dict[str, Any]]]) -> List[Tuple[str, Dict[str, Any]]]:
+    """Drops parses whose enum labels are not valid values (e.g. from an older schema)."""
+    valid = {field: {e.value for e in enum} for field, enum in ENUM_FIELDS.items()}
+    return [
+        (text, label) for text, label in examples
+        if text and all(label.get(field) in values for field, values in valid.items())
+    ]
+
+
+def train(
+    examples: List[Tuple[str, Dict[str, Any]]],
+    epochs: int = 15,
+    min_confidence: float = 0.85,
+    min_slot_precision: float = 0.9,
+) -> LocalProfileClassifier:
+    featurized = [hashed_features(text) for text, _ in examples]
+    classifiers = {}
+    for field, enum in ENUM_FIELDS.items():
+        data = [(features, label[field]) for features, (_, label) in zip(featurized, examples)]
+        classifiers[field] = LinearClassifier([e.value for e in enum]).fit(data, epochs=epochs)
+    vocabularies = build_vocabularies([label for _, label in examples])
+    return LocalProfileClassifier(classifiers, vocabularies, fit_slots(examples, vocabularies), min_confidence, min_slot_precision)
+
+
+def evaluate(model: LocalProfileClassifier, examples: List[Tuple[str, Dict[str, Any]]]) -> Dict[str, Any]:
+    """Per-field accuracy, plus how many ads the tier would answer and how many of those match exactly."""
+    field_correct = Counter()
+    answered = exact = 0
+    for text, label in examples:
+        features = hashed_features(text)
+        for field, classifier in model.classifiers.items():
+            field_correct[field] += classifier.predict(features)[0] == label[field]
+        prediction = model.predict(text)
+        if prediction is not None:
+            answered += 1
+            exact += all(prediction.get(f) == label.get(f) for f in list(ENUM_FIELDS) + SLOT_FIELDS)
+    total = len(examples) or 1
+    return {
+        "examples": len(examples),
+        "field_accuracy": {field: round(field_correct[field] / total, 4) for field in ENUM_FIELDS},
+        "coverage": round(answered / total, 4),
+        "answered_exact_match": round(exact / answered, 4) if answered else None,
+    }
@@ -0,0 +1,163 @@
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+from models.profile import SleepSchedule, Cleanliness, NoiseTolerance, StudyHabits, FoodPref
+
+# Declarative keyword table for the rule-based profile parser: field -> [(label, phrases)].
+# Labels are the real enum members; phrases are lower-case English and Roman-Urdu.
+# When several labels of one field match, the most frequent wins and ties go to the
+# label listed first.
+PROFILE_KEYWORDS: Dict[str, List[Tuple[Any, List[str]]]] = {
+    "sleep_schedule": [
+        (SleepSchedule.EARLY_RISER, [
+            "early bird", "early riser", "wakes up early", "wake up early", "morning person",
+            "subah jaldi", "jaldi uthta", "jaldi uthti", "jaldi sota", "jaldi soti", "fajr",
+        ]),
+        (SleepSchedule.NIGHT_OWL, [
+            "night owl", "stays up late", "stay up late", "late night", "late sleeper", "night person",
+            "raat ko jagta", "raat ko jaagta", "raat ko jagti", "der se sota", "der se soti", "der tak jagta",
+        ]),
+        (SleepSchedule.FLEXIBLE, ["flexible timings", "flexible schedule", "koi bhi time"]),
+    ],
+    "cleanliness": [
+        (Cleanliness.TIDY, [
+            "neat freak", "very clean", "super tidy", "tidy", "neat", "clean",
+            "saaf suthra", "saf suthra", "safai pasand", "saaf",
+        ]),
+        (Cleanliness.MESSY, [
+            "a bit messy", "messy", "don't mind mess", "dont mind mess", "relaxed about cleaning",
+            "lazy about cleaning", "ganda", "gandi", "bikhra", "bikhri",
+        ]),
+        (Cleanliness.AVERAGE, ["average cleanliness", "normal cleanliness", "thora bohat saaf"]),
+    ],
+    "noise_tolerance": [
+        (NoiseTolerance.QUIET, [
+            "quiet person", "need quiet", "low noise", "quiet", "peaceful",
+            "sukoon", "khamosh", "shor pasand nahi", "shor nahi",
+        ]),
+        (NoiseTolerance.LOUD_OK, [
+            "loud music", "parties", "party", "friends over", "loud ok", "noise no problem",
+            "noise is fine", "shor sharaba", "gaming", "dost aate",
+        ]),
+        (NoiseTolerance.MODERATE, ["moderate noise", "some noise ok", "thora shor"]),
+    ],
+    "study_habits": [
+        (StudyHabits.ONLINE_CLASSES, ["online classes", "online class", "online study", "virtual classes", "online parhai"]),
+        (StudyHabits.LATE_NIGHT, [
+            "late-night study", "late night study", "study at night", "night study",
+            "raat ko parhai", "raat ko parhta", "raat ko parhti",
+        ]),
+        (StudyHabits.ROOM_STUDY, [
+            "study in room", "room study", "quiet room", "study on bed", "study a lot", "serious student", "focus",
+            "kamre mein parhai", "kamray mein parhai", "room mein parhai",
+        ]),
+        (StudyHabits.LIBRARY, ["library", "study in library", "library mein parhai"]),
+    ],
+    "food_pref": [
+        (FoodPref.VEG, ["vegetarian", "veg only", "pure veg", "veg", "sabzi", "daal sabzi", "sirf sabzi"]),
+        (FoodPref.NON_VEG, [
+            "non-veg", "non veg", "nonveg", "meat", "chicken", "beef", "mutton", "bbq",
+            "gosht", "biryani",
+        ]),
+        (FoodPref.FLEXIBLE, ["eat anything", "sab kuch kha", "sab kha", "flexible food"]),
+    ],
+    "city": [
+        ("Lahore", ["lahore", "lhr"]),
+        ("Karachi", ["karachi", "khi"]),
+        ("Islamabad", ["islamabad", "isb"]),
+        ("Rawalpindi", ["rawalpindi", "pindi", "rwp"]),
+        ("Faisalabad", ["faisalabad", "fsd"]),
+        ("Multan", ["multan"]),
+        ("Peshawar", ["peshawar"]),
+        ("Quetta", ["quetta"]),
+        ("Hyderabad", ["hyderabad"]),
+        ("Sialkot", ["sialkot"]),
+        ("Gujranwala", ["gujranwala"]),
+    ],
+}
+
+# What the LLM is told to pick when the ad says nothing about a field
+PROFILE_DEFAULTS: Dict[str, Any] = {
+    "sleep_schedule": SleepSchedule.FLEXIBLE,
+    "cleanliness": Cleanliness.AVERAGE,
+    "noise_tolerance": NoiseTolerance.MODERATE,
+    "study_habits": StudyHabits.LIBRARY,
+    "food_pref": FoodPref.FLEXIBLE,
+    "city": "Unknown",
+}
+
+
+WORD_REGEX = re.compile(r"\w+")
+_END = object()
+
+
+def phrase_tokens(phrase: str) -> Tuple[str, ...]:
+    return tuple(WORD_REGEX.findall(phrase.lower()))
+
+
+class KeywordMatcher:
+    """
+    All phrases of a keyword table compiled into one word-level trie (Aho-Corasick
+    style over tokens rather than characters). The text is tokenized once and walked
+    left to right, taking the longest phrase starting at each word, so the cost is one
+    pass over the text instead of one scan per keyword. Punctuation is ignored, so
+    "late-night" and "late night" are the same phrase.
+    """
+
+    def __init__(self, table: Dict[str, List[Tuple[Any, List[str]]]]):
+        self.table = table
+        self._trie: Dict[Any, Any] = {}
+        self._rank: Dict[Tuple[str, Any], int] = {}
+        for field, labels in table.items():
+            for rank, (label, phrases) in enumerate(labels):
+                self._rank[(field, label)] = rank
+                for phrase in phrases:
+                    node = self._trie
+                    for token in phrase_tokens(phrase):
+                        node = node.setdefault(token, {})
+                    if node.get(_END, (field, label)) != (field, label):
+                        raise ValueError(f"Keyword {phrase!r} is listed for more than one label")
+                    node[_END] = (field, label)
+
+    def find(self, text: str) -> List[Tuple[str, Any]]:
+        """(field, label) for each non-overlapping phrase, leftmost-longest."""
+        tokens = WORD_REGEX.findall(text.lower())
+        found = []
+        i, n = 0, len(tokens)
+        while i < n:
+            node = self._trie.get(tokens[i])
+            if node is None:
+                i += 1
+                continue
+            longest, j = None, i
+            while node is not None:
+                j += 1
+                if _END in node:
+                    longest = (node[_END], j)
+                node = node.get(tokens[j]) if j < n else None
+            if longest is None:
+                i += 1
+            else:
+                found.append(longest[0])
+                i = longest[1]
+        return found
+
+    def match(self, text: str) -> Dict[str, Any]:
+        """Winning label per field found in the text."""
+        hits: Dict[str, Counter] = {}
+        for field, label in self.find(text):
+            hits.setdefault(field, Counter())[label] += 1
+        return {
+            field: max(counts, key=lambda label: (counts[label], -self._rank[(field, label)]))
+            for field, counts in hits.items()
+        }
+
+
+# Global matcher for the rule-based profile parser
+profile_keyword_matcher = KeywordMatcher(PROFILE_KEYWORDS)
+
+
+def match_profile_fields(text: str, matcher: Optional[KeywordMatcher] = None) -> Dict[str, Any]:
+    """Enum fields and city from one pass over the text, with the LLM's defaults for anything unmatched."""
+    matched = (matcher or profile_keyword_matcher).match(text)
+    return {field: matched.get(field, default) for field, default in PROFILE_DEFAULTS.items()}
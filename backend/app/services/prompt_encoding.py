@@ -0,0 +1,125 @@
+import json
+import threading
+from typing import Any, Dict, List, Optional
+
+# Canonical short keys for the fields that matter for matching. Ids, names,
+# photos (often base64), images and reviews never go into a prompt.
+PROFILE_KEYS = {
+    "city": "c",
+    "area": "a",
+    "budget_PKR": "b",
+    "sleep_schedule": "sl",
+    "cleanliness": "cl",
+    "noise_tolerance": "n",
+    "study_habits": "st",
+    "food_pref": "f",
+    "age": "ag",
+    "occupation": "o",
+    "raw_profile_text": "t",
+}
+
+LISTING_KEYS = {
+    "city": "c",
+    "area": "a",
+    "monthly_rent_PKR": "r",
+    "rooms_available": "rm",
+    "amenities": "am",
+    "rating": "rt",
+}
+
+# Free text is kept (the LLM reads habits from it) but capped
+MAX_TEXT_CHARS = 400
+CHARS_PER_TOKEN = 4
+
+
+def _legend(keys: Dict[str, str]) -> str:
+    return ",".join(f"{short}={field}" for field, short in keys.items())
+
+
+PROFILE_KEY_LEGEND = f"Profiles use short keys: {_legend(PROFILE_KEYS)}. Missing keys are unknown."
+LISTING_KEY_LEGEND = f"Listings use short keys: {_legend(LISTING_KEYS)}."
+
+
+def _encode_value(value: Any) -> Any:
+    if hasattr(value, "value"):
+        value = value.value
+    if isinstance(value, str):
+        value = " ".join(value.split())
+        if len(value) > MAX_TEXT_CHARS:
+            value = value[:MAX_TEXT_CHARS].rstrip() + "…"
+    return value
+
+
+def _encode(doc: Dict[str, Any], keys: Dict[str, str]) -> Dict[str, Any]:
+    encoded = {}
+    for field, short in keys.items():
+        value = _encode_value(doc.get(field))
+        if value in (None, "", []):
+            continue
+        encoded[short] = value
+    return encoded
+
+
+def encode_profile(profile: Dict[str, Any], include_id: bool = False) -> Dict[str, Any]:
+    """Compact dict of a profile's matching fields under the canonical short keys."""
+    encoded = _encode(profile, PROFILE_KEYS)
+    if include_id:
+        encoded = {"id": str(profile.get("id") or profile.get("_id")), **encoded}
+    return encoded
+
+
+def encode_listing(listing: Dict[str, Any]) -> Dict[str, Any]:
+    """Compact dict of a housing listing's matching fields under the canonical short keys."""
+    return _encode(listing, LISTING_KEYS)
+
+
+def dumps_compact(obj: Any) -> str:
+    """JSON with no indentation or padding; non-ASCII kept as-is (shorter than \\u escapes)."""
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def profile_json(profile: Dict[str, Any], include_id: bool = False) -> str:
+    return dumps_compact(encode_profile(profile, include_id=include_id))
+
+
+def listing_json(listing: Dict[str, Any]) -> str:
+    return dumps_compact(encode_listing(listing))
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def estimate_prompt_tokens(messages: List[Dict[str, Any]], tools: Optional[Any] = None) -> int:
+    """Rough prompt size in tokens for a chat request (messages plus tool schemas)."""
+    chars = sum(len(str(m.get("content", ""))) for m in messages)
+    if tools:
+        chars += len(dumps_compact(tools))
+    return chars // CHARS_PER_TOKEN + 1
+
+
+class PromptTokenStats:
+    """Per-prompt counters of estimated and provider-reported prompt tokens."""
+
+    def __init__(self):
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, prompt_name: str, estimated: int, actual: Optional[int] = None):
+        with self._lock:
+            stats = self._stats.setdefault(prompt_name, {"calls": 0, "estimated_tokens": 0, "prompt_tokens": 0})
+            stats["calls"] += 1
+            stats["estimated_tokens"] += estimated
+            if actual is not None:
+                stats["prompt_tokens"] += actual
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Totals and per-call averages keyed by prompt name."""
+        with self._lock:
+            return {
+                name: {
+                    **stats,
+                    "avg_prompt_tokens": round((stats["prompt_tokens"] or stats["estimated_tokens"]) / stats["calls"], 1),
+                }
+                for name, stats in self._stats.items()
+            }
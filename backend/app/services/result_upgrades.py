@@ -0,0 +1,90 @@
+import os
+import uuid
+import asyncio
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+from fastapi import HTTPException, Response
+from fastapi.encoders import jsonable_encoder
+from services.llm_gateway import llm_gateway, Priority
+
+
+class ResultUpgradeService:
+    """
+    Stale-while-revalidate support: a route answers with a fast rule-based result and a
+    version token, while the LLM-enriched result is computed here in the background and
+    stored in the result_upgrades collection under that token for the client to fetch.
+    """
+
+    PENDING = "pending"
+    READY = "ready"
+    FAILED = "failed"
+
+    def __init__(self, max_workers: int = 4):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="result-upgrade")
+
+    def start(self, kind: str, owner_id: str, compute: Callable[[], List[Any]]) -> str:
+        """Registers a pending upgrade, queues `compute` and returns its version token."""
+        from db.mongo import get_result_upgrades_collection
+
+        version = uuid.uuid4().hex
+        get_result_upgrades_collection().insert_one({
+            "version": version,
+            "kind": kind,
+            "owner_id": str(owner_id),
+            "status": self.PENDING,
+            "results": None,
+            "created_at": datetime.now(timezone.utc),
+        })
+        self._executor.submit(self._run, version, compute)
+        return version
+
+    def _run(self, version: str, compute: Callable[[], List[Any]]):
+        from db.mongo import get_result_upgrades_collection
+
+        update: Dict[str, Any] = {}
+        try:
+            # Off the request path: wait for limiter capacity rather than falling back to rules
+            with llm_gateway.priority(Priority.BACKGROUND):
+                results = compute()
+            update.update(status=self.READY, results=jsonable_encoder(results))
+        except Exception as e:
+            print(f"❌ Result upgrade {version} failed: {e}")
+            update.update(status=self.FAILED, error=str(e))
+        update["completed_at"] = datetime.now(timezone.utc)
+        get_result_upgrades_collection().update_one({"version": version}, {"$set": update})
+
+    def get(self, version: str, kind: str, owner_id: str) -> Optional[Dict[str, Any]]:
+        """The upgrade for a token, or None if unknown, expired or owned by someone else."""
+        from db.mongo import get_result_upgrades_collection
+        return get_result_upgrades_collection().find_one(
+            {"version": version, "kind": kind, "owner_id": str(owner_id)}, {"_id": 0}
+        )
+
+    async def wait(self, version: str, kind: str, owner_id: str, wait_seconds: float = 0, poll_interval: float = 0.5) -> Optional[Dict[str, Any]]:
+        """Long-poll: re-reads the upgrade until it is no longer pending or wait_seconds elapse."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + max(wait_seconds, 0)
+        while True:
+            upgrade = await asyncio.to_thread(self.get, version, kind, owner_id)
+            if not upgrade or upgrade["status"] != self.PENDING or loop.time() >= deadline:
+                return upgrade
+            await asyncio.sleep(poll_interval)
+
+    def respond(self, response: Response, upgrade: Optional[Dict[str, Any]]) -> List[Any]:
+        """Route helper: 404 unknown token, 202 while pending, 502 if the upgrade failed, else the results."""
+        if not upgrade:
+            raise HTTPException(status_code=404, detail="Unknown or expired result version")
+        if upgrade["status"] == self.FAILED:
+            raise HTTPException(status_code=502, detail=f"Result upgrade failed: {upgrade.get('error')}")
+        response.headers["X-Result-Version"] = upgrade["version"]
+        if upgrade["status"] == self.PENDING:
+            response.status_code = 202
+            response.headers["Retry-After"] = "2"
+            return []
+        response.headers["X-Result-Quality"] = "llm"
+        return upgrade["results"]
+
+
+# Global service instance
+result_upgrades = ResultUpgradeService(max_workers=int(os.getenv("RESULT_UPGRADE_WORKERS", "4")))
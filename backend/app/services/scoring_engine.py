@@ -0,0 +1,130 @@
+import numpy as np
+from typing import List, Dict, Any
+from models.profile import SleepSchedule, Cleanliness, NoiseTolerance, StudyHabits, FoodPref
+
+# Lifestyle fields encoded as small-int columns. Code 0 is reserved for
+# missing/unknown values, enum members are numbered from 1 in declaration order.
+FIELD_ENUMS = {
+    "sleep_schedule": SleepSchedule,
+    "cleanliness": Cleanliness,
+    "noise_tolerance": NoiseTolerance,
+    "study_habits": StudyHabits,
+    "food_pref": FoodPref,
+}
+
+# Same weights as MatchScorerAgent._rule_based_fallback
+MATCH_WEIGHTS = {
+    "sleep_schedule": 20,
+    "cleanliness": 20,
+    "noise_tolerance": 15,
+    "study_habits": 15,
+}
+
+# Opposite-end pairs that the red flag rubric treats as conflicts
+CONFLICTS = {
+    "sleep_schedule": [(SleepSchedule.NIGHT_OWL, SleepSchedule.EARLY_RISER, "HIGH")],
+    "cleanliness": [(Cleanliness.TIDY, Cleanliness.MESSY, "HIGH")],
+    "noise_tolerance": [(NoiseTolerance.QUIET, NoiseTolerance.LOUD_OK, "MEDIUM")],
+    "study_habits": [(StudyHabits.ROOM_STUDY, StudyHabits.LATE_NIGHT, "MEDIUM")],
+}
+
+BUDGET_CLOSE_PKR = 10000
+BUDGET_FAR_PKR = 30000
+
+
+def _build_codes(enum_cls) -> Dict[str, int]:
+    return {member.value.lower(): i for i, member in enumerate(enum_cls, start=1)}
+
+
+FIELD_CODES = {field: _build_codes(enum_cls) for field, enum_cls in FIELD_ENUMS.items()}
+
+
+def encode_value(field: str, value: Any) -> int:
+    """Maps an enum value (or its string form, case-insensitive) to its column code."""
+    if value is None:
+        return 0
+    if hasattr(value, "value"):
+        value = value.value
+    return FIELD_CODES[field].get(str(value).strip().lower(), 0)
+
+
+def _budget(profile: Dict[str, Any]) -> int:
+    try:
+        return int(profile.get("budget_PKR") or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+class CandidateMatrix:
+    """
+    Column-oriented encoding of a candidate pool so a seeker can be scored
+    against every candidate in a single vectorized pass.
+    """
+
+    def __init__(self, profiles: List[Dict[str, Any]]):
+        self.profiles = profiles
+        self.budgets = np.fromiter((_budget(p) for p in profiles), dtype=np.int64, count=len(profiles))
+        self.columns = {
+            field: np.fromiter(
+                (encode_value(field, p.get(field)) for p in profiles), dtype=np.int8, count=len(profiles)
+            )
+            for field in FIELD_ENUMS
+        }
+
+    def __len__(self) -> int:
+        return len(self.profiles)
+
+    def score(self, seeker: Dict[str, Any]) -> Dict[str, np.ndarray]:
+        """
+        Scores the seeker against all candidates. Mirrors the rule-based scorer,
+        red flag rubric and the risk penalties applied in MatchPipeline.run_pipeline;
+        a field missing on either side (code 0) never counts as a match.
+        """
+        budget_diff = np.abs(self.budgets - _budget(seeker))
+        base = np.where(budget_diff <= BUDGET_CLOSE_PKR, 30, np.where(budget_diff <= BUDGET_FAR_PKR, 15, 0))
+
+        for field, weight in MATCH_WEIGHTS.items():
+            code = encode_value(field, seeker.get(field))
+            if code:
+                base = base + weight * (self.columns[field] == code)
+        base = np.minimum(base, 100)
+
+        high_risk = budget_diff > BUDGET_FAR_PKR
+        medium_risk = budget_diff > BUDGET_CLOSE_PKR
+
+        for field, pairs in CONFLICTS.items():
+            seeker_code = encode_value(field, seeker.get(field))
+            if not seeker_code:
+                continue
+            column = self.columns[field]
+            for a, b, severity in pairs:
+                code_a, code_b = encode_value(field, a), encode_value(field, b)
+                if seeker_code == code_a:
+                    clash = column == code_b
+                elif seeker_code == code_b:
+                    clash = column == code_a
+                else:
+                    continue
+                if severity == "HIGH":
+                    high_risk = high_risk | clash
+                else:
+                    medium_risk = medium_risk | clash
+
+        medium_risk = medium_risk & ~high_risk
+        final = np.where(high_risk, base - 20, np.where(medium_risk, base - 10, base))
+        final = np.maximum(final, 0)
+
+        return {"base_score": base, "final_score": final, "high_risk": high_risk, "medium_risk": medium_risk}
+
+    def top_k(self, seeker: Dict[str, Any], k: int) -> List[int]:
+        """Returns indices of the k best candidates, ordered by final score descending."""
+        if k <= 0 or not len(self):
+            return []
+        final = self.score(seeker)["final_score"]
+        if k < len(final):
+            # Partial selection first so large pools don't pay for a full sort
+            idx = np.argpartition(-final, k - 1)[:k]
+        else:
+            idx = np.arange(len(final))
+        order = idx[np.argsort(-final[idx], kind="stable")]
+        return order.tolist()
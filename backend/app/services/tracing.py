@@ -0,0 +1,139 @@
+import os
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+from pymongo import monitoring
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:
+    otel_trace = None
+
+# Latency bucket upper bounds in milliseconds (the last bucket is +Inf)
+DEFAULT_BUCKETS_MS = [1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000]
+
+
+class Histogram:
+    """Fixed-bucket latency histogram (cumulative counts are derived on read)."""
+
+    def __init__(self, buckets_ms: List[float] = DEFAULT_BUCKETS_MS):
+        self.bounds = list(buckets_ms)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, value_ms: float):
+        self.counts[bisect.bisect_left(self.bounds, value_ms)] += 1
+        self.count += 1
+        self.sum_ms += value_ms
+        self.max_ms = max(self.max_ms, value_ms)
+
+    def quantile(self, q: float) -> float:
+        """Estimate by linear interpolation inside the bucket holding the q-th observation."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = self.bounds[i - 1] if i > 0 else 0.0
+                upper = min(self.bounds[i], self.max_ms) if i < len(self.bounds) else self.max_ms
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.max_ms
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum_ms": round(self.sum_ms, 3),
+            "mean_ms": round(self.sum_ms / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "p50_ms": round(self.quantile(0.5), 3),
+            "p90_ms": round(self.quantile(0.9), 3),
+            "p99_ms": round(self.quantile(0.99), 3),
+            "buckets": {str(b): c for b, c in zip(self.bounds + ["+Inf"], self.counts)},
+        }
+
+
+class StageMetrics:
+    """
+    Process-wide registry of per-stage latency histograms and event counters.
+    Spans feed it; when OTEL_TRACING_ENABLED is set and opentelemetry-api is
+    installed, each span is also emitted as an OpenTelemetry span (exporters are
+    configured by the deployment, e.g. opentelemetry-instrument).
+    """
+
+    def __init__(self, otel_enabled: bool = False):
+        self.histograms: Dict[str, Histogram] = {}
+        self.counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.tracer = otel_trace.get_tracer("flatwalay") if otel_enabled and otel_trace else None
+
+    def observe(self, stage: str, seconds: float):
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram()
+            histogram.observe(seconds * 1000)
+
+    def count(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    @contextmanager
+    def span(self, stage: str, **attributes):
+        """Times the enclosed block into the stage's histogram (and an OTel span if enabled)."""
+        otel_span = self.tracer.start_as_current_span(stage, attributes=attributes) if self.tracer else None
+        if otel_span is not None:
+            otel_span.__enter__()
+        started = time.perf_counter()
+        error: Optional[BaseException] = None
+        try:
+            yield
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+            if error is not None:
+                self.count(f"{stage}.errors")
+            if otel_span is not None:
+                otel_span.__exit__(type(error) if error else None, error, error.__traceback__ if error else None)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "stages": {name: h.snapshot() for name, h in sorted(self.histograms.items())},
+                "counters": dict(sorted(self.counters.items())),
+            }
+
+
+class DBCommandListener(monitoring.CommandListener):
+    """Records every MongoDB command's server round-trip time as a db.<command> stage."""
+
+    def __init__(self, metrics: StageMetrics):
+        self.metrics = metrics
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self.metrics.observe(f"db.{event.command_name}", event.duration_micros / 1e6)
+
+    def failed(self, event):
+        self.metrics.observe(f"db.{event.command_name}", event.duration_micros / 1e6)
+        self.metrics.count(f"db.{event.command_name}.errors")
+
+
+# Global metrics instance
+stage_metrics = StageMetrics(otel_enabled=os.getenv("OTEL_TRACING_ENABLED", "false").lower() in ("1", "true", "yes"))
+span = stage_metrics.span
+
+
+async def traced(stage: str, awaitable):
+    """Awaits inside a span, so concurrent awaitables (asyncio.gather) are timed separately."""
+    with span(stage):
+        return await awaitable
@@ -0,0 +1,55 @@
+"""
+Trains the local profile classifier tier from the LLM parses in the profile cache.
+
+Run from backend/app:
+    python train_profile_classifier.py
+    python train_profile_classifier.py --db profile_cache.db --output profile_classifier.json.gz --min-confidence 0.9
+
+A held-out split is scored first (per-field accuracy, how many ads the tier would
+answer at the chosen thresholds, and how many of those match the LLM exactly),
+then the model is refit on every example and saved. ProfileReaderAgent loads it
+from PROFILE_CLASSIFIER_PATH on startup.
+"""
+import os
+import json
+import random
+import argparse
+
+from services.profile_cache import ProfileParseCache
+from services.profile_classifier import train, evaluate, usable_examples
+
+MIN_EXAMPLES = 50
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the local profile classifier")
+    parser.add_argument("--db", default=os.getenv("PROFILE_CACHE_DB_PATH", "profile_cache.db"))
+    parser.add_argument("--output", default=os.getenv("PROFILE_CLASSIFIER_PATH", "profile_classifier.json.gz"))
+    parser.add_argument("--epochs", type=int, default=15)
+    parser.add_argument("--holdout", type=float, default=0.2)
+    parser.add_argument("--min-confidence", type=float, default=float(os.getenv("PROFILE_CLASSIFIER_MIN_CONFIDENCE", "0.85")))
+    parser.add_argument("--min-slot-precision", type=float, default=float(os.getenv("PROFILE_CLASSIFIER_MIN_SLOT_PRECISION", "0.9")))
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    examples = usable_examples(ProfileParseCache(db_path=args.db).labeled_examples())
+    print(f"⚡ {len(examples)} usable LLM-labeled ads in {args.db}")
+    if len(examples) < MIN_EXAMPLES:
+        raise SystemExit(f"❌ Need at least {MIN_EXAMPLES} labeled ads to train; parse more ads first.")
+
+    random.Random(args.seed).shuffle(examples)
+    split = int(len(examples) * (1 - args.holdout))
+    if 0 < split < len(examples):
+        held_out = train(examples[:split], args.epochs, args.min_confidence, args.min_slot_precision)
+        print("Held-out evaluation:")
+        print(json.dumps(evaluate(held_out, examples[split:]), indent=2))
+
+    model = train(examples, args.epochs, args.min_confidence, args.min_slot_precision)
+    print("Slots:")
+    print(json.dumps(model.slots, indent=2))
+    model.save(args.output)
+    print(f"✅ Saved profile classifier to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
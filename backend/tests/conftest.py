@@ -0,0 +1,24 @@
+"""
+Shared setup for the backend unit tests.
+
+The app modules import each other as top-level packages (services, agents, ...)
+from backend/app, and several of them build global instances from the
+environment at import time; set that environment here, before anything is
+imported, so tests never touch the checked-in SQLite files.
+"""
+import os
+import sys
+import tempfile
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+sys.path.insert(0, APP_DIR)
+
+_STATE_DIR = tempfile.mkdtemp(prefix="flatwaley-tests-")
+os.environ.setdefault("GROQ_API_KEY", "test-key")
+os.environ["PAIR_CACHE_DB_PATH"] = os.path.join(_STATE_DIR, "pair_cache.db")
+# Offline LLM backend; agents still need a GROQ_API_KEY to take their LLM path
+os.environ["LLM_BACKEND"] = "fake"
+os.environ["FAKE_LLM_RECORDINGS"] = os.path.join(_STATE_DIR, "llm_recordings.jsonl")
+os.environ["EXPLANATION_CACHE_DB_PATH"] = os.path.join(_STATE_DIR, "explanation_cache.db")
+os.environ["PROFILE_CACHE_DB_PATH"] = os.path.join(_STATE_DIR, "profile_cache.db")
+os.environ["PROFILE_CLASSIFIER_PATH"] = os.path.join(_STATE_DIR, "profile_classifier.json.gz")
@@ -0,0 +1,122 @@
+"""Just enough of a pymongo collection, in memory, for unit tests."""
+import copy
+import re
+
+from pymongo.errors import DuplicateKeyError
+
+_MISSING = object()
+
+
+def _values(doc, path):
+    """Values at a dotted path, fanning out over arrays like MongoDB does."""
+    values = [doc]
+    for part in path.split("."):
+        found = []
+        for value in values:
+            items = value if isinstance(value, list) else [value]
+            for item in items:
+                if isinstance(item, dict) and part in item:
+                    found.append(item[part])
+        values = found
+    return values
+
+
+def _matches(doc, query):
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(_matches(doc, sub) for sub in condition):
+                return False
+            continue
+        values = _values(doc, key)
+        if isinstance(condition, dict) and any(op.startswith("$") for op in condition):
+            for op, operand in condition.items():
+                if op == "$in" and not any(v in operand for v in values):
+                    return False
+                if op == "$exists" and bool(values) != operand:
+                    return False
+                # A missing field compares equal to None, as in MongoDB
+                present = values or [None]
+                if op == "$nin" and any(v in operand for v in present):
+                    return False
+                if op == "$ne" and operand in present:
+                    return False
+                if op == "$gte" and not any(v is not None and v >= operand for v in values):
+                    return False
+                if op == "$lte" and not any(v is not None and v <= operand for v in values):
+                    return False
+                if op == "$regex":
+                    flags = re.IGNORECASE if "i" in condition.get("$options", "") else 0
+                    if not any(isinstance(v, str) and re.search(operand, v, flags) for v in values):
+                        return False
+        elif condition not in values:
+            return False
+    return True
+
+
+class FakeCollection:
+    def __init__(self, unique=()):
+        self.docs = []
+        # Tuples of field names that must be unique together (docs missing a field are exempt)
+        self.unique = unique
+
+    def _check_unique(self, doc, ignore=None):
+        for fields in self.unique:
+            key = tuple(doc.get(f, _MISSING) for f in fields)
+            if _MISSING in key:
+                continue
+            for other in self.docs:
+                if other is not ignore and tuple(other.get(f, _MISSING) for f in fields) == key:
+                    raise DuplicateKeyError(f"duplicate key {dict(zip(fields, key))}")
+
+    @staticmethod
+    def _project(doc, projection):
+        doc = copy.deepcopy(doc)
+        if projection and projection.get("_id") == 0:
+            doc.pop("_id", None)
+        return doc
+
+    def find_one(self, query=None, projection=None):
+        for doc in self.docs:
+            if _matches(doc, query or {}):
+                return self._project(doc, projection)
+        return None
+
+    def find(self, query=None, projection=None):
+        return [self._project(doc, projection) for doc in self.docs if _matches(doc, query or {})]
+
+    def insert_one(self, doc):
+        self._check_unique(doc)
+        self.docs.append(copy.deepcopy(doc))
+
+    def replace_one(self, query, replacement, upsert=False):
+        for i, doc in enumerate(self.docs):
+            if _matches(doc, query):
+                self.docs[i] = copy.deepcopy(replacement)
+                return
+        if upsert:
+            self.insert_one(replacement)
+
+    def update_one(self, query, update):
+        for doc in self.docs:
+            if _matches(doc, query):
+                doc.update(copy.deepcopy(update["$set"]))
+                return
+
+    def update_many(self, query, update):
+        for doc in self.docs:
+            if _matches(doc, query):
+                doc.update(copy.deepcopy(update["$set"]))
+
+    def find_one_and_update(self, query, update, projection=None):
+        for doc in self.docs:
+            if _matches(doc, query):
+                before = self._project(doc, projection)
+                doc.update(copy.deepcopy(update["$set"]))
+                return before
+        return None
+
+    def delete_one(self, query):
+        for i, doc in enumerate(self.docs):
+            if _matches(doc, query):
+                del self.docs[i]
+                return
@@ -0,0 +1,115 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from agents.agent_pipeline import MatchPipeline
+from agents.match_scorer_agent import MatchScorerAgent
+from services.pair_cache import PairResultCache
+
+SEEKER = {"id": "seeker", "budget_PKR": 30000, "sleep_schedule": "Night owl", "cleanliness": "Tidy"}
+
+
+def candidate(name, budget=30000):
+    return {
+        "_id": name, "id": name, "full_name": name, "budget_PKR": budget,
+        "sleep_schedule": "Night owl", "cleanliness": "Messy", "raw_profile_text": f"{name} needs a room",
+    }
+
+
+class BatchClient:
+    """Scores each candidate in a request by a fixed table; ids listed in `drop` are left out."""
+
+    def __init__(self, scores, drop=(), fail_on_call=None):
+        self.scores, self.drop, self.fail_on_call = scores, set(drop), fail_on_call
+        self.requests = []
+
+    def chat_completion(self, **request):
+        self.requests.append(request)
+        if self.fail_on_call == len(self.requests):
+            raise RuntimeError("provider unavailable")
+        candidates = json.loads(request["messages"][1]["content"].split("Candidates: ", 1)[1])
+        ids = [c["id"] for c in candidates if c["id"] not in self.drop]
+        # Entries come back in reverse order; callers must match them by id
+        results = [{"id": i, "score": self.scores[i], "reasons": [f"reason for {i}"]} for i in reversed(ids)]
+        content = json.dumps({"results": results})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def scorer(client):
+    agent = MatchScorerAgent()
+    agent.client = client
+    return agent
+
+
+def test_score_many_keeps_candidate_order_and_falls_back_per_candidate():
+    candidates = [candidate("a"), candidate("b"), candidate("c")]
+    client = BatchClient({"a": 81, "b": "high", "c": 40}, drop={"c"})
+    agent = scorer(client)
+
+    results = agent.score_many(SEEKER, candidates)
+
+    assert list(results) == ["a", "b", "c"]
+    assert results["a"] == {"score": 81, "reasons": ["reason for a"]}
+    for name in ("b", "c"):
+        assert results[name] == {**agent._rule_based_fallback(SEEKER, candidates[1]), "degraded": True}
+    assert len(client.requests) == 1
+
+
+def test_score_many_chunks_by_token_budget_and_isolates_failed_chunks():
+    candidates = [candidate(name) for name in "abcdef"]
+    client = BatchClient({name: 70 for name in "abcdef"}, fail_on_call=1)
+    agent = scorer(client)
+    agent.BATCH_MAX_PROMPT_TOKENS = 50
+
+    results = agent.score_many(SEEKER, candidates)
+
+    assert len(client.requests) > 1
+    degraded = [name for name, result in results.items() if result.get("degraded")]
+    assert degraded and len(degraded) < len(candidates)
+    assert all(results[name]["score"] == 70 for name in results if name not in degraded)
+
+
+class BatchPipeline(MatchPipeline):
+    def __init__(self, docs, client, cache):
+        super().__init__(fused=False)
+        self.batch_scoring = True
+        self.docs = docs
+        self.pair_cache = cache
+        self.scoring_agent = scorer(client)
+        self.scoring_agent.score_profiles = self.fail_per_pair
+        self.security_agent = SimpleNamespace(detect_conflicts=lambda a, b: {"red_flags": []})
+        self.aggregator_agent = SimpleNamespace(
+            generate_explanation=lambda **kwargs: {"summary_explanation": "ok", "negotiation_checklist": []}
+        )
+
+    @staticmethod
+    def fail_per_pair(*args):
+        raise AssertionError("batch mode must not score pairs one by one")
+
+    def _load_candidates(self, user_profile, shortlist_size=None):
+        return [dict(doc) for doc in self.docs]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return PairResultCache(db_path=str(tmp_path / "pairs.db"))
+
+
+def test_pipeline_scores_uncached_candidates_in_one_batch(cache):
+    docs = [candidate("a"), candidate("b"), candidate("c")]
+    client = BatchClient({"a": 90, "b": 60, "c": 75}, drop={"b"})
+    pipeline = BatchPipeline(docs, client, cache)
+
+    results = pipeline.get_best_matches(SEEKER, top_n=3)
+
+    assert len(client.requests) == 1
+    assert [r["profile"]["id"] for r in results][:2] == ["a", "c"]
+    by_id = {r["profile"]["id"]: r for r in results}
+    assert by_id["a"]["base_score"] == 90 and not by_id["a"]["degraded"]
+    assert by_id["b"]["degraded"]
+
+    # Full-quality pairs were cached, so only the degraded one is scored again
+    pipeline.get_best_matches(SEEKER, top_n=3)
+    second = json.loads(client.requests[1]["messages"][1]["content"].split("Candidates: ", 1)[1])
+    assert [c["id"] for c in second] == ["b"]
@@ -0,0 +1,46 @@
+from bson import ObjectId
+
+from db.mongo import build_candidate_query, location_fields
+from fake_mongo import FakeCollection
+
+
+def profile(name, city, budget=30000, normalized=True):
+    doc = {"_id": ObjectId(), "full_name": name, "city": city, "budget_PKR": budget}
+    if normalized:
+        doc.update(location_fields(doc))
+    return doc
+
+
+def names(collection, query):
+    return sorted(doc["full_name"] for doc in collection.find(query))
+
+
+def test_profiles_written_without_city_norm_still_match_on_city():
+    profiles = FakeCollection()
+    for doc in [
+        profile("api", "Lahore"),
+        profile("script", " LAHORE ", normalized=False),
+        profile("other-city", "Karachi", normalized=False),
+        profile("prefix", "Lahore Cantt", normalized=False),
+    ]:
+        profiles.insert_one(doc)
+
+    assert names(profiles, build_candidate_query({"city": "lahore"})) == ["api", "script"]
+
+
+def test_without_a_seeker_city_any_profile_with_a_city_matches():
+    profiles = FakeCollection()
+    for doc in [profile("api", "Lahore"), profile("script", "Karachi", normalized=False), profile("blank", "", normalized=False)]:
+        profiles.insert_one(doc)
+
+    assert names(profiles, build_candidate_query({})) == ["api", "script"]
+
+
+def test_budget_window_and_own_profile_are_excluded():
+    seeker = profile("seeker", "Lahore")
+    profiles = FakeCollection()
+    for doc in [seeker, profile("near", "Lahore", 32000), profile("far", "Lahore", 90000, normalized=False)]:
+        profiles.insert_one(doc)
+
+    query = build_candidate_query({**seeker, "id": str(seeker["_id"])}, budget_window_pkr=5000)
+    assert names(profiles, query) == ["near"]
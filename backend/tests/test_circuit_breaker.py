@@ -0,0 +1,180 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from groq import BadRequestError, InternalServerError
+
+from services import circuit_breaker as breaker_module
+from services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from services.llm_gateway import LLMGateway, Priority, RateLimitBudgetExceeded, is_provider_failure
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(breaker_module, "time", SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker(window_seconds=60, min_calls=4, error_rate_threshold=0.5, slow_call_seconds=5, open_seconds=30)
+
+
+def fail(breaker, times):
+    for _ in range(times):
+        assert breaker.allow_request()
+        breaker.record(False, 0.1)
+
+
+def test_closed_until_min_calls(breaker):
+    fail(breaker, 3)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_opens_on_error_rate_and_rejects(breaker):
+    breaker.record(True, 0.1)
+    breaker.record(True, 0.1)
+    fail(breaker, 2)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+
+
+def test_opens_on_slow_calls(breaker):
+    for _ in range(4):
+        breaker.record(True, 6.0)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_old_calls_leave_the_window(breaker, clock):
+    fail(breaker, 3)
+    clock.now += 61
+    breaker.record(True, 0.1)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_probe_success_closes(breaker, clock):
+    fail(breaker, 4)
+    clock.now += 31
+    assert breaker.allow_request()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # Only one probe at a time
+    assert not breaker.allow_request()
+    breaker.record(True, 0.1)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow_request()
+
+
+def test_half_open_probe_failure_reopens(breaker, clock):
+    fail(breaker, 4)
+    clock.now += 31
+    assert breaker.allow_request()
+    breaker.record(False, 0.1)
+    assert breaker.state == CircuitBreaker.OPEN
+    clock.now += 10
+    assert not breaker.allow_request()
+
+
+def test_released_probe_frees_the_slot(breaker, clock):
+    fail(breaker, 4)
+    clock.now += 31
+    assert breaker.allow_request()
+    breaker.release()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request()
+
+
+def api_error(error_cls, status_code):
+    request = httpx.Request("POST", "https://api.groq.com/openai/v1/chat/completions")
+    return error_cls("error", response=httpx.Response(status_code, request=request), body=None)
+
+
+def test_only_provider_errors_count():
+    assert is_provider_failure(api_error(InternalServerError, 503))
+    assert not is_provider_failure(api_error(BadRequestError, 400))
+    assert not is_provider_failure(ValueError("bad request arguments"))
+
+
+@pytest.mark.parametrize("error, opens", [
+    (api_error(BadRequestError, 400), False),
+    (api_error(InternalServerError, 500), True),
+])
+def test_gateway_breaker_ignores_client_errors(error, opens):
+    gateway = LLMGateway(
+        api_key=None, backend="fake", max_retries=0,
+        breaker_settings={"min_calls": 3, "error_rate_threshold": 0.5},
+    )
+
+    def create(**request):
+        raise error
+    gateway.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+    for _ in range(5):
+        with pytest.raises((type(error), CircuitOpenError)):
+            gateway.chat_completion(model="m", messages=[{"role": "user", "content": "hi"}])
+    assert (gateway.breaker("m").state == CircuitBreaker.OPEN) == opens
+
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+def half_open_gateway(clock, **settings):
+    """Gateway whose breaker for model "m" is due to let its half-open probe through."""
+    gateway = LLMGateway(api_key=None, backend="fake", max_retries=0, breaker_settings={"min_calls": 1}, **settings)
+    gateway.breaker("m").record(False, 0.1)
+    clock.now += 31
+    return gateway, gateway.breaker("m")
+
+
+def test_cancelled_probe_frees_the_slot(clock):
+    gateway, breaker = half_open_gateway(clock)
+    started = asyncio.Event()
+
+    async def create(**request):
+        started.set()
+        await asyncio.sleep(60)
+    gateway.async_client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+    async def cancel_probe():
+        task = asyncio.create_task(gateway.chat_completion_async(model="m", messages=MESSAGES))
+        await started.wait()
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_probe())
+    assert breaker.allow_request()
+
+
+def test_rate_limited_call_does_not_take_the_probe(clock):
+    gateway, breaker = half_open_gateway(clock, requests_per_minute=1, max_rate_limit_wait=0)
+    gateway.limiter.reserve(1, Priority.INTERACTIVE)
+
+    with pytest.raises(RateLimitBudgetExceeded):
+        gateway.chat_completion(model="m", messages=MESSAGES)
+    assert breaker.allow_request()
+
+
+def test_async_retries_after_a_provider_error():
+    gateway = LLMGateway(api_key=None, backend="fake", max_retries=1, base_delay=0)
+    calls = []
+
+    async def create(**request):
+        calls.append(request)
+        if len(calls) == 1:
+            raise api_error(InternalServerError, 503)
+        return SimpleNamespace(model="m", usage=None)
+    gateway.async_client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+    asyncio.run(gateway.chat_completion_async(model="m", messages=MESSAGES))
+    assert len(calls) == 2
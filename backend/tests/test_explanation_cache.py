@@ -0,0 +1,118 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from agents.wingman_agent import MatchExplainerAgent, validate_explanation
+from services import explanation_cache as cache_module
+from services.explanation_cache import ExplanationCache, explanation_key
+from services.llm_gateway import llm_gateway
+
+REASONS = ["Budgets are similar", "Sleep schedules match"]
+FLAGS = [
+    {"type": "Budget Mismatch", "severity": "MEDIUM", "evidence": "Differ by 15000 PKR."},
+    {"type": "Noise Tolerance Mismatch", "severity": "MEDIUM", "evidence": "Quiet vs loud."},
+]
+EXPLANATION = {
+    "summary_explanation": "A solid match at 72/100 with a budget gap to discuss.",
+    "negotiation_checklist": [{"suggestion": "Agree on rent split.", "category": "Budget"}],
+}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ExplanationCache(db_path=str(tmp_path / "explanations.db"), max_memory_entries=2, score_bucket=5)
+
+
+def test_key_ignores_order_case_and_evidence():
+    shuffled_flags = [{**FLAGS[1], "evidence": "other words"}, {**FLAGS[0], "type": "  budget   mismatch "}]
+    shuffled_reasons = ["sleep schedules match.", " Budgets  are similar"]
+    assert explanation_key(72, REASONS, FLAGS, 5) == explanation_key(74, shuffled_reasons, shuffled_flags, 5)
+
+
+def test_key_separates_buckets_and_severities():
+    assert explanation_key(74, REASONS, FLAGS, 5) != explanation_key(75, REASONS, FLAGS, 5)
+    high = [{**FLAGS[0], "severity": "HIGH"}, FLAGS[1]]
+    assert explanation_key(72, REASONS, FLAGS, 5) != explanation_key(72, REASONS, high, 5)
+
+
+def test_cached_summary_is_rendered_for_the_requested_score(cache):
+    cache.put(72, REASONS, FLAGS, EXPLANATION)
+    served = cache.get(74, REASONS, FLAGS)
+    assert served["summary_explanation"] == "A solid match at 74/100 with a budget gap to discuss."
+    assert served["negotiation_checklist"] == EXPLANATION["negotiation_checklist"]
+
+
+def test_entries_survive_a_restart(cache):
+    cache.put(72, REASONS, FLAGS, EXPLANATION)
+    reopened = ExplanationCache(db_path=cache.db_path, score_bucket=5)
+    assert reopened.get(72, REASONS, FLAGS) is not None
+    assert reopened.stats()["disk_hits"] == 1
+
+
+def test_expired_entries_are_misses(cache, monkeypatch):
+    cache.put(72, REASONS, FLAGS, EXPLANATION)
+    later = cache_module.time.time() + cache.ttl_seconds + 1
+    monkeypatch.setattr(cache_module, "time", SimpleNamespace(time=lambda: later))
+    assert cache.get(72, REASONS, FLAGS) is None
+
+
+def test_memory_tier_is_bounded(cache):
+    for score in (10, 20, 30):
+        cache.put(score, REASONS, FLAGS, EXPLANATION)
+    assert cache.stats()["memory_entries"] == 2
+
+
+@pytest.mark.parametrize("output", [
+    {"negotiation_checklist": []},
+    {"summary_explanation": "", "negotiation_checklist": []},
+    {"summary_explanation": "ok", "negotiation_checklist": "talk about rent"},
+    {"summary_explanation": "ok", "negotiation_checklist": [{"category": "Budget"}]},
+    {"summary_explanation": "ok", "negotiation_checklist": ["Agree on rent split."]},
+    ["not", "an", "object"],
+])
+def test_malformed_explanations_are_rejected(output):
+    assert validate_explanation(output) is None
+
+
+def test_validation_drops_extra_keys():
+    output = {**EXPLANATION, "debug": "chain of thought"}
+    assert validate_explanation(output) == EXPLANATION
+
+
+class ToolClient:
+    """LLM client whose explanation tool call returns fixed arguments."""
+
+    def __init__(self, arguments):
+        self.arguments = arguments
+        self.calls = 0
+
+    def chat_completion(self, **request):
+        self.calls += 1
+        call = SimpleNamespace(function=SimpleNamespace(arguments=json.dumps(self.arguments)))
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(tool_calls=[call]))])
+
+
+def explainer(cache, arguments):
+    agent = MatchExplainerAgent(api_key="test", cache=cache, table=None)
+    agent.client = ToolClient(arguments)
+    return agent
+
+
+def test_malformed_llm_output_falls_back_and_is_not_cached(cache):
+    agent = explainer(cache, {"summary_explanation": "Looks fine"})
+
+    with llm_gateway.track_degradation() as tracker:
+        result = agent.generate_explanation(72, REASONS, FLAGS)
+
+    assert result == agent._rule_based_fallback(72, REASONS, FLAGS)
+    assert tracker.degraded
+    assert cache.get(72, REASONS, FLAGS) is None
+
+
+def test_valid_llm_output_is_served_from_cache_next_time(cache):
+    agent = explainer(cache, EXPLANATION)
+
+    assert agent.generate_explanation(72, REASONS, FLAGS) == EXPLANATION
+    assert agent.generate_explanation(73, REASONS, FLAGS)["summary_explanation"].startswith("A solid match at 73/100")
+    assert agent.client.calls == 1
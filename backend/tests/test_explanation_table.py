@@ -0,0 +1,94 @@
+import pytest
+
+from agents.wingman_agent import MatchExplainerAgent
+from services.explanation_table import RULE_BASED_MODEL, ExplanationTable, save_table, table_key
+
+FLAGS = [
+    {"type": "Sleep Schedule Mismatch", "severity": "HIGH", "evidence": "Early riser vs night owl."},
+    {"type": "Budget Mismatch", "severity": "MEDIUM", "evidence": "Differ by 15000 PKR."},
+]
+
+
+ENTRIES = {
+    "60-79|budget:MEDIUM,sleep:HIGH": {
+        "summary_explanation": "This match has a compatibility score of {match_score}/100. Sleep and budget need a talk.",
+        "negotiation_checklist": [
+            {"suggestion": "Agree on quiet hours.", "category": "Sleep Schedule"},
+            {"suggestion": "Split rent by room size.", "category": "Budget"},
+        ],
+    },
+}
+
+
+@pytest.fixture
+def table(tmp_path):
+    path = str(tmp_path / "explanation_table.json")
+    save_table(path, ENTRIES, "openai/gpt-oss-120b")
+    return ExplanationTable.load(path)
+
+
+class UnreachableClient:
+    """LLM client that fails the test if the agent calls it."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def chat_completion(self, **request):
+        self.calls += 1
+        raise AssertionError("explanation should have come from the table")
+
+
+@pytest.mark.parametrize("model", [RULE_BASED_MODEL, None])
+def test_tables_not_generated_by_an_llm_are_not_loaded(tmp_path, model):
+    path = tmp_path / "explanation_table.json"
+    save_table(str(path), ENTRIES, model)
+
+    assert ExplanationTable.load(str(path)) is None
+
+
+def test_loaded_table_keeps_its_model(table):
+    assert table.model == "openai/gpt-oss-120b"
+    assert len(table) == 1
+
+
+def test_key_ignores_low_flags_and_collapses_duplicates():
+    flags = FLAGS + [
+        {"type": "Budget Mismatch", "severity": "LOW"},
+        {"type": "Noise Tolerance Mismatch", "severity": "LOW"},
+        {"type": "budget mismatch", "severity": "high"},
+    ]
+    assert table_key(72, flags) == "60-79|budget:HIGH,sleep:HIGH"
+    assert table_key(100, []) == "80-100|"
+
+
+def test_key_is_none_outside_known_categories_and_bands():
+    assert table_key(72, [{"type": "Food Preference Mismatch", "severity": "HIGH"}]) is None
+    assert table_key(72, [{"type": "Budget Mismatch", "severity": "CRITICAL"}]) is None
+    assert table_key(101, FLAGS) is None
+
+
+def test_known_combination_is_served_without_an_llm_call(table):
+    agent = MatchExplainerAgent(api_key="test", cache=None, table=table)
+    agent.client = UnreachableClient()
+
+    explanation = agent.generate_explanation(72, ["Study habits match"], FLAGS)
+
+    assert agent.client.calls == 0
+    assert explanation["summary_explanation"].startswith("This match has a compatibility score of 72/100.")
+    assert [item["category"] for item in explanation["negotiation_checklist"]] == ["Sleep Schedule", "Budget"]
+
+
+def test_lookup_returns_a_copy(table):
+    served = table.lookup(72, FLAGS)
+    served["negotiation_checklist"][0]["category"] = "changed"
+    assert table.lookup(72, FLAGS)["negotiation_checklist"][0]["category"] == "Sleep Schedule"
+
+
+def test_unknown_combination_goes_to_the_llm(table):
+    agent = MatchExplainerAgent(api_key="test", cache=None, table=table)
+    agent.client = UnreachableClient()
+
+    explanation = agent.generate_explanation(72, [], [{"type": "Food Preference Mismatch", "severity": "HIGH"}])
+
+    assert agent.client.calls == 1
+    assert explanation == agent._rule_based_fallback(72, [], [{"type": "Food Preference Mismatch", "severity": "HIGH"}])
@@ -0,0 +1,39 @@
+from services.fake_llm import FakeLLMBackend, FakeGroq
+from services.llm_gateway import LLMGateway
+
+
+def json_request(system):
+    return {
+        "model": "m",
+        "messages": [{"role": "system", "content": system}, {"role": "user", "content": "Ad: room in DHA"}],
+        "response_format": {"type": "json_object"},
+    }
+
+
+def test_responder_is_picked_by_prompt_name_not_wording():
+    gateway = LLMGateway(api_key=None, backend="fake", max_retries=0)
+
+    parsed = gateway.chat_completion(prompt_name="profile_parse", **json_request("Reworded reader prompt."))
+    scored = gateway.chat_completion(prompt_name="score_pair", **json_request("You are parsing unstructured roommate advertisements."))
+
+    assert "sleep_schedule" in parsed.choices[0].message.content
+    assert "sleep_schedule" not in scored.choices[0].message.content
+
+
+def test_repeat_counter_is_bounded():
+    backend = FakeLLMBackend(max_tracked_requests=3)
+    client = FakeGroq(backend)
+    for i in range(10):
+        client.chat.completions.create(**json_request(f"prompt {i}"))
+
+    assert len(backend._calls) == 3
+
+
+def test_repeats_of_a_request_get_fresh_responses():
+    client = FakeGroq(FakeLLMBackend())
+    first = client.chat.completions.create(**json_request("same"))
+    second = client.chat.completions.create(**json_request("same"))
+    replayed = FakeGroq(FakeLLMBackend()).chat.completions.create(**json_request("same"))
+
+    assert first.choices[0].message.content != second.choices[0].message.content
+    assert first.choices[0].message.content == replayed.choices[0].message.content
@@ -0,0 +1,36 @@
+import pytest
+
+from agents.match_analyst_agent import MatchAnalystAgent
+from services.llm_gateway import llm_gateway
+
+SEEKER = {"id": "a", "budget_PKR": 20000, "sleep_schedule": "Night owl", "cleanliness": "Tidy"}
+CANDIDATE = {"id": "b", "budget_PKR": 22000, "sleep_schedule": "Night owl", "cleanliness": "Messy"}
+ANALYSIS = {
+    "score": 64,
+    "reasons": ["Sleep schedules match"],
+    "red_flags": [{"type": "Cleanliness Mismatch", "severity": "HIGH", "evidence": "Tidy vs messy."}],
+    "summary_explanation": "A fair match at 64/100.",
+    "negotiation_checklist": [{"suggestion": "Agree on a cleaning rota.", "category": "Cleanliness"}],
+}
+
+
+@pytest.fixture
+def analyst():
+    return MatchAnalystAgent(api_key=None)
+
+
+def test_valid_analysis_is_kept(analyst):
+    with llm_gateway.track_degradation() as tracker:
+        result = analyst._merge_with_fallbacks(dict(ANALYSIS), SEEKER, CANDIDATE)
+    assert result == ANALYSIS
+    assert not tracker.degraded
+
+
+@pytest.mark.parametrize("reasons", ["Sleep schedules match", None, {"sleep": "match"}])
+def test_reasons_that_are_not_a_list_fall_back(analyst, reasons):
+    with llm_gateway.track_degradation() as tracker:
+        result = analyst._merge_with_fallbacks({**ANALYSIS, "reasons": reasons}, SEEKER, CANDIDATE)
+
+    expected = analyst.scorer._rule_based_fallback(SEEKER, CANDIDATE)
+    assert (result["score"], result["reasons"]) == (expected["score"], expected["reasons"])
+    assert tracker.degraded
@@ -0,0 +1,71 @@
+import pytest
+from bson import ObjectId
+
+import db.mongo
+from agents.agent_pipeline import match_pipeline
+from services.match_refresher import MatchRefreshWorker
+from fake_mongo import FakeCollection
+
+
+def profile_doc(name, budget):
+    return {
+        "_id": ObjectId(), "full_name": name, "city": "Lahore", "area": "DHA", "budget_PKR": budget,
+        "sleep_schedule": "Night owl", "cleanliness": "Tidy", "noise_tolerance": "Quiet",
+        "study_habits": "Library", "food_pref": "Veg", "age": 22, "occupation": "Student",
+        "raw_profile_text": f"{name} is looking for a room", "profile_photo": f"data:image/png;base64,{name}",
+    }
+
+
+@pytest.fixture
+def worker(monkeypatch):
+    profiles, match_results = FakeCollection(), FakeCollection()
+    monkeypatch.setattr(db.mongo, "get_profiles_collection", lambda: profiles)
+    monkeypatch.setattr(db.mongo, "get_match_results_collection", lambda: match_results)
+
+    seeker, ali, sara = profile_doc("seeker", 30000), profile_doc("ali", 32000), profile_doc("sara", 45000)
+    profiles.docs.extend([seeker, ali, sara])
+
+    def fake_best_matches(user_profile, top_n, shortlist_size):
+        from agents.agent_pipeline import pipeline_profile
+        return [
+            {"final_score": 80, "degraded": False, "profile": pipeline_profile(ali)},
+            {"final_score": 55, "degraded": False, "profile": pipeline_profile(sara)},
+        ]
+    monkeypatch.setattr(match_pipeline, "get_best_matches", fake_best_matches)
+
+    worker = MatchRefreshWorker(top_n=5)
+    worker.profiles, worker.match_results = profiles, match_results
+    worker.ids = {"seeker": str(seeker["_id"]), "ali": str(ali["_id"]), "sara": str(sara["_id"])}
+    return worker
+
+
+def test_stores_candidate_ids_without_profiles(worker):
+    returned = worker.refresh_now(worker.ids["seeker"])
+
+    stored = worker.match_results.find_one({"profile_id": worker.ids["seeker"]})
+    assert [r["profile_id"] for r in stored["results"]] == [worker.ids["ali"], worker.ids["sara"]]
+    assert all("profile" not in r for r in stored["results"])
+    assert returned["results"][0]["profile"]["profile_photo"] == "data:image/png;base64,ali"
+
+
+def test_get_stored_hydrates_profiles_and_photos(worker):
+    worker.refresh_now(worker.ids["seeker"])
+
+    results = worker.get_stored(worker.ids["seeker"])["results"]
+    assert [r["profile"]["full_name"] for r in results] == ["ali", "sara"]
+    assert results[1]["profile"]["profile_photo"] == "data:image/png;base64,sara"
+    assert results[0]["final_score"] == 80
+
+
+def test_deleted_profile_leaves_other_lists_and_loses_its_own(worker):
+    worker.refresh_now(worker.ids["seeker"])
+    worker.refresh_now(worker.ids["ali"])
+
+    worker.profiles.delete_one({"_id": ObjectId(worker.ids["ali"])})
+    worker.on_profile_deleted(worker.ids["ali"])
+
+    assert worker.match_results.find_one({"profile_id": worker.ids["ali"]}) is None
+    stored = worker.get_stored(worker.ids["seeker"])
+    assert stored["stale"] is True
+    assert [r["profile"]["full_name"] for r in stored["results"]] == ["sara"]
+
@@ -0,0 +1,90 @@
+import pytest
+
+from services.near_duplicate import NearDuplicateIndex, normalize_ad, numbers_fingerprint
+from services.profile_cache import ProfileParseCache, text_key
+
+AD = (
+    "Looking for a roommate near FAST Lahore. Budget 25000 PKR. I am a night owl, tidy, "
+    "and prefer a quiet room. Vegetarian, study in the library."
+)
+REPOST = (
+    "Looking for a roommate near FAST Lahore!! 🙂 Budget 25000 PKR... I am a night owl, tidy, "
+    "and prefer a quiet room 🙏 Vegetarian -- study in the library 📚"
+)
+REORDERED = (
+    "I am a night owl, tidy, and prefer a quiet room. Looking for a roommate near FAST Lahore. "
+    "Budget 25000 PKR. Vegetarian, study in the library."
+)
+EDITED = (
+    "Looking for a roommate near FAST Lahore. Budget 25000 PKR. I am a night owl, messy, "
+    "and prefer a loud room. Vegetarian, study in the library."
+)
+OTHER = (
+    "Female student seeks flatmate in Karachi, rent 25000, early riser, cooks non-veg often, "
+    "loves music and guests on weekends."
+)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ProfileParseCache(db_path=str(tmp_path / "profiles.db"), pool_size=1)
+    yield cache
+    cache.pool.close()
+
+
+def indexed(cache, threshold=0.8):
+    index = NearDuplicateIndex(cache.pool, threshold=threshold)
+    index.add(cache.put(AD, {"sleep_schedule": "Night owl"}), AD)
+    return index
+
+
+def test_normalization_drops_emoji_punctuation_and_case():
+    assert normalize_ad(REPOST) == normalize_ad(AD)
+
+
+def test_numbers_fingerprint_ignores_thousands_separators():
+    assert numbers_fingerprint("Budget 25,000 PKR") == numbers_fingerprint("budget 25000")
+    assert numbers_fingerprint("Budget 25000 PKR") != numbers_fingerprint("Budget 30000 PKR")
+
+
+@pytest.mark.parametrize("text", [AD, REPOST, REORDERED])
+def test_reposts_match_the_cached_ad(cache, text):
+    match = indexed(cache).query(text)
+    assert match is not None
+    assert match[0] == text_key(AD)
+    assert match[1] >= 0.8
+
+
+@pytest.mark.parametrize("text", [EDITED, OTHER, AD.replace("25000", "30000")])
+def test_different_ads_do_not_match(cache, text):
+    assert indexed(cache).query(text) is None
+
+
+def test_threshold_is_respected(cache):
+    strict = indexed(cache, threshold=1.0)
+    assert strict.query(REPOST) is not None
+    assert strict.query(REORDERED) is None
+
+
+def test_bands_must_divide_permutations(cache):
+    with pytest.raises(ValueError):
+        NearDuplicateIndex(cache.pool, num_perm=64, bands=10)
+
+
+def test_removed_keys_stop_matching(cache):
+    index = indexed(cache)
+    key, _ = index.query(AD)
+    index.remove(key)
+    assert index.query(AD) is None
+    assert len(index) == 0
+
+
+def test_signatures_are_reloaded_only_for_cached_ads(cache):
+    index = indexed(cache)
+    assert len(NearDuplicateIndex(cache.pool)) == 1
+
+    with cache.pool.connection() as conn:
+        conn.execute("DELETE FROM profile_cache")
+        conn.commit()
+    assert len(NearDuplicateIndex(cache.pool)) == 0
+    assert len(index) == 1
@@ -0,0 +1,102 @@
+from types import SimpleNamespace
+
+import pytest
+
+from agents.agent_pipeline import MatchPipeline
+from agents.match_scorer_agent import match_scorer_agent
+from services import pair_cache as pair_cache_module
+from services.pair_cache import PairResultCache, pair_key
+
+SEEKER = {
+    "id": "a", "city": "Lahore", "area": "DHA", "budget_PKR": 30000, "sleep_schedule": "Night owl",
+    "cleanliness": "Tidy", "noise_tolerance": "Quiet", "study_habits": "Library", "food_pref": "Veg",
+    "age": 22, "occupation": "Student", "raw_profile_text": "Quiet student looking for a room",
+}
+CANDIDATE = {**SEEKER, "id": "b", "area": "Gulberg", "budget_PKR": 35000, "sleep_schedule": "Early riser"}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return PairResultCache(db_path=str(tmp_path / "pairs.db"), ttl_seconds=3600, max_entries=3)
+
+
+def test_key_is_symmetric_and_ignores_ids_and_formatting():
+    assert pair_key(SEEKER, CANDIDATE) == pair_key(CANDIDATE, SEEKER)
+    renamed = {**SEEKER, "id": "other", "full_name": "Someone", "area": "  dha "}
+    assert pair_key(renamed, CANDIDATE) == pair_key(SEEKER, CANDIDATE)
+    assert pair_key({**SEEKER, "budget_PKR": 31000}, CANDIDATE) != pair_key(SEEKER, CANDIDATE)
+
+
+def test_hit_in_both_directions(cache):
+    cache.put(SEEKER, CANDIDATE, {"final_score": 71})
+    assert cache.get(CANDIDATE, SEEKER) == {"final_score": 71}
+
+
+def test_expired_entries_are_dropped(cache, monkeypatch):
+    cache.put(SEEKER, CANDIDATE, {"final_score": 71})
+    now = pair_cache_module.time.time()
+    monkeypatch.setattr(pair_cache_module.time, "time", lambda: now + 3601)
+    assert cache.get(SEEKER, CANDIDATE) is None
+    monkeypatch.undo()
+    assert cache.get(SEEKER, CANDIDATE) is None
+
+
+def test_evicts_least_recently_used_every_prune_every_writes(tmp_path, monkeypatch):
+    clock = iter(range(1_000_000, 2_000_000))
+    monkeypatch.setattr(pair_cache_module, "time", SimpleNamespace(time=lambda: next(clock)))
+    cache = PairResultCache(db_path=str(tmp_path / "pairs.db"), ttl_seconds=3600, max_entries=3, prune_every=5)
+    others = [{**CANDIDATE, "id": f"c{i}", "budget_PKR": 40000 + i} for i in range(5)]
+    for other in others[:4]:
+        cache.put(SEEKER, other, {"final_score": other["budget_PKR"]})
+    # No trim until the prune_every-th write
+    assert cache.get(SEEKER, others[0]) == {"final_score": 40000}
+
+    cache.put(SEEKER, others[4], {"final_score": 40004})
+    assert cache.get(SEEKER, others[1]) is None
+    assert cache.get(SEEKER, others[2]) is None
+    assert cache.get(SEEKER, others[0]) == {"final_score": 40000}
+    assert cache.get(SEEKER, others[4]) == {"final_score": 40004}
+
+
+def test_prune_drops_expired_rows(cache, monkeypatch):
+    cache.put(SEEKER, CANDIDATE, {"final_score": 71})
+    later = pair_cache_module.time.time() + 3601
+    monkeypatch.setattr(pair_cache_module, "time", SimpleNamespace(time=lambda: later))
+    assert cache.prune() == 1
+
+
+def test_invalidate_profile_drops_pairs_on_either_side(cache):
+    cache.put(SEEKER, CANDIDATE, {"final_score": 71})
+    assert cache.invalidate_profile("b") == 1
+    assert cache.get(SEEKER, CANDIDATE) is None
+
+
+class UnparseableClient:
+    """Scorer client whose completion is not JSON."""
+
+    def chat_completion(self, **request):
+        message = SimpleNamespace(content="Sure! Here's my analysis...", tool_calls=None)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def test_agent_fallback_is_degraded_and_not_cached(cache, monkeypatch):
+    monkeypatch.setattr(match_scorer_agent, "client", UnparseableClient())
+    pipeline = MatchPipeline(fused=False)
+    pipeline.pair_cache = cache
+
+    result = pipeline.run_pipeline(SEEKER, CANDIDATE)
+
+    assert result["degraded"] is True
+    expected = match_scorer_agent._rule_based_fallback(SEEKER, CANDIDATE)
+    assert result["base_score"] == expected["score"]
+    assert cache.get(SEEKER, CANDIDATE) is None
+
+
+def test_full_quality_result_is_cached(cache):
+    pipeline = MatchPipeline(fused=False)
+    pipeline.pair_cache = cache
+
+    result = pipeline.run_pipeline(SEEKER, CANDIDATE)
+
+    assert result["degraded"] is False
+    assert cache.get(CANDIDATE, SEEKER)["final_score"] == result["final_score"]
@@ -0,0 +1,170 @@
+from datetime import datetime, timezone, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+import agents.profile_reader_agent as profile_reader_module
+import db.mongo
+from services.parse_jobs import ParseJobQueue
+from fake_mongo import FakeCollection
+
+AD = "Night owl student in Lahore, budget 25000."
+PROFILE = {"city": "Lahore", "budget_PKR": 25000}
+
+
+class FakeReader:
+    def __init__(self, cached=None, failures=0):
+        self.cached = cached
+        self.failures = failures
+        self.parses = 0
+
+    def parse_profile_without_llm(self, raw_text):
+        return (self.cached, "cache") if self.cached else None
+
+    def parse_profile_with_source(self, raw_text):
+        self.parses += 1
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("provider unavailable")
+        return PROFILE, "llm"
+
+
+@pytest.fixture
+def jobs(monkeypatch):
+    collection = FakeCollection(unique=(("job_id",), ("owner_id", "idempotency_key")))
+    monkeypatch.setattr(db.mongo, "get_parse_jobs_collection", lambda: collection)
+    return collection
+
+
+@pytest.fixture
+def reader(monkeypatch):
+    reader = FakeReader()
+    monkeypatch.setattr(profile_reader_module, "profile_reader", reader)
+    return reader
+
+
+@pytest.fixture
+def queue():
+    queue = ParseJobQueue(max_workers=1, max_queued=4, timeout_seconds=60)
+    yield queue
+    queue._executor.shutdown(wait=True)
+
+
+def drain(queue):
+    """Waits for the queued parses by swapping in a fresh executor."""
+    executor = queue._executor
+    queue._executor = type(executor)(max_workers=1)
+    executor.shutdown(wait=True)
+
+
+def test_repeated_key_returns_the_original_job(jobs, reader, queue):
+    first, created = queue.submit("u1", AD, "key-1")
+    drain(queue)
+    again, created_again = queue.submit("u1", AD, "key-1")
+
+    assert (created, created_again) == (True, False)
+    assert again["job_id"] == first["job_id"]
+    assert again["status"] == ParseJobQueue.DONE and again["profile"] == PROFILE
+    assert reader.parses == 1
+    assert len(jobs.docs) == 1
+
+
+def test_key_reused_for_a_different_ad_is_rejected(jobs, reader, queue):
+    queue.submit("u1", AD, "key-1")
+    with pytest.raises(HTTPException) as error:
+        queue.submit("u1", "Early riser in Karachi, budget 30000.", "key-1")
+    assert error.value.status_code == 422
+
+
+def test_keys_are_scoped_per_owner_and_optional(jobs, reader, queue):
+    a, _ = queue.submit("u1", AD, "key-1")
+    b, created = queue.submit("u2", AD, "key-1")
+    c, _ = queue.submit("u1", AD)
+    d, _ = queue.submit("u1", AD)
+    drain(queue)
+
+    assert created
+    assert len({a["job_id"], b["job_id"], c["job_id"], d["job_id"]}) == 4
+    assert reader.parses == 4
+
+
+def test_retry_after_a_failure_reruns_the_same_job(jobs, reader, queue):
+    reader.failures = 1
+    first, _ = queue.submit("u1", AD, "key-1")
+    drain(queue)
+    assert queue.get(first["job_id"], "u1")["status"] == ParseJobQueue.FAILED
+
+    retried, created = queue.submit("u1", AD, "key-1")
+    drain(queue)
+
+    assert not created
+    assert retried["job_id"] == first["job_id"] and retried["status"] == ParseJobQueue.QUEUED
+    assert queue.get(first["job_id"], "u1")["status"] == ParseJobQueue.DONE
+    assert reader.parses == 2
+    assert queue._queued == 0
+
+
+def test_retry_of_a_timed_out_job_is_not_requeued(jobs, reader, queue):
+    first, _ = queue.submit("u1", AD, "key-1")
+    drain(queue)
+    jobs.update_one({"job_id": first["job_id"]}, {"$set": {
+        "status": ParseJobQueue.RUNNING, "started_at": datetime.now(timezone.utc) - timedelta(seconds=120),
+    }})
+
+    replayed, _ = queue.submit("u1", AD, "key-1")
+    drain(queue)
+
+    # Reads as failed, but the worker may still finish it, so it is not parsed again
+    assert replayed["status"] == ParseJobQueue.FAILED
+    assert jobs.find_one({"job_id": first["job_id"]})["status"] == ParseJobQueue.RUNNING
+    assert reader.parses == 1
+    assert queue._queued == 0
+
+
+def test_queue_wait_does_not_count_toward_the_timeout(jobs, reader, queue):
+    first, _ = queue.submit("u1", AD, "key-1")
+    drain(queue)
+    now = datetime.now(timezone.utc)
+    jobs.update_one({"job_id": first["job_id"]}, {"$set": {
+        "status": ParseJobQueue.RUNNING, "created_at": now - timedelta(seconds=600), "started_at": now,
+    }})
+    assert queue.get(first["job_id"], "u1")["status"] == ParseJobQueue.RUNNING
+
+    jobs.update_one({"job_id": first["job_id"]}, {"$set": {"status": ParseJobQueue.QUEUED, "started_at": None}})
+    assert queue.get(first["job_id"], "u1")["status"] == ParseJobQueue.QUEUED
+
+    jobs.update_one({"job_id": first["job_id"]}, {"$set": {"created_at": now - timedelta(seconds=queue.queue_timeout_seconds + 1)}})
+    assert queue.get(first["job_id"], "u1")["status"] == ParseJobQueue.FAILED
+
+
+def test_cached_ads_complete_on_submit_without_a_slot(jobs, reader, queue):
+    reader.cached = PROFILE
+    job, created = queue.submit("u1", AD, "key-1")
+
+    assert created and job["status"] == ParseJobQueue.DONE and job["source"] == "cache"
+    assert reader.parses == 0
+    assert queue._queued == 0
+
+
+def test_full_queue_rejects_without_storing_a_job(jobs, reader, queue):
+    queue._queued = queue.max_queued
+    with pytest.raises(HTTPException) as error:
+        queue.submit("u1", AD, "key-1")
+    assert error.value.status_code == 503
+    assert jobs.docs == []
+
+
+def test_concurrent_retry_that_loses_the_insert_returns_the_winner(jobs, reader, queue, monkeypatch):
+    winner, _ = queue.submit("u1", AD, "key-1")
+    drain(queue)
+    lookups = iter([None])
+    find_one = jobs.find_one
+    # The first lookup runs before the winning insert is visible
+    monkeypatch.setattr(jobs, "find_one", lambda *args, **kwargs: next(lookups, None) or find_one(*args, **kwargs))
+
+    job, created = queue.submit("u1", AD, "key-1")
+
+    assert not created
+    assert job["job_id"] == winner["job_id"]
+    assert queue._queued == 0
+    assert len(jobs.docs) == 1
@@ -0,0 +1,155 @@
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from bson import ObjectId
+
+from agents.agent_pipeline import MatchPipeline, MAX_FINAL_SCORE
+
+
+def candidate_doc(name, budget=30000):
+    return {
+        "_id": ObjectId(), "full_name": name, "city": "Lahore", "area": "DHA", "budget_PKR": budget,
+        "sleep_schedule": "Night owl", "cleanliness": "Tidy", "noise_tolerance": "Quiet",
+        "study_habits": "Library", "food_pref": "Veg", "age": 22, "occupation": "Student",
+        "raw_profile_text": f"{name} is looking for a room",
+    }
+
+
+SEEKER = {**candidate_doc("seeker"), "id": "seeker"}
+
+
+class SlowPipeline(MatchPipeline):
+    """Candidates named fast* finish at once with a perfect score; the rest take `delay` seconds."""
+
+    def __init__(self, docs, delay=5.0):
+        super().__init__(fused=False)
+        self.pair_cache = None
+        self.docs, self.delay = docs, delay
+        self.cancelled = []
+
+    def _load_candidates(self, user_profile, shortlist_size=None):
+        return list(self.docs)
+
+    async def run_pipeline_async(self, seeker_profile, candidate_profile, base_scoring=None):
+        name = candidate_profile["full_name"]
+        try:
+            if not name.startswith("fast"):
+                await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled.append(name)
+            raise
+        return {"final_score": MAX_FINAL_SCORE if name.startswith("fast") else 50, "degraded": False}
+
+
+def test_async_fan_out_cancels_once_top_n_is_settled():
+    pipeline = SlowPipeline([candidate_doc("fast-1"), candidate_doc("slow-1"), candidate_doc("fast-2"), candidate_doc("slow-2")])
+
+    started = time.monotonic()
+    results = asyncio.run(pipeline.get_best_matches_async(SEEKER, top_n=2))
+
+    assert time.monotonic() - started < 1
+    assert sorted(r["profile"]["full_name"] for r in results) == ["fast-1", "fast-2"]
+    assert sorted(pipeline.cancelled) == ["slow-1", "slow-2"]
+
+
+def test_async_fan_out_falls_back_to_rules_at_the_deadline():
+    pipeline = SlowPipeline([candidate_doc("fast-1"), candidate_doc("slow-1")])
+
+    results = asyncio.run(pipeline.get_best_matches_async(SEEKER, top_n=2, deadline_seconds=0.1))
+
+    by_name = {r["profile"]["full_name"]: r for r in results}
+    assert pipeline.cancelled == ["slow-1"]
+    assert by_name["slow-1"]["degraded"] is True
+    assert by_name["fast-1"]["degraded"] is False
+
+
+def test_async_fan_out_cancels_outstanding_calls_when_the_caller_is_cancelled():
+    pipeline = SlowPipeline([candidate_doc("slow-1"), candidate_doc("slow-2")])
+
+    async def caller():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(pipeline.get_best_matches_async(SEEKER, top_n=2), timeout=0.1)
+
+    asyncio.run(caller())
+    assert sorted(pipeline.cancelled) == ["slow-1", "slow-2"]
+
+
+def test_threaded_fan_out_drops_queued_work_when_the_consumer_stops():
+    docs = [candidate_doc(f"slow-{i}") for i in range(6)]
+    pipeline = SlowPipeline(docs)
+    pipeline._executor = ThreadPoolExecutor(max_workers=1)
+    processed = []
+    lock = threading.Lock()
+
+    def process(user_profile, doc, base_scoring=None):
+        with lock:
+            processed.append(doc["full_name"])
+        time.sleep(0.05)
+        return {"final_score": 50, "profile": {"full_name": doc["full_name"]}}
+    pipeline._process_candidate = process
+
+    frames = pipeline.iter_best_matches(SEEKER, top_n=2, snapshot_every=0)
+    assert next(frames)["event"] == "match"
+    frames.close()
+    pipeline._executor.shutdown(wait=True)
+
+    assert len(processed) < len(docs)
+
+
+def test_threaded_fan_out_stops_once_top_n_is_settled():
+    docs = [candidate_doc("fast-1"), candidate_doc("fast-2")] + [candidate_doc(f"slow-{i}") for i in range(4)]
+    pipeline = SlowPipeline(docs)
+    pipeline._executor = ThreadPoolExecutor(max_workers=1)
+    processed = []
+
+    def process(user_profile, doc, base_scoring=None):
+        name = doc["full_name"]
+        processed.append(name)
+        time.sleep(0.05)
+        return {"final_score": MAX_FINAL_SCORE if name.startswith("fast") else 50, "profile": {"full_name": name}}
+    pipeline._process_candidate = process
+
+    results = pipeline.get_best_matches(SEEKER, top_n=2)
+
+    assert [r["profile"]["full_name"] for r in results] == ["fast-1", "fast-2"]
+    pipeline._executor.shutdown(wait=True)
+    assert len(processed) < len(docs)
+
+
+def test_background_fan_out_does_not_use_the_interactive_pool():
+    from services.llm_gateway import llm_gateway, Priority
+
+    docs = [candidate_doc(f"slow-{i}") for i in range(3)]
+    pipeline = SlowPipeline(docs)
+    pipeline._executor = ThreadPoolExecutor(max_workers=1)
+    pipeline._background_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bg")
+    threads = []
+
+    def process(user_profile, doc, base_scoring=None):
+        threads.append(threading.current_thread().name)
+        return {"final_score": 50, "profile": {"full_name": doc["full_name"]}}
+    pipeline._process_candidate = process
+
+    # Hold the only interactive worker; a background refresh must still complete
+    release = threading.Event()
+    pipeline._executor.submit(release.wait, 5)
+    try:
+        with llm_gateway.priority(Priority.BACKGROUND):
+            results = pipeline.get_best_matches(SEEKER, top_n=3)
+    finally:
+        release.set()
+
+    assert len(results) == 3
+    assert all(name.startswith("bg") for name in threads)
+
+
+def test_rule_based_matches_are_flagged_degraded():
+    pipeline = SlowPipeline([candidate_doc("fast-1"), candidate_doc("slow-1")])
+
+    results = pipeline.get_rule_based_matches(SEEKER, top_n=2)
+
+    assert len(results) == 2
+    assert all(r["degraded"] is True for r in results)
@@ -0,0 +1,19 @@
+from agents.profile_reader_agent import profile_reader
+from services.llm_gateway import llm_gateway, Priority
+
+
+def test_batch_parses_run_at_background_priority(monkeypatch):
+    priorities = []
+
+    def parse_uncached(text):
+        priorities.append(llm_gateway.current_priority())
+        return {"raw_profile_text": text}, "llm"
+    monkeypatch.setattr(profile_reader, "_resolve_without_llm", lambda text: None)
+    monkeypatch.setattr(profile_reader, "_parse_uncached", parse_uncached)
+
+    items = list(profile_reader.parse_profiles_batch(["room in DHA", "room in Gulberg", "room in DHA"]))
+
+    assert [item["status"] for item in items] == ["llm", "llm", "llm"]
+    assert priorities == [Priority.BACKGROUND, Priority.BACKGROUND]
+    # The caller's own context is left at its priority
+    assert llm_gateway.current_priority() == Priority.INTERACTIVE
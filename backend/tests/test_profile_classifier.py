@@ -0,0 +1,100 @@
+import gzip
+import json
+import random
+
+import pytest
+
+from services.profile_classifier import (
+    LocalProfileClassifier, extract_age, extract_budget, train, usable_examples,
+)
+
+PHRASES = {
+    "sleep_schedule": {"Night owl": "I stay up very late", "Early riser": "I wake up at dawn", "Flexible": "my sleep timing varies"},
+    "cleanliness": {"Tidy": "I keep things spotless", "Average": "reasonably clean", "Messy": "my room is cluttered"},
+    "noise_tolerance": {"Quiet": "I need silence", "Moderate": "some noise is fine", "Loud ok": "music and guests welcome"},
+    "study_habits": {
+        "Online classes": "I attend online lectures", "Late-night study": "I revise after midnight",
+        "Room study": "I study at my desk", "Library": "I study on campus in the library",
+    },
+    "food_pref": {"Flexible": "I eat anything", "Non-veg": "I love chicken karahi", "Veg": "I am vegetarian"},
+}
+
+
+def labeled_ads(count, seed=3):
+    rng = random.Random(seed)
+    examples = []
+    for _ in range(count):
+        label = {field: rng.choice(list(options)) for field, options in PHRASES.items()}
+        budget = rng.choice([20000, 25000, 30000, 35000])
+        text = ". ".join(PHRASES[field][value] for field, value in label.items())
+        text = f"Student in Lahore, Gulberg, budget {budget} PKR. {text}."
+        label.update({
+            "city": "Lahore", "area": "Gulberg", "budget_PKR": budget, "age": 22,
+            "occupation": "Student", "full_name": "Anonymous",
+        })
+        examples.append((text, label))
+    return examples
+
+
+@pytest.fixture(scope="module")
+def model():
+    return train(labeled_ads(120), epochs=10)
+
+
+def test_trained_model_answers_ads_like_its_training_data(model):
+    text, label = labeled_ads(1, seed=99)[0]
+    prediction = model.predict(text)
+    assert prediction is not None
+    assert {field: prediction[field] for field in label} == label
+
+
+def test_save_and_load_round_trip(model, tmp_path):
+    path = str(tmp_path / "classifier.json.gz")
+    model.save(path)
+    loaded = LocalProfileClassifier.load(path, min_confidence=model.min_confidence)
+
+    for text, _ in labeled_ads(20, seed=7):
+        assert loaded.predict(text) == model.predict(text)
+    assert loaded.slots == model.slots
+    assert loaded.vocabularies == model.vocabularies
+
+
+def test_load_ignores_missing_and_other_versions(model, tmp_path):
+    path = str(tmp_path / "classifier.json.gz")
+    assert LocalProfileClassifier.load(path) is None
+
+    model.save(path)
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        data = json.load(f)
+    data["version"] += 1
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        json.dump(data, f)
+    assert LocalProfileClassifier.load(path) is None
+
+
+def test_low_confidence_defers_to_the_llm(model):
+    strict = LocalProfileClassifier(model.classifiers, model.vocabularies, model.slots, min_confidence=1.0)
+    assert strict.predict(labeled_ads(1, seed=99)[0][0]) is None
+
+
+def test_usable_examples_drops_invalid_labels():
+    examples = labeled_ads(3)
+    stale = (examples[0][0], {**examples[0][1], "sleep_schedule": "Night Owl"})
+    assert usable_examples(examples + [stale, ("", examples[1][1])]) == examples
+
+
+@pytest.mark.parametrize("text, budget", [
+    ("budget 25,000 PKR", 25000),
+    ("rent 25k", 25000),
+    ("upto 1.5 lakh", 150000),
+    ("budget 20000 or 30000", None),
+    ("room 12", None),
+])
+def test_budget_extractor(text, budget):
+    assert extract_budget(text, {}, {}) == budget
+
+
+def test_age_extractor():
+    assert extract_age("I am 22 years old", {}, {}) == 22
+    assert extract_age("age: 19, student", {}, {}) == 19
+    assert extract_age("room for 2 people", {}, {}) is None
@@ -0,0 +1,129 @@
+import pytest
+
+from agents.profile_reader_agent import profile_reader
+from models.profile import ProfileCreate
+from services.profile_keywords import KeywordMatcher, match_profile_fields
+
+ENUM_FIELDS = ["sleep_schedule", "cleanliness", "noise_tolerance", "study_habits", "food_pref"]
+
+
+def legacy_rule_based_fields(preprocessed_text):
+    """The if-chain ProfileReaderAgent._rule_based_fallback used before the keyword table."""
+    profile = {
+        "sleep_schedule": "Flexible",
+        "cleanliness": "Average",
+        "noise_tolerance": "Moderate",
+        "study_habits": "Library",
+        "food_pref": "Flexible"
+    }
+    text = preprocessed_text.lower()
+
+    if any(keyword in text for keyword in ["early bird", "wakes up early", "morning person"]):
+        profile["sleep_schedule"] = "Early Bird"
+    elif any(keyword in text for keyword in ["night owl", "stays up late", "late night"]):
+        profile["sleep_schedule"] = "Night Owl"
+
+    if any(keyword in text for keyword in ["neat freak", "very clean", "super tidy"]):
+        profile["cleanliness"] = "Very Clean"
+    elif any(keyword in text for keyword in ["a bit messy", "don't mind mess", "relaxed about cleaning"]):
+        profile["cleanliness"] = "A Bit Messy"
+
+    if any(keyword in text for keyword in ["quiet person", "need quiet", "low noise"]):
+        profile["noise_tolerance"] = "Low"
+    elif any(keyword in text for keyword in ["loud music", "parties", "friends over"]):
+        profile["noise_tolerance"] = "High"
+
+    if any(keyword in text for keyword in ["study a lot", "focus", "serious student"]):
+        profile["study_habits"] = "Quiet Room"
+    elif any(keyword in text for keyword in ["chill", "easygoing", "study on bed"]):
+        profile["study_habits"] = "Common Area"
+
+    if any(keyword in text for keyword in ["vegetarian", "veg"]):
+        profile["food_pref"] = "Vegetarian Only"
+    elif any(keyword in text for keyword in ["eat out", "no cooking"]):
+        profile["food_pref"] = "Eats Out"
+
+    return profile
+
+
+# The if-chain's labels were not enum values (so its output failed validation);
+# this is the enum member each one meant. Common Area and Eats Out have none.
+LEGACY_LABELS = {
+    "Early Bird": "Early riser",
+    "Night Owl": "Night owl",
+    "Very Clean": "Tidy",
+    "A Bit Messy": "Messy",
+    "Low": "Quiet",
+    "High": "Loud ok",
+    "Quiet Room": "Room study",
+    "Vegetarian Only": "Veg",
+}
+
+
+def legacy_fields(text):
+    return {field: LEGACY_LABELS.get(label, label) for field, label in legacy_rule_based_fields(text).items()}
+
+
+def keyword_fields(text):
+    return {field: getattr(label, "value", label) for field, label in match_profile_fields(text).items() if field in ENUM_FIELDS}
+
+
+@pytest.mark.parametrize("ad", [
+    "morning person, neat freak, need quiet, serious student, vegetarian. budget 20000.",
+    "early bird, very clean, quiet person, study a lot in my room.",
+    "i stay up late night, don't mind mess, parties on weekends.",
+    "super tidy, low noise please, serious student, vegetarian.",
+    "relaxed about cleaning, stays up late, friends over often.",
+    "a bit messy night owl, loud music is fine.",
+    "need a quiet room to focus on my exams. wakes up early.",
+    "i need to focus on my career.",
+    "student at fast lahore, budget 25k, room mate wanted.",
+    "",
+])
+def test_matches_the_legacy_if_chain(ad):
+    assert keyword_fields(ad) == legacy_fields(ad)
+
+
+# Ads where the keyword table deliberately disagrees with the if-chain
+@pytest.mark.parametrize("ad, field, legacy, current", [
+    # Substring "veg" matched inside non-veg and vegetables
+    ("night owl, non-veg, love biryani.", "food_pref", "Veg", "Non-veg"),
+    ("i eat vegetables and fruits.", "food_pref", "Veg", "Flexible"),
+    # Labels with no enum member; the ad now validates with the default instead of raising
+    ("looking for a chill, easygoing roommate.", "study_habits", "Common Area", "Library"),
+    ("i eat out mostly, no cooking.", "food_pref", "Eats Out", "Flexible"),
+    ("i usually study on bed.", "study_habits", "Common Area", "Room study"),
+    # "late night study" is read as a study habit, not as a sleep schedule
+    ("late night study is my thing.", "sleep_schedule", "Night owl", "Flexible"),
+    ("late night study is my thing.", "study_habits", "Library", "Late-night study"),
+])
+def test_deliberate_differences_from_the_legacy_if_chain(ad, field, legacy, current):
+    assert legacy_fields(ad)[field] == legacy
+    assert keyword_fields(ad)[field] == current
+
+
+def test_fallback_profiles_validate():
+    profile = profile_reader._rule_based_fallback("chill guy, eat out, lahore, budget 25000, age 22 years. non-veg.")
+    validated = ProfileCreate(**profile)
+    assert (validated.city, validated.budget_PKR, validated.age, validated.food_pref.value) == ("Lahore", 25000, 22, "Non-veg")
+
+
+def test_longest_phrase_wins_and_punctuation_is_ignored():
+    matcher = KeywordMatcher({"study": [("late", ["late-night study"]), ("room", ["study"])]})
+    assert matcher.find("Late night study, then study.") == [("study", "late"), ("study", "room")]
+
+
+def test_most_frequent_label_wins_and_ties_go_to_the_first_listed():
+    assert keyword_fields("early riser but also a night owl")["sleep_schedule"] == "Early riser"
+    assert keyword_fields("night owl, stay up late, but early riser")["sleep_schedule"] == "Night owl"
+
+
+def test_roman_urdu_phrases_and_city():
+    fields = match_profile_fields("lhr mein room chahiye, raat ko jagta hoon, saaf suthra, sirf sabzi")
+    assert fields["city"] == "Lahore"
+    assert [fields[f].value for f in ("sleep_schedule", "cleanliness", "food_pref")] == ["Night owl", "Tidy", "Veg"]
+
+
+def test_phrase_listed_for_two_labels_is_rejected():
+    with pytest.raises(ValueError):
+        KeywordMatcher({"noise": [("quiet", ["quiet room"])], "study": [("room", ["quiet room"])]})
@@ -0,0 +1,101 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from services import llm_gateway as gateway_module
+from services.llm_gateway import LLMGateway, Priority, RateLimiter, RateLimitBudgetExceeded
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(gateway_module, "time", SimpleNamespace(monotonic=clock.monotonic, sleep=clock.sleep))
+    return clock
+
+
+def test_full_bucket_admits_capacity_then_asks_to_wait(clock):
+    limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=100000)
+    assert all(limiter.reserve(10, Priority.INTERACTIVE) == 0 for _ in range(60))
+    assert limiter.reserve(10, Priority.INTERACTIVE) == pytest.approx(1.0)
+
+
+def test_refill_is_proportional_to_elapsed_time_and_capped(clock):
+    limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=100000)
+    for _ in range(60):
+        limiter.reserve(10, Priority.INTERACTIVE)
+    clock.now += 5
+    assert sum(limiter.reserve(10, Priority.INTERACTIVE) == 0 for _ in range(10)) == 5
+
+    clock.now += 3600
+    assert sum(limiter.reserve(10, Priority.INTERACTIVE) == 0 for _ in range(100)) == 60
+
+
+def test_token_bucket_limits_large_prompts(clock):
+    limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=6000)
+    assert limiter.reserve(6000, Priority.INTERACTIVE) == 0
+    # 3000 tokens at 100 tokens/s
+    assert limiter.reserve(3000, Priority.INTERACTIVE) == pytest.approx(30.0)
+
+
+def test_background_calls_leave_the_reserve_to_interactive_ones(clock):
+    limiter = RateLimiter(requests_per_minute=8, tokens_per_minute=100000, background_reserve=0.25)
+    admitted = sum(limiter.reserve(1, Priority.BACKGROUND) == 0 for _ in range(8))
+    assert admitted == 6
+    assert limiter.reserve(1, Priority.INTERACTIVE) == 0
+    assert limiter.reserve(1, Priority.INTERACTIVE) == 0
+    assert limiter.reserve(1, Priority.INTERACTIVE) > 0
+
+
+def test_acquire_waits_within_the_budget(clock):
+    limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=100000)
+    for _ in range(60):
+        limiter.reserve(1, Priority.INTERACTIVE)
+    limiter.acquire(1, Priority.INTERACTIVE, max_wait=2.0)
+    assert clock.slept == [pytest.approx(1.0)]
+
+
+def test_acquire_fails_fast_past_the_budget(clock):
+    limiter = RateLimiter(requests_per_minute=6, tokens_per_minute=100000)
+    for _ in range(6):
+        limiter.reserve(1, Priority.INTERACTIVE)
+    with pytest.raises(RateLimitBudgetExceeded):
+        limiter.acquire(1, Priority.INTERACTIVE, max_wait=2.0)
+    assert clock.slept == []
+
+    limiter.acquire(1, Priority.BACKGROUND, max_wait=None)
+    assert sum(clock.slept) >= 10.0
+
+
+def test_async_acquire_fails_fast_past_the_budget(clock):
+    limiter = RateLimiter(requests_per_minute=6, tokens_per_minute=100000)
+    for _ in range(6):
+        limiter.reserve(1, Priority.INTERACTIVE)
+    with pytest.raises(RateLimitBudgetExceeded):
+        asyncio.run(limiter.acquire_async(1, Priority.INTERACTIVE, max_wait=2.0))
+
+
+def test_gateway_marks_rate_limited_interactive_calls_degraded(clock):
+    gateway = LLMGateway(api_key=None, requests_per_minute=1, backend="fake", max_rate_limit_wait=2.0)
+    request = {"model": "m", "messages": [{"role": "user", "content": "hi"}]}
+
+    gateway.chat_completion(**request)
+    with gateway.track_degradation() as tracker:
+        with pytest.raises(RateLimitBudgetExceeded):
+            gateway.chat_completion(**request)
+    assert tracker.degraded
+    # The limiter is local; the provider's breaker never saw a failure
+    assert gateway.breaker("m").allow_request()
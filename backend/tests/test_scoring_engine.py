@@ -0,0 +1,80 @@
+import random
+
+import pytest
+
+from agents.agent_pipeline import MatchPipeline
+from agents.match_scorer_agent import MatchScorerAgent
+from agents.red_flag_agent import RedFlagAgent
+from models.profile import SleepSchedule, Cleanliness, NoiseTolerance, StudyHabits, FoodPref
+from services.scoring_engine import CandidateMatrix, encode_value
+
+FIELDS = {
+    "sleep_schedule": SleepSchedule,
+    "cleanliness": Cleanliness,
+    "noise_tolerance": NoiseTolerance,
+    "study_habits": StudyHabits,
+    "food_pref": FoodPref,
+}
+
+
+def random_profile(rng: random.Random) -> dict:
+    """Profile as stored in Mongo: enum values as strings, some fields missing."""
+    profile = {"budget_PKR": rng.choice([0, 15000, 20000, 25000, 35000, 50000, 80000, rng.randrange(0, 120000)])}
+    for field, enum_cls in FIELDS.items():
+        profile[field] = None if rng.random() < 0.15 else rng.choice(list(enum_cls)).value
+    return profile
+
+
+scorer = MatchScorerAgent()
+red_flag_detector = RedFlagAgent(api_key=None)
+
+
+def rule_based_final_score(seeker: dict, candidate: dict) -> int:
+    base = scorer._rule_based_fallback(seeker, candidate)["score"]
+    red_flags = red_flag_detector._rule_based_fallback("pair", seeker, candidate)["red_flags"]
+    final_score, _, _ = MatchPipeline._apply_risk(base, red_flags)
+    return final_score
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matrix_agrees_with_rule_based_scorer(seed):
+    rng = random.Random(seed)
+    pool = [random_profile(rng) for _ in range(200)]
+    matrix = CandidateMatrix(pool)
+    for seeker in pool[:20]:
+        scores = matrix.score(seeker)
+        for i, candidate in enumerate(pool):
+            expected_base = scorer._rule_based_fallback(seeker, candidate)["score"]
+            assert scores["base_score"][i] == expected_base
+            assert scores["final_score"][i] == rule_based_final_score(seeker, candidate)
+
+
+def test_missing_fields_never_match():
+    seeker = {"budget_PKR": 20000}
+    candidate = {"budget_PKR": 20000}
+    assert scorer._rule_based_fallback(seeker, candidate)["score"] == 30
+    assert CandidateMatrix([candidate]).score(seeker)["base_score"][0] == 30
+
+
+def test_room_and_late_night_study_conflict():
+    seeker = {"budget_PKR": 20000, "study_habits": StudyHabits.ROOM_STUDY.value}
+    candidate = {"budget_PKR": 20000, "study_habits": StudyHabits.LATE_NIGHT.value}
+    red_flags = red_flag_detector._rule_based_fallback("pair", seeker, candidate)["red_flags"]
+    assert [(flag["type"], flag["severity"]) for flag in red_flags] == [("Study Habits Mismatch", "MEDIUM")]
+    assert CandidateMatrix([candidate]).score(seeker)["final_score"][0] == rule_based_final_score(seeker, candidate) == 20
+
+
+def test_top_k_orders_by_final_score():
+    rng = random.Random(7)
+    pool = [random_profile(rng) for _ in range(50)]
+    seeker = pool[0]
+    final = CandidateMatrix(pool).score(seeker)["final_score"]
+    top = CandidateMatrix(pool).top_k(seeker, 10)
+    assert len(top) == 10
+    assert [final[i] for i in top] == sorted(final, reverse=True)[:10]
+
+
+def test_encode_value_is_case_insensitive_and_accepts_members():
+    assert encode_value("sleep_schedule", SleepSchedule.NIGHT_OWL) == encode_value("sleep_schedule", "night OWL")
+    assert encode_value("sleep_schedule", None) == 0
+    assert encode_value("sleep_schedule", "sometimes") == 0
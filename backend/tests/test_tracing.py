@@ -0,0 +1,64 @@
+import pytest
+
+from services.tracing import Histogram, StageMetrics
+
+
+def test_empty_histogram_reports_zero():
+    assert Histogram().quantile(0.5) == 0.0
+
+
+def test_interpolates_inside_the_bucket_and_caps_at_max():
+    histogram = Histogram()
+    histogram.observe(3.0)
+    # Bucket (2.5, 5] with its upper edge capped at the largest observation
+    assert histogram.quantile(0.5) == pytest.approx(2.75)
+    assert histogram.quantile(1.0) == pytest.approx(3.0)
+
+
+def test_quantiles_of_a_uniform_sample():
+    histogram = Histogram()
+    for value in range(1, 101):
+        histogram.observe(float(value))
+    assert histogram.quantile(0.5) == pytest.approx(50.0)
+    assert histogram.quantile(0.99) == pytest.approx(99.0)
+    assert histogram.quantile(1.0) == pytest.approx(100.0)
+
+
+def test_overflow_bucket_is_bounded_by_max():
+    histogram = Histogram()
+    for value in (10.0, 40000.0, 50000.0):
+        histogram.observe(value)
+    assert 30000.0 < histogram.quantile(0.9) <= 50000.0
+    assert histogram.quantile(1.0) == pytest.approx(50000.0)
+
+
+def test_quantile_is_monotonic():
+    histogram = Histogram()
+    for value in (0.5, 3, 3, 7, 12, 80, 80, 80, 400, 2000, 45000):
+        histogram.observe(value)
+    estimates = [histogram.quantile(q / 20) for q in range(21)]
+    assert estimates == sorted(estimates)
+
+
+def test_snapshot_counts_and_buckets():
+    histogram = Histogram(buckets_ms=[10, 100])
+    for value in (5, 10, 50, 500):
+        histogram.observe(value)
+    snapshot = histogram.snapshot()
+    assert snapshot["count"] == 4
+    assert snapshot["buckets"] == {"10": 2, "100": 1, "+Inf": 1}
+    assert snapshot["mean_ms"] == pytest.approx(141.25)
+
+
+def test_span_times_the_block_and_counts_errors():
+    metrics = StageMetrics()
+    with metrics.span("stage.ok"):
+        pass
+    with pytest.raises(RuntimeError):
+        with metrics.span("stage.failing"):
+            raise RuntimeError("boom")
+
+    snapshot = metrics.snapshot()
+    assert snapshot["stages"]["stage.ok"]["count"] == 1
+    assert snapshot["stages"]["stage.failing"]["count"] == 1
+    assert snapshot["counters"] == {"stage.failing.errors": 1}
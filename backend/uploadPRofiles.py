@@ -88,6 +88,9 @@ def create_user_and_profile_documents(profiles: List[Dict]) -> Dict[str, List[Di
         }
         # Ensure budget is an integer
         profile_doc['budget_PKR'] = int(profile_doc.get('budget_PKR', 0))
+        # Normalized city used by the app's indexed candidate query
+        if isinstance(profile_doc.get('city'), str):
+            profile_doc['city_norm'] = profile_doc['city'].strip().lower() or None
 
         # 3. Create the User document, linking the profile ID
         user_doc = {